@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+@file accumulator.py
+This module contains the Accumulator class which turns the readings of a
+hardware timer's counter, which wraps around, into a position which doesn't.
+It is shared by the encoders of the project and of labs 2 and 3, each of
+which keeps a copy of this file.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+
+class Accumulator:
+    '''This class adds up the changes in a counter which counts from 0 to
+    2**bits - 1 and wraps around, such as an STM32 timer in encoder mode. The
+    counter must be read before it has moved by half its range, 32768 counts
+    for a 16-bit timer, since the last reading.'''
+
+    def __init__(self, bits=16):
+        '''This method initializes the Accumulator class with the given
+        parameters.
+
+        @param bits: bits is the width of the counter, 16 for the STM32's
+            timers in encoder mode. The timer's period should be set to
+            2**bits - 1 so the counter wraps at 2**bits. It must be no more
+            than 29, or the math in update() makes ints too big for
+            MicroPython to keep off the heap.
+        '''
+        # mask keeps the low bits of a number, and half is the change in
+        # count at which a step forwards can't be told from a step backwards
+        self.mask = (1 << bits) - 1
+        self.half = 1 << (bits - 1)
+
+        # the last reading of the counter and the position it was taken at
+        self.last = 0
+        self.position = 0
+
+    def update(self, count):
+        ''' This method adds the change in the counter since the last
+        reading to the position. The change is found modulo 2**bits and put
+        in -half to half - 1, so a wrap in either direction is one step like
+        any other, and no branch is needed to spot it.
+        @param count: count is the reading of the counter
+        @return: Returns the position, a signed integer
+        '''
+        half = self.half
+        delta = ((count - self.last + half) & self.mask) - half
+        self.last = count
+        self.position += delta
+        return self.position
+
+    def zero(self, count=None):
+        ''' This method sets the position to zero.
+        @param count: count is the reading of the counter to count from, or
+            None to count from the last reading
+        '''
+        if count is not None:
+            self.last = count
+        self.position = 0
@@ -6,6 +6,7 @@ Created on Wed Feb 05 09:14:00 2020
 Initialize and read a motor encoder so the output is the current encoder position. 
 """
 import pyb
+import accumulator
 
 class Encoder:
     ''' This class implements reading and resetting of the motor encoder '''
@@ -43,9 +44,9 @@ class Encoder:
         ## Channel 2 object specific to the pingroup selected
         self.ch_2 = self.tim.channel(2, pyb.Timer.ENC_B, pin = PIN7)
         
-        # initialize last value to 0 to start encoder at position 0.
-        ## Last known count of the encoder
-        self.last_value = 0
+        ## Turns the timer's counter, which wraps around at 65536, into a
+        ## position which doesn't
+        self.count = accumulator.Accumulator (16)
 
         # set current position to zero as well to ensure encoder is zeroed at start
         ## The current corrected position of the encoder
@@ -56,28 +57,13 @@ class Encoder:
         and returns it as a unsigned integer.
         @return Current position of motor 
         '''
-        # read the encoder and save that value as the current value
-        current_value = self.tim.counter()
-
-        # delta is a signed value and is the difference between the current reading
-        # the previous reading. If The value is positive, the motor was turning clockwise, if
-        # negative, it was turning counterclockwise.
-        delta = current_value - self.last_value
-
-        if delta <= -32767:
-            delta = current_value + (65535 - self.last_value)
-
-        elif delta >= 32767:
-            delta = -(self.last_value + (65535 - current_value))
-
-        else:
-            pass
-        
-        self.last_value = current_value
-        self.current_position += delta
+        # read the encoder and add the change since the last reading, which is
+        # positive if the motor was turning clockwise, to the position
+        self.current_position = self.count.update (self.tim.counter())
         return self.current_position
 
     def zero (self):
         ''' This method resets the encoders position to zero. 
         '''    
+        self.count.zero ()
         self.current_position = 0
\ No newline at end of file
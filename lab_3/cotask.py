@@ -8,14 +8,74 @@
 #  in the system are kept in a list maintained by class @c CoTaskList; the 
 #  system scheduler then runs the tasks' @c run() methods according to a 
 #  chosen scheduling algorithm such as round-robin or highest-priority-first. 
+#  An earliest-deadline scheduler, @c TaskList.heap_sched(), keeps timed tasks
+#  in a heap ordered by their next run times so that each pass only looks at
+#  the tasks which are actually due. 
 #
 #  @copyright This program is copyrighted by JR Ridgely and released under the
 #  GNU Public License, version 3.0. 
 
-import gc                              # Memory allocation garbage collector
+import array                           # Preallocated profiling buffers
 import utime                           # Micropython version of time library
 import micropython                     # This shuts up incorrect warnings
 
+try:
+    import heapq                       # Min-heap used by the EDF scheduler
+except ImportError:
+    import uheapq as heapq             # Older Micropython name for heapq
+
+try:
+    from pyb import wfi                # Sleeps until the next interrupt
+    from pyb import disable_irq, enable_irq
+except ImportError:
+    wfi = None                         # Not on a pyboard; idle by spinning
+
+    def disable_irq ():
+        """ Stand in for @c pyb.disable_irq() where there are no interrupts.
+        """
+        return True
+
+    def enable_irq (state = True):
+        """ Stand in for @c pyb.enable_irq() where there are no interrupts.
+        """
+        pass
+
+
+## The number of state transitions kept by a traced task. When the trace is
+#  full, the oldest transitions are overwritten by new ones
+TRACE_SIZE = 100
+
+## The width in microseconds of each bin in the run time and lateness
+#  histograms which are kept by tasks created with @c stats set
+STATS_BIN_US = 50
+
+## The number of bins in each histogram. Times at or past the last bin's
+#  upper edge are counted apart from the histogram, as overflows
+STATS_BINS = 64
+
+
+## Overrun policy under which a task which has missed one or more runs is run
+#  again and again until it has caught up with its schedule
+CATCH_UP = 0
+
+## Overrun policy under which the runs a task has missed are skipped, and the
+#  task next runs at the next time in its original schedule
+SKIP = 1
+
+## Overrun policy under which a task which has missed runs starts a new 
+#  schedule, next running one period from the time it was found to be late
+REPHASE = 2
+
+
+## The time between system tick interrupts in microseconds. After @c wfi(),
+#  the processor can sleep this long before being woken by a tick
+SYSTICK_US = 1000
+
+## The longest time in microseconds slept at once in the last bit of time
+#  before a deadline, after which @c idle_pass() looks again for a task told
+#  to go by an interrupt
+GO_POLL_US = 20
+
 
 class Task:
     """ This class implements behavior common to tasks in a cooperative 
@@ -43,12 +103,13 @@ class Task:
                          period = 500, profile = True, trace = True)
     cotask.task_list.append (task1)
     while True: 
-        cotask.task_list.pri_sched ()
+        cotask.task_list.pri_sched ()      # or heap_sched () for many tasks
     \endcode """
 
 
     def __init__ (self, run_fun, name = 'NoName', priority = 0, 
-                  period = None, profile = False, trace = False):
+                  period = None, profile = False, trace = False, stats = 0,
+                  overrun = CATCH_UP, on_miss = None):
         """ Initializes a task object, saving copies of constructor parameters
         and preparing an empty dictionary for states. 
         @param run_fun The function which implements the task's code. It must
@@ -62,14 +123,30 @@ class Task:
             The time can be given in a @c float or @c int; it will be 
             converted to microseconds for internal use by the scheduler
         @param profile Set to @c True to enable run-time profiling 
-        @param trace Set to @c True to generate a list of transitions between
-            states. @b Note: This slows things down and allocates memory. """
+        @param trace Set to @c True to keep a record of the last 
+            @c TRACE_SIZE transitions between states, which must be integers.
+            @b Note: This slows things down a little
+        @param stats The number of recent run times and latenesses to keep 
+            in ring buffers, along with histograms of all of them from which
+            percentiles can be found, or 0 to keep none (default 0)
+        @param overrun What to do when a timed task is found to be late by a
+            whole period or more, having missed a deadline: @c CATCH_UP
+            (the default) to run it again until it catches up, @c SKIP to 
+            skip the missed runs, or @c REPHASE to restart its schedule
+        @param on_miss A function to be called as @c on_miss(task, late) 
+            when a deadline is missed, where @c late is in microseconds, or
+            @c None. It's called by the scheduler, not in an interrupt """
 
         # The function which is run to implement this task's code. Since it 
         # is a generator, we "run" it here, which doesn't actually run it but
-        # gets it going as a generator which is ready to yield values
+        # gets it going as a generator which is ready to yield values. The
+        # function is kept so that @c resume() can start the task over
+        self._run_fun = run_fun
         self._run_gen = run_fun ()
 
+        # Set by @c suspend() to keep the task from being run
+        self._suspended = False
+
         ## The name of the task, hopefully a short and descriptive string.
         self.name = name
 
@@ -92,22 +169,61 @@ class Task:
         # Flag which causes the task to be profiled, in which the execution
         #  time of the @c run() method is measured and basic statistics kept. 
         self._prof = profile
+        self._overrun = overrun
+        self._on_miss = on_miss
+
+        ## The number of times this task has missed a deadline, which is when
+        #  it was found to be ready a whole period or more after it should
+        #  have been run. This count isn't reset by @c reset_profile()
+        self.misses = 0
+
+        self._run_stats = None
+        self._late_stats = None
         self.reset_profile ()
 
         # The previous state in which the task last ran. It is used to watch
         # for and track state transitions.
         self._prev_state = 0
 
-        # If transition tracing has been enabled, create an empty list in 
-        # which to store transition (time, to-state) stamps
+        # If transition tracing has been enabled, create a ring buffer in 
+        # which to store the times of transitions and the states to which 
+        # they went; it's allocated here so that tracing never allocates
         self._trace = trace
-        self._tr_data = []
-        self._prev_time = utime.ticks_us ()
+        if trace:
+            self._tr_time = array.array ('l', TRACE_SIZE * [0])
+            self._tr_state = array.array ('l', TRACE_SIZE * [0])
+        self._tr_index = 0
+        self._tr_count = 0
+
+        # If statistics are to be kept, create the buffers which hold them
+        if stats > 0:
+            self._run_stats = RunStats (stats)
+            self._late_stats = RunStats (stats)
 
         ## Flag which is set true when the task is ready to be run by the
         #  scheduler
         self.go_flag = False
 
+        # The task list to which this task belongs, set by @c TaskList.append()
+        # so that @c go() can put this task on the list's go list
+        self._task_list = None
+
+        # The heap entry used by @c TaskList.heap_sched(), which is allocated
+        # once when the task is appended and then reused, and a flag which
+        # shows whether the entry is currently in the heap
+        self._entry = None
+        self._in_heap = False
+
+        # Flags which show whether this task is on the task list's go list,
+        # waiting for @c heap_sched() to see that it was told to go, and 
+        # whether it's in the heap of tasks ready to be run by 
+        # @c heap_sched(), so that neither is ever searched for it, and the
+        # entry used in the heap of ready tasks, allocated when the task is
+        # appended
+        self._go_queued = False
+        self._in_ready = False
+        self._ready_entry = None
+
 
     def schedule (self) -> bool:
         """ This method is called by the scheduler; it attempts to run this 
@@ -118,52 +234,61 @@ class Task:
         """
 
         if self.ready ():
-
-            # Reset the go flag for the next run
-            self.go_flag = False
-
-            # If profiling, save the start time
-            if self._prof:
-                stime = utime.ticks_us ()
-
-            # Run the method belonging to the state which should be run next
-            curr_state = next (self._run_gen)
-
-            # If profiling or tracing, save timing data
-            if self._prof or self._trace:
-                etime = utime.ticks_us ()
-
-            # If profiling, save timing data
-            if self._prof:
-                self._runs += 1
-                runt = utime.ticks_diff (etime, stime)
-                if self._runs > 2:
-                    self._run_sum += runt
-                    if runt > self._slowest:
-                        self._slowest = runt
-
-            # If transition logic tracing is on, record a transition; if not,
-            # ignore the state. If out of memory, switch tracing off and 
-            # run the memory allocation garbage collector
-            if self._trace:
-                try:
-                    if curr_state != self._prev_state:
-                        self._tr_data.append (
-                            (utime.ticks_diff (etime, self._prev_time),
-                             curr_state))
-                except MemoryError:
-                    self._trace = False
-                    gc.collect ()
-
-                self._prev_state = curr_state
-                self._prev_time = etime
-
+            self._run ()
             return True
 
         else:
             return False
 
 
+    def _run (self):
+        """ This method runs the task's generator up to its next @c yield(),
+        keeping profiling and tracing data. It is called by @c schedule() once
+        @c ready() has said that the task should run, and directly by the heap
+        scheduler, which has already done the checking. """
+
+        # Reset the go flag for the next run
+        self.go_flag = False
+
+        # If profiling, save the start time
+        timed = self._prof or self._run_stats != None
+        if timed:
+            stime = utime.ticks_us ()
+
+        # Run the method belonging to the state which should be run next
+        curr_state = next (self._run_gen)
+
+        # If profiling or tracing, save timing data
+        if timed or self._trace:
+            etime = utime.ticks_us ()
+
+        # If profiling, save timing data
+        if self._prof:
+            self._runs += 1
+            runt = utime.ticks_diff (etime, stime)
+            if self._runs > 2:
+                self._run_sum += runt
+                if runt > self._slowest:
+                    self._slowest = runt
+
+        # If keeping statistics, put the run time into the ring buffer
+        if self._run_stats != None:
+            self._run_stats.add (utime.ticks_diff (etime, stime))
+
+        # If transition logic tracing is on, record a transition in the ring
+        # buffer, overwriting the oldest one if the buffer is full
+        if self._trace:
+            if curr_state != self._prev_state:
+                self._tr_time[self._tr_index] = etime
+                self._tr_state[self._tr_index] = curr_state
+                self._tr_index += 1
+                if self._tr_index >= TRACE_SIZE:
+                    self._tr_index = 0
+                self._tr_count += 1
+
+            self._prev_state = curr_state
+
+
     @micropython.native
     def ready (self) -> bool:
         """ This method checks if the task is ready to run. If the task
@@ -172,20 +297,38 @@ class Task:
         This method may be overridden in descendent classes to implement some 
         other behavior. """
 
+        # A suspended task isn't run, even if it has been told to go
+        if self._suspended:
+            return False
+
         # If this task uses a timer, check if it's time to run run() again. If
         # so, set go flag and set the timer to go off at the next run time
         if self.period != None:
-            late = utime.ticks_diff (utime.ticks_us (), self._next_run)
+            now = utime.ticks_us ()
+            late = utime.ticks_diff (now, self._next_run)
             if late > 0:
                 self.go_flag = True
-                self._next_run = utime.ticks_diff (self.period, 
-                                                   -self._next_run)
+                self._next_run = utime.ticks_add (self._next_run, self.period)
+
+                # If a whole period or more has been missed, count the miss
+                # and move the next run time as the overrun policy says
+                if late >= self.period:
+                    self.misses += 1
+                    if self._overrun == SKIP:
+                        self._next_run = utime.ticks_add (self._next_run,
+                            (late // self.period) * self.period)
+                    elif self._overrun == REPHASE:
+                        self._next_run = utime.ticks_add (now, self.period)
+                    if self._on_miss != None:
+                        self._on_miss (self, late)
 
                 # If keeping a latency profile, record the data
                 if self._prof:
                     self._late_sum += late
                     if late > self._latest:
                         self._latest = late
+                if self._late_stats != None:
+                    self._late_stats.add (late)
 
         # If the task doesn't use a timer, we rely on go_flag to signal ready
         return self.go_flag
@@ -201,29 +344,112 @@ class Task:
         self._slowest = 0
         self._late_sum = 0
         self._latest = 0
+        if self._run_stats != None:
+            self._run_stats.reset ()
+            self._late_stats.reset ()
 
 
     def get_trace (self):
         """ This method returns a string containing the task's transition 
-        trace. The trace is a set of tuples, each of which contains a time 
-        and the states from and to which the system transitioned. 
+        trace. The trace is a set of lines, each of which contains a time 
+        and the states from and to which the system transitioned. Times are
+        measured from the oldest transition which is still in the trace. 
         @return A possibly quite large string showing state transitions """
 
         tr_str = 'Task ' + self.name + ':'
         if self._trace:
             tr_str += '\n'
+            count = min (self._tr_count, TRACE_SIZE)
+            index = (self._tr_index - count) % TRACE_SIZE
+            if self._tr_count > TRACE_SIZE:
+                tr_str += '  ({:d} older transitions lost)\n'.format (
+                    self._tr_count - TRACE_SIZE)
+            first_time = self._tr_time[index]
             last_state = 0
-            total_time = 0.0
-            for item in self._tr_data:
-                total_time += item[0] / 1000000.0
+
+            # If older transitions were lost, the state from which the oldest
+            # one left isn't known, so it's used only as a starting point
+            if count < self._tr_count:
+                last_state = self._tr_state[index]
+                count -= 1
+                index += 1
+                if index >= TRACE_SIZE:
+                    index = 0
+
+            for item in range (count):
+                total_time = utime.ticks_diff (self._tr_time[index], 
+                                               first_time) / 1000000.0
                 tr_str += '{: 12.6f}: {: 2d} -> {:d}\n'.format (total_time, 
-                    last_state, item[1])
-                last_state = item[1]
+                    last_state, self._tr_state[index])
+                last_state = self._tr_state[index]
+                index += 1
+                if index >= TRACE_SIZE:
+                    index = 0
         else:
             tr_str += ' not traced'
         return (tr_str)
 
 
+    def get_stats (self):
+        """ This method returns a string showing percentiles of the task's 
+        run times and latenesses, if the task was created with @c stats set.
+        @return A string showing run time and lateness percentiles """
+
+        st_str = 'Task ' + self.name + ':'
+        if self._run_stats != None:
+            st_str += '\n  RUN  ' + str (self._run_stats)
+            if self.period != None:
+                st_str += '\n  LATE ' + str (self._late_stats)
+        else:
+            st_str += ' no statistics'
+        return (st_str)
+
+
+    def suspend (self):
+        """ Keep this task from being run until @c resume() is called. A 
+        suspended task uses no time in the scheduler: a timed task is taken
+        off the schedule, and a call to @c go() is remembered but doesn't 
+        make the task run until it's resumed. This method shouldn't be 
+        called from an interrupt service routine. """
+
+        self._suspended = True
+
+
+    def resume (self, restart = False):
+        """ Let a task which was stopped by @c suspend() run again. A timed 
+        task is run as soon as the scheduler gets to it and then once each 
+        period from then on. This method shouldn't be called from an 
+        interrupt service routine, as restarting the task allocates memory.
+        @param restart If @c True, the task's generator is started over from
+            the beginning, so the task starts in its first state; otherwise
+            it carries on from where it was suspended. A restarted task runs
+            all of its generator function again, so anything which may only
+            be made once, such as an interrupt, should be made before the
+            task rather than in it """
+
+        if not self._suspended:
+            return
+        self._suspended = False
+
+        if restart:
+            self._run_gen = self._run_fun ()
+            self._prev_state = 0
+
+        if self.period != None:
+            self._next_run = utime.ticks_us ()
+            if self._task_list != None:
+                self._task_list._reschedule (self)
+        elif self.go_flag:
+            self.go ()
+
+
+    def suspended (self):
+        """ Find whether this task has been suspended by @c suspend().
+        @return @c True if the task is suspended """
+
+        return self._suspended
+
+
     def go (self):
         """ Method to set a flag so that this task indicates that it's 
         ready to run. This method may be called from an interrupt service 
@@ -232,6 +458,18 @@ class Task:
 
         self.go_flag = True
 
+        # Put this task on the go list so the heap scheduler sees its go flag
+        # without looking at every task. An interrupt may call go() while a
+        # task is doing so, so the list is changed with interrupts disabled
+        task_list = self._task_list
+        if task_list != None and not self._go_queued:
+            irq_state = disable_irq ()
+            if not self._go_queued:
+                self._go_queued = True
+                task_list._go_list[task_list._go_count] = self
+                task_list._go_count += 1
+            enable_irq (irq_state)
+
 
     def __repr__ (self):
         """ This method converts the task to a string for diagnostic use.
@@ -243,7 +481,7 @@ class Task:
             rst += '{: 10.1f}'.format (self.period / 1000.0)
         except TypeError:
             rst += '         -'
-        rst += '{: 8d}'.format (self._runs)
+        rst += '{: 8d}{: 8d}'.format (self._runs, self.misses)
 
         if self._prof and self._runs > 0:
             avg_dur = (self._run_sum / self._runs) / 1000.0
@@ -256,6 +494,119 @@ class Task:
         return rst
 
 
+# =============================================================================
+
+class RunStats:
+    """ This class keeps a record of times, such as the run times or 
+    latenesses of a task, in memory which is allocated when it's created so
+    that nothing is allocated as times are added. The most recent times are 
+    kept in a ring buffer, and every time ever added is counted in a 
+    histogram with @c STATS_BINS bins, each @c STATS_BIN_US wide, from which
+    percentiles are found. Times too long for the histogram are counted as
+    overflows, and the longest time is kept, so a percentile among them is
+    shown as more than the histogram's top rather than as its top. """
+
+    def __init__ (self, size):
+        """ Allocate the ring buffer and histogram. 
+        @param size The number of recent times to keep in the ring buffer """
+
+        self._size = size
+        self._ring = array.array ('l', size * [0])
+        self._hist = array.array ('L', STATS_BINS * [0])
+        self.reset ()
+
+
+    @micropython.native
+    def add (self, time):
+        """ Add a time to the ring buffer, overwriting the oldest one if the
+        buffer is full, and count it in the histogram.
+        @param time The time to be added, in microseconds """
+
+        self._ring[self._index] = time
+        self._index += 1
+        if self._index >= self._size:
+            self._index = 0
+        self._count += 1
+
+        if time > self.longest:
+            self.longest = time
+
+        bin_num = time // STATS_BIN_US
+        if bin_num < 0:
+            bin_num = 0
+        elif bin_num >= STATS_BINS:
+            self.overflows += 1
+            return
+        self._hist[bin_num] += 1
+
+
+    def reset (self):
+        """ Forget all the times which have been added. """
+
+        self._index = 0
+        self._count = 0
+
+        ## The number of times added which were too long for the histogram
+        self.overflows = 0
+
+        ## The longest time added, in microseconds
+        self.longest = 0
+        for index in range (STATS_BINS):
+            self._hist[index] = 0
+
+
+    def percentile (self, pct):
+        """ Find a percentile of all the times which have been added, to the
+        resolution of the histogram. 
+        @param pct The percentile, such as 50 for the median
+        @return The upper edge of the histogram bin holding the percentile, in
+            microseconds, 0 if no times have been added, or @c None if the
+            percentile is among the overflows, so is more than
+            @c STATS_BINS * @c STATS_BIN_US """
+
+        needed = (self._count * pct + 99) // 100
+        total = 0
+        for bin_num in range (STATS_BINS):
+            total += self._hist[bin_num]
+            if total >= needed and total > 0:
+                return (bin_num + 1) * STATS_BIN_US
+        if self.overflows > 0:
+            return None
+        return 0
+
+
+    def recent (self):
+        """ Get the times in the ring buffer, oldest first. 
+        @return A list of the most recent times """
+
+        count = min (self._count, self._size)
+        return [self._ring[(self._index - count + n) % self._size] 
+                for n in range (count)]
+
+
+    def _show_pct (self, pct):
+        """ Show a percentile in milliseconds, as more than the histogram's
+        top if it is among the overflows.
+        @param pct The percentile
+        @return A string eight characters wide """
+
+        time = self.percentile (pct)
+        if time == None:
+            return '{:>8s}'.format ('>{:.3f}'.format (
+                STATS_BINS * STATS_BIN_US / 1000.0))
+        return '{: 8.3f}'.format (time / 1000.0)
+
+
+    def __repr__ (self):
+        """ Show the number of times added, their 50th, 95th and 99th
+        percentiles and the longest of them in milliseconds, and the number
+        of them too long for the histogram. """
+
+        return '{: 8d}  p50{:s}  p95{:s}  p99{:s}  max{: 8.3f}  over{: 6d}'.format (
+            self._count, self._show_pct (50), self._show_pct (95),
+            self._show_pct (99), self.longest / 1000.0, self.overflows)
+
+
 # =============================================================================
 
 class TaskList:
@@ -263,7 +614,8 @@ class TaskList:
     scheduler. The task list is sorted by priority so that the scheduler can 
     efficiently look through the list to find the highest priority task which
     is ready to run at any given time. Tasks can also be scheduled in a 
-    simpler "round-robin" fashion. 
+    simpler "round-robin" fashion, or by earliest deadline using a heap of 
+    the timed tasks' next run times. 
 
     An example showing the use of the task list is given in the documentation
     for class @c Task. """
@@ -278,6 +630,39 @@ class TaskList:
         #  that priority. 
         self.pri_list = []
 
+        # The heap used by @c heap_sched(). Each entry is a list holding the
+        # time at which a timed task is next due, the negative of the task's
+        # priority so that higher priority tasks win ties, a serial number
+        # which keeps tasks themselves from ever being compared, and the task
+        self._heap = []
+
+        # Tasks which are ready to run but haven't yet been run by
+        # @c heap_sched(), in a heap whose entries are lists holding the 
+        # negative of the task's priority, a serial number which puts tasks 
+        # of equal priority in the order in which they became ready, and the
+        # task. The serial numbers start over whenever the heap empties, so
+        # they stay small
+        self._ready = []
+        self._ready_num = 0
+
+        # The tasks which have been told to go by interrupts or other tasks
+        # since the last pass of @c heap_sched(), in the first @c _go_count
+        # places of a list with a place for each task, so that @c Task.go()
+        # never allocates memory
+        self._go_list = []
+        self._go_count = 0
+
+        # Serial number given to each heap entry
+        self._ser_num = 0
+
+        # Time in microseconds which doesn't wrap around like ticks do. Heap
+        # entries are compared against this, and it's kept up to date by 
+        # @c _clock() from the last reading of @c utime.ticks_us()
+        self._ticks = utime.ticks_us ()
+        self._mono = 0
+
+        self.reset_idle_stats ()
+
 
     def append (self, task):
         """ Append a task to the task list. The list will be sorted by task 
@@ -304,6 +689,45 @@ class TaskList:
         # Make sure the main list (of lists at each priority) is sorted
         self.pri_list.sort (key=lambda pri: pri[0], reverse=True)
 
+        # Let the task tell this list when its go flag is set, and if the task
+        # is run by a timer, put it into the heap used by heap_sched()
+        task._task_list = self
+        self._go_list.append (None)
+        task._ready_entry = [-new_pri, 0, task]
+        if task.period != None:
+            now = self._clock ()
+            self._ser_num += 1
+            task._entry = [self._mono + utime.ticks_diff (task._next_run, now),
+                           -new_pri, self._ser_num, task]
+            heapq.heappush (self._heap, task._entry)
+            task._in_heap = True
+
+
+    def _reschedule (self, task):
+        """ Put a timed task into the heap used by @c heap_sched() at its next
+        run time, or move it there if it's already in the heap. 
+        @param task The task to be put into the heap """
+
+        now = self._clock ()
+        key = self._mono + utime.ticks_diff (task._next_run, now)
+        task._entry[0] = key
+        if task._in_heap:
+            heapq.heapify (self._heap)
+        else:
+            heapq.heappush (self._heap, task._entry)
+            task._in_heap = True
+
+
+    def _clock (self):
+        """ Read the microsecond timer and bring the non-wrapping time used
+        to sort the heap up to date.
+        @return The current reading of @c utime.ticks_us() """
+
+        now = utime.ticks_us ()
+        self._mono += utime.ticks_diff (now, self._ticks)
+        self._ticks = now
+        return now
+
 
     @micropython.native
     def rr_sched (self):
@@ -344,12 +768,206 @@ class TaskList:
                     return
 
 
+    @micropython.native
+    def heap_sched (self):
+        """ This scheduler runs tasks in priority order, as does 
+        @c pri_sched(), but it keeps the timed tasks in a heap sorted by the 
+        times at which they're next due. Each pass only checks the tasks at
+        the top of the heap whose time has come, plus tasks whose go flags 
+        have been set since the last pass, which @c Task.go() puts on a list,
+        so the time taken by a pass doesn't grow with the number of tasks. 
+        Of the tasks which are ready, which are kept in a heap of their own,
+        the one with the highest priority is run; between tasks of equal 
+        priority, the one which became ready first is run first. """
+
+        now = self._clock ()
+        mono = self._mono
+        heap = self._heap
+        ready = self._ready
+
+        # Take each timed task whose time has come off the heap. It goes back
+        # in the heap after it has been run and its next run time is known; a
+        # suspended task stays out of the heap until it's resumed
+        while heap and heap[0][0] < mono:
+            task = heapq.heappop (heap)[3]
+            task._in_heap = False
+            if not task._suspended and not task._in_ready:
+                self._make_ready (task)
+
+        # Take the tasks which have been told to go off the go list. A task
+        # which is suspended or already ready is left off; when a suspended
+        # task is resumed, it puts itself back on the go list
+        if self._go_count:
+            irq_state = disable_irq ()
+            go_list = self._go_list
+            for index in range (self._go_count):
+                task = go_list[index]
+                go_list[index] = None
+                task._go_queued = False
+                if task.go_flag and not task._suspended \
+                        and not task._in_ready:
+                    self._make_ready (task)
+            self._go_count = 0
+            enable_irq (irq_state)
+
+        if not ready:
+            self._ready_num = 0
+            return
+
+        # Run the highest priority task which is ready. Its ready() method 
+        # sets its go flag, moves its next run time up by a period, and
+        # records how late it is, just as for pri_sched()
+        task = heapq.heappop (ready)[2]
+        task._in_ready = False
+        task.schedule ()
+        now = self._clock ()
+        mono = self._mono
+
+        # Put a timed task back into the heap at its next run time
+        if task.period != None and not task._in_heap \
+                and not task._suspended:
+            task._entry[0] = mono + utime.ticks_diff (task._next_run, now)
+            heapq.heappush (heap, task._entry)
+            task._in_heap = True
+
+
+    @micropython.native
+    def _make_ready (self, task):
+        """ Put a task into the heap of tasks which are ready to be run by 
+        @c heap_sched(), behind any ready tasks of the same priority. 
+        @param task The task to be put into the heap """
+
+        self._ready_num += 1
+        entry = task._ready_entry
+        entry[1] = self._ready_num
+        heapq.heappush (self._ready, entry)
+        task._in_ready = True
+
+
+    def next_deadline (self):
+        """ Find how long it will be until @c heap_sched() has a task to run.
+        Tasks which are run only by @c go() can become ready at any time, so
+        this is the longest time before something @b might need to be run.
+        @return The time in microseconds until the next timed task is due, 
+            0 if a task is ready now, or @c None if no tasks are run by timers
+        """
+
+        if self._ready or self._go_count:
+            return 0
+        if not self._heap:
+            return None
+
+        self._clock ()
+        wait = self._heap[0][0] - self._mono + 1
+        return wait if wait > 0 else 0
+
+
+    def idle_pass (self, idle_fun = None):
+        """ Run one pass of @c heap_sched(); then, if no task needs to run,
+        sleep until the next timed task is due or until an interrupt calls
+        some task's @c go() method. The sleeping is done by calling
+        @c idle_fun over and over, since it returns whenever any interrupt
+        (including the 1 ms system tick) wakes the processor. Time spent 
+        sleeping and the lateness of each wake-up are kept for diagnostics.
+        @param idle_fun The function called to wait for an interrupt, by
+            default @c pyb.wfi(). A fake clock can be advanced by this 
+            function when testing on a PC """
+
+        if idle_fun == None:
+            idle_fun = wfi
+
+        self.heap_sched ()
+        wait = self.next_deadline ()
+        if wait == 0:
+            return
+
+        start = utime.ticks_us ()
+        if self._idle_start == None:
+            self._idle_start = start
+
+        # With no timed tasks, sleep until any go() from an interrupt
+        if wait == None:
+            while not self._go_count:
+                if idle_fun != None:
+                    idle_fun ()
+            self._go_wakes += 1
+            self._idle_us += utime.ticks_diff (utime.ticks_us (), start)
+            return
+
+        # Sleep until the next task is due or some task has been told to go.
+        # Since the processor may not wake until the next system tick, the
+        # last bit of time before the deadline is waited out with sleep_us(),
+        # in short sleeps so that a go() from an interrupt is seen soon
+        target = utime.ticks_add (start, wait)
+        while not self._go_count:
+            left = utime.ticks_diff (target, utime.ticks_us ())
+            if left <= 0:
+                break
+            if left < SYSTICK_US or idle_fun == None:
+                utime.sleep_us (left if left < GO_POLL_US else GO_POLL_US)
+            else:
+                idle_fun ()
+        end = utime.ticks_us ()
+        self._idle_us += utime.ticks_diff (end, start)
+
+        # Keep track of how far past the deadline the processor woke up
+        if self._go_count:
+            self._go_wakes += 1
+        else:
+            late = utime.ticks_diff (end, target)
+            self._timer_wakes += 1
+            self._wake_late_sum += late
+            if late > self._wake_late_max:
+                self._wake_late_max = late
+
+
+    def run_forever (self, idle_fun = None):
+        """ Run the tasks with @c heap_sched(), sleeping between runs rather
+        than spinning in a loop when no task is ready. This method never
+        returns; it replaces the usual @c while @c True: loop in @c main.
+        @param idle_fun The function called to wait for an interrupt, by
+            default @c pyb.wfi() """
+
+        while True:
+            self.idle_pass (idle_fun)
+
+
+    def reset_idle_stats (self):
+        """ Reset the measurements of idle time and wake-up latency kept by
+        @c idle_pass(). It's also used by @c __init__() to create them. """
+
+        self._idle_start = None
+        self._idle_us = 0
+        self._timer_wakes = 0
+        self._go_wakes = 0
+        self._wake_late_sum = 0
+        self._wake_late_max = 0
+
+
+    def idle_stats (self):
+        """ Create a string showing what fraction of the time the processor
+        has spent asleep in @c idle_pass() and how late it woke up for timed
+        tasks. 
+        @return A string showing the idle time and wake-up latency """
+
+        if self._idle_start == None:
+            return 'IDLE: not measured'
+
+        total = utime.ticks_diff (utime.ticks_us (), self._idle_start)
+        idle_pct = 100.0 * self._idle_us / total if total > 0 else 0.0
+        avg_late = self._wake_late_sum / self._timer_wakes \
+            if self._timer_wakes > 0 else 0.0
+        return 'IDLE: {:5.1f}%  WAKES: {:d} timer, {:d} go  ' \
+            'WAKE LATE: {:.1f} avg, {:d} max us'.format (idle_pct, 
+            self._timer_wakes, self._go_wakes, avg_late, self._wake_late_max)
+
+
     def __repr__ (self):
         """ Create some diagnostic text showing the tasks in the task list.
         """
 
-        ret_str = 'TASK             PRI    PERIOD    RUNS   AVG DUR   MAX ' \
-            'DUR  AVG LATE  MAX LATE\n'
+        ret_str = 'TASK             PRI    PERIOD    RUNS  MISSES   AVG DUR' \
+            '   MAX DUR  AVG LATE  MAX LATE\n'
         for pri in self.pri_list:
             for task in pri[2:]:
                 ret_str += str (task) + '\n'
@@ -100,8 +100,8 @@ if __name__ == "__main__":
         cotask.task_list.append (m2)
 
         # execute the task list using the priority attribute of each task
-        while True:
-            cotask.task_list.pri_sched ()
+        # sleep between task runs rather than spinning
+        cotask.task_list.run_forever ()
 
         # Run the memory garbage collector to ensure memory is as defragmented as possible before the real-time scheduler is started
         gc.collect ()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_idle.py
+This host-side benchmark runs a task set like the one in @c main.py with
+@c cotask.TaskList.idle_pass() on a simulated clock. It reports how much of
+the time the processor would spend asleep, how late it wakes for timed
+tasks, and how long it takes an interrupt's @c go() to get a task running,
+over all interrupts and over those which came while no task was running.
+The tasks take simulated time with @c CLOCK.busy(), so interrupts come
+when they are due, in the middle of a task's run if need be, and each
+interrupt takes a little time of its own, as does the system tick's
+interrupt each millisecond, either of which can make the processor late
+for a timed task. The latency of a @c go() is measured from the time
+its interrupt was due.
+
+Usage: python bench_idle.py [seconds]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import random
+import sys
+
+import benchutil
+from sim import CLOCK
+import cotask  # pylint: disable=wrong-import-order
+
+## Simulated times taken by each run of the tasks [us]
+DRIVE_TIME = 300
+SENSOR_TIME = 800
+IR_TIME = 200
+
+## Simulated time taken by the IR interrupt service routine [us]
+ISR_TIME = 20
+
+## Simulated time taken by the system tick's interrupt service routine [us]
+TICK_TIME = 5
+
+## Average time between simulated IR interrupts [us]
+IR_INTERVAL = 20000
+
+# Times at which the simulated IR interrupts which called go() were due
+go_times = []
+
+# Delays from each simulated interrupt's go() until the IR task ran [us]
+go_latency = []
+
+# Whether each of those interrupts came while no task was running, and
+# whether a task is running
+go_idle = []
+running = [False]
+
+
+def busyTask(run_time):
+    '''Make a task function which takes the given time each time it runs.'''
+    def run_fun():
+        while True:
+            running[0] = True
+            CLOCK.busy(run_time)
+            running[0] = False
+            yield(0)
+    return run_fun
+
+
+def irTask():
+    '''A task which is run by go() from a simulated interrupt and measures
+    how long it took to get going.'''
+    while True:
+        # interrupts which came before the task got going share its run
+        while go_times:
+            go_latency.append(CLOCK.now - go_times.pop(0))
+        running[0] = True
+        CLOCK.busy(IR_TIME)
+        running[0] = False
+        yield(0)
+
+
+def run(seconds=10.0, verbose=False):
+    '''Run the task set with idle_pass() for the given simulated time.
+    @param seconds: seconds is the simulated time to run for [s]
+    @param verbose: verbose is @c True to print the task list's profile
+    @return a list of benchmark results
+    '''
+    CLOCK.reset()
+    del go_times[:]
+    del go_latency[:]
+    del go_idle[:]
+    random.seed(405)
+    task_list = cotask.TaskList()
+    task_list.append(cotask.Task(busyTask(DRIVE_TIME), name='Drive Task',
+                                 priority=1, period=10, profile=True))
+    task_list.append(cotask.Task(busyTask(SENSOR_TIME), name='Line Task',
+                                 priority=1, period=50, profile=True))
+    task_list.append(cotask.Task(busyTask(SENSOR_TIME), name='US Task',
+                                 priority=2, period=50, profile=True))
+    ir_task = cotask.Task(irTask, name='IR Task', priority=5, profile=True)
+    task_list.append(ir_task)
+
+    def schedule(due):
+        CLOCK.at(due, lambda: irISR(due))
+
+    def irISR(due):
+        # the clock is moved on directly, as nothing else is run while the
+        # service routine runs
+        go_times.append(due)
+        go_idle.append(not running[0])
+        CLOCK.now += ISR_TIME
+        ir_task.go()
+        schedule(due + random.randint(1, 2 * IR_INTERVAL))
+
+    def tickISR(due):
+        CLOCK.now += TICK_TIME
+        CLOCK.at(due + CLOCK.SYSTICK, lambda: tickISR(due + CLOCK.SYSTICK))
+
+    schedule(random.randint(1, IR_INTERVAL))
+    CLOCK.at(CLOCK.SYSTICK, lambda: tickISR(CLOCK.SYSTICK))
+
+    start = CLOCK.now
+    end = start + int(seconds * 1000000)
+    while CLOCK.now < end:
+        task_list.idle_pass(CLOCK.wfi)
+
+    if verbose:
+        print(task_list)
+        print(task_list.idle_stats())
+
+    total = CLOCK.now - start
+    idle_latency = [latency for latency, idle in zip(go_latency, go_idle)
+                    if idle]
+    return [benchutil.result('idle.idle_fraction',
+                             100.0 * task_list._idle_us / total, '%'),
+            benchutil.result('idle.timer_wake_late_max',
+                             task_list._wake_late_max, 'us'),
+            benchutil.result('idle.go_latency_avg',
+                             sum(go_latency) / len(go_latency), 'us'),
+            benchutil.result('idle.go_latency_max', max(go_latency), 'us'),
+            benchutil.result('idle.go_latency_idle_max', max(idle_latency),
+                             'us')]
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(float(sys.argv[1]) if len(sys.argv) > 1
+                               else 10.0, True))
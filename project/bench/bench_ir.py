@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_ir.py
+This host-side benchmark compares the time taken to decode an NEC frame by
+@c infared.NecDecoder, which handles each captured edge once as it arrives,
+with the time taken by the decoder the IR task used before, which collected
+the edges of a frame into a list and then walked the list. A copy of the
+old decoder is kept here so the two can be compared. Both decode the same
+edge streams, made by the simulated remote in @c sim.devices with starting
+times spread over the IR timer's 16 bit range so that many frames span the
+timer's overflow, and the benchmark checks that both find the same commands.
+
+Usage: python bench_ir.py [frames]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import random
+import sys
+import time
+
+import benchutil
+from sim import devices
+import infared  # pylint: disable=wrong-import-order
+import task_share  # pylint: disable=wrong-import-order
+
+
+def edgeStreams(frames, seed=405):
+    '''Make the captured timestamps of a number of NEC frames.
+    @param frames: frames is the number of frames
+    @param seed: seed is the seed for the random number generator
+    @return a list of (command, timestamps) tuples
+    '''
+    rand = random.Random(seed)
+    streams = []
+    for _ in range(frames):
+        command = rand.randrange(256)
+        edges = devices.necEdges(rand.randrange(256), command,
+                                 rand.randrange(0x10000))
+        streams.append((command, [edge & 0xFFFF for edge in edges]))
+    return streams
+
+
+class LegacyDecoder:
+    '''The decoder used by the IR task before @c infared.NecDecoder, with the
+    waiting for edges and the printing taken out.'''
+
+    def __init__(self, ir_data):
+        self.ir_data = ir_data
+        self.data = []
+
+    def clearData(self):
+        self.data = []
+
+    def appendData(self):
+        self.data.append(self.ir_data.get())
+
+    def formattedBytes(self, rawBits):
+        def assignBytes(bits, decimal=False):
+            decimalValue = 0
+            for n in range(len(bits)):
+                decimalValue |= bits[n] << n
+            formattedByte = '{:#010b}'.format(decimalValue)
+            if decimal == True:
+                return formattedByte, decimalValue
+            else:
+                return formattedByte
+
+        addressBits = rawBits[0:8]
+        naddressBits = rawBits[8:16]
+        commandBits = rawBits[16:24]
+        ncommandBits = rawBits[24:32]
+        rawBytes = assignBytes(rawBits)
+        addressByte, addressByteD = assignBytes(addressBits, True)
+        naddressByte = assignBytes(naddressBits)
+        commandByte, commandByteD = assignBytes(commandBits, True)
+        ncommandByte = assignBytes(ncommandBits)
+        return addressByteD, commandByteD
+
+    def translateRawIRdata(self):
+        rawData = self.data
+        rawBits = []
+        for i in range(0, len(rawData) - 2, 2):
+            delta = rawData[i+2] - rawData[i]
+            if delta < 0:
+                delta = delta + 65535
+            if delta > 13000 and delta < 14000:
+                pass
+            elif delta < 1300 and delta > 1000:
+                rawBits.append(0)
+            elif delta > 2100 and delta < 2400:
+                rawBits.append(1)
+            else:
+                self.clearData()
+                break
+            if len(rawBits) == 32:
+                self.clearData()
+                return rawBits
+        return False
+
+    def decode(self):
+        '''Decode the frame in the queue as the old task did.
+        @return the frame's command, or None if there wasn't one
+        '''
+        self.clearData()
+        while len(self.data) < 3:
+            self.appendData()
+        pulse = 0
+        for i in range(0, 2):
+            delta = self.data[i+1] - self.data[i]
+            if delta < 0:
+                delta = delta + 65535
+            pulse += delta
+        if pulse > 13000 and pulse < 14000:
+            while len(self.data) < 68:
+                self.appendData()
+            translatedData = self.translateRawIRdata()
+            address, command = self.formattedBytes(translatedData)
+            return command
+        return None
+
+
+def timeLegacy(streams):
+    '''Decode the frames with the old decoder.
+    @return the time per frame [ns] and the number of frames decoded right
+    '''
+    queue = task_share.Queue('I', 200, thread_protect=False, name='legacy')
+    decoder = LegacyDecoder(queue)
+    right = 0
+    elapsed = 0.0
+    for command, edges in streams:
+        queue.put_many(edges)
+        start = time.perf_counter()
+        found = decoder.decode()
+        elapsed += time.perf_counter() - start
+        right += found == command
+    return elapsed * 1e9 / len(streams), right
+
+
+def timeStreaming(streams):
+    '''Decode the frames with @c infared.NecDecoder, reading the edges in
+    place from an SPSC queue as the IR task does.
+    @return the time per frame [ns] and the number of frames decoded right
+    '''
+    queue = task_share.SPSCQueue('I', 200, name='streaming')
+    decoder = infared.NecDecoder()
+    right = 0
+    elapsed = 0.0
+    for command, edges in streams:
+        queue.put_many(edges)
+        start = time.perf_counter()
+        views = queue.views()
+        for view in views:
+            for stamp in view:
+                if decoder.edge(stamp):
+                    found = decoder.command
+        queue.consume(len(views[0]) + len(views[1]))
+        elapsed += time.perf_counter() - start
+        right += found == command
+    return elapsed * 1e9 / len(streams), right
+
+
+def run(frames=2000):
+    '''Compare the decoders.
+    @param frames: frames is the number of frames each decoder decodes
+    @return a list of benchmark results
+    '''
+    streams = edgeStreams(frames)
+    results = []
+    for name, fun in (('legacy', timeLegacy), ('streaming', timeStreaming)):
+        per_frame, right = fun(streams)
+        results.append(benchutil.result('ir.' + name + '.decode', per_frame,
+                                        'ns/frame'))
+        results.append(benchutil.result('ir.' + name + '.correct',
+                                        100.0 * right / frames, '%'))
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(int(sys.argv[1]) if len(sys.argv) > 1
+                               else 2000))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_latency.py
+This host-side benchmark measures the time on the PC from a call to a task's
+@c go() method, as made by an interrupt service routine, to the first line
+of the task's code being run by the scheduler. Background tasks which are
+due at various times share the task list, as in the robot code.
+
+Usage: python bench_latency.py [trials]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import sys
+import time
+
+import benchutil
+from sim import CLOCK
+import cotask  # pylint: disable=wrong-import-order
+
+## Numbers of background tasks sharing the task list
+TASK_COUNTS = (4, 16, 64)
+
+## Time on the PC at which the task was told to go and at which it ran [ns]
+_times = [0, 0]
+
+
+def idleTask():
+    '''A background task which does nothing but yield.'''
+    while True:
+        yield(0)
+
+
+def signaledTask():
+    '''A task which is run by go() and notes the time at which it ran.'''
+    while True:
+        _times[1] = time.perf_counter_ns()
+        yield(0)
+
+
+def latency(sched_name, count, trials):
+    '''Find the average and longest times from go() to the task running.
+    @param sched_name: sched_name is the name of the scheduler method
+    @param count: count is the number of background tasks
+    @param trials: trials is the number of times the task is told to go
+    @return the average and longest latency [ns]
+    '''
+    CLOCK.reset()
+    task_list = cotask.TaskList()
+    for n in range(count):
+        task_list.append(cotask.Task(idleTask, priority=n % 3,
+                                     period=10 + (n * 7) % 41))
+    task = cotask.Task(signaledTask, priority=5)
+    task_list.append(task)
+    sched = getattr(task_list, sched_name)
+
+    total = 0
+    longest = 0
+    for n in range(trials):
+        CLOCK.now += 137
+        _times[1] = 0
+        _times[0] = time.perf_counter_ns()
+        task.go()
+        while not _times[1]:
+            sched()
+        delay = _times[1] - _times[0]
+        total += delay
+        longest = max(longest, delay)
+    return total / trials, longest
+
+
+def run(trials=20000):
+    '''Measure go() latency for each scheduler and number of tasks.
+    @param trials: trials is the number of times the task is told to go
+    @return a list of benchmark results
+    '''
+    results = []
+    for count in TASK_COUNTS:
+        for sched_name in ('pri_sched', 'heap_sched'):
+            avg, longest = latency(sched_name, count, trials)
+            name = 'latency.{:s}.tasks_{:02d}'.format(sched_name, count)
+            results.append(benchutil.result(name + '.avg', avg, 'ns'))
+            results.append(benchutil.result(name + '.max', longest, 'ns'))
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(int(sys.argv[1]) if len(sys.argv) > 1
+                               else 20000))
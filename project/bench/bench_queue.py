@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_queue.py
+This host-side benchmark compares moving data through a @c task_share.Queue
+one item at a time with moving it in bulk with @c put_many() and 
+@c get_into(), for the two uses in the robot code: 100 byte strings sent to
+the print queue and 68 edge IR frames captured into the IR data queue.
+
+Usage: python bench_queue.py [frames]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import array
+import sys
+
+import benchutil
+from sim import devices
+import task_share  # pylint: disable=wrong-import-order
+
+## A 100 character string as printed by the robot's tasks
+PRINT_STRING = ('us front: 245.6620120689655\r\n' * 4)[:100]
+
+## Capture timestamps of one IR frame, as 16 bit timer counts
+IR_FRAME = array.array('I', [edge & 0xFFFF for edge in
+                             devices.necEdges(0, 17, 60000)])
+
+
+def run(frames=20000):
+    '''Time per-item and bulk transfers of print strings and IR frames.
+    @param frames: frames is the number of strings or frames moved
+    @return a list of benchmark results
+    '''
+    print_queue = task_share.Queue('B', 100, thread_protect=True)
+    print_buf = bytearray(100)
+
+    def printEach():
+        for a_ch in PRINT_STRING:
+            if not print_queue.full():
+                print_queue.put(ord(a_ch))
+        while print_queue.any():
+            print_queue.get()
+
+    def printBulk():
+        print_queue.put_many(PRINT_STRING.encode())
+        print_queue.get_into(print_buf)
+
+    ir_queue = task_share.Queue('I', 200, thread_protect=False)
+    ir_buf = array.array('I', 68 * [0])
+
+    def irEach():
+        for edge in IR_FRAME:
+            if not ir_queue.full():
+                ir_queue.put(edge, in_ISR=True)
+        while ir_queue.any():
+            ir_queue.get()
+
+    def irBulk():
+        ir_queue.put_many(IR_FRAME, in_ISR=True)
+        ir_queue.get_into(ir_buf)
+
+    results = []
+    for name, fun in (('print_100_bytes.each', printEach),
+                      ('print_100_bytes.bulk', printBulk),
+                      ('ir_68_edges.each', irEach),
+                      ('ir_68_edges.bulk', irBulk)):
+        results.append(benchutil.result(
+            'queue.' + name, benchutil.nsPerCall(fun, frames), 'ns/frame'))
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(int(sys.argv[1]) if len(sys.argv) > 1
+                               else 20000))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_sched.py
+This host-side benchmark compares the number of scheduler passes per second
+made by @c cotask.TaskList.pri_sched() and @c cotask.TaskList.heap_sched()
+for task lists of different lengths. It runs under CPython on a PC, with the
+simulated @c utime clock from @c sim standing in for the one on the board, so the
+numbers show the relative cost of the two schedulers rather than what the
+board itself can do.
+
+Usage: python bench_sched.py [seconds]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import sys
+import time
+
+import benchutil
+from sim import CLOCK
+import cotask  # pylint: disable=wrong-import-order
+
+## Numbers of tasks for which the schedulers are compared
+TASK_COUNTS = (4, 16, 64)
+
+## Simulated time which passes on each scheduler pass [us]
+PASS_TIME = 100
+
+
+def idleTask():
+    '''A task which does nothing but yield.'''
+    while True:
+        yield(0)
+
+
+def makeTaskList(count):
+    '''Create a task list holding @c count tasks with periods spread between
+    10 and 50 ms and a few different priorities, as in the robot code.'''
+    CLOCK.reset()
+    task_list = cotask.TaskList()
+    for n in range(count):
+        task = cotask.Task(idleTask, name='Task ' + str(n), priority=n % 3,
+                           period=10 + (n * 7) % 41, profile=True)
+        task_list.append(task)
+    return task_list
+
+
+def passesPerSecond(sched, seconds):
+    '''Run a scheduler for the given number of simulated seconds and find how
+    many passes it made for each second of real time.
+    @param sched: sched is the bound scheduler method to be run
+    @param seconds: seconds is the simulated time to run for [s]
+    @return the number of passes per second of real time
+    '''
+    passes = int(seconds * 1000000 / PASS_TIME)
+    start = time.perf_counter()
+    for _ in range(passes):
+        CLOCK.now += PASS_TIME
+        sched()
+    elapsed = time.perf_counter() - start
+    return passes / elapsed
+
+
+def run(seconds=20.0):
+    '''Compare the schedulers for each number of tasks.
+    @param seconds: seconds is the simulated time to run for [s]
+    @return a list of benchmark results
+    '''
+    results = []
+    for count in TASK_COUNTS:
+        for sched_name in ('pri_sched', 'heap_sched'):
+            task_list = makeTaskList(count)
+            rate = passesPerSecond(getattr(task_list, sched_name), seconds)
+            results.append(benchutil.result(
+                'sched.{:s}.tasks_{:02d}'.format(sched_name, count), rate,
+                'passes/s'))
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(float(sys.argv[1]) if len(sys.argv) > 1
+                               else 20.0))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_share.py
+This host-side benchmark measures the time taken on the PC by each call to
+the methods of @c task_share.Queue and @c task_share.Share, with and without
+@c thread_protect, and by @c print_task.put(). Times on the PC are much
+shorter than on the board, but they change in the same way when the code
+changes.
+
+Usage: python bench_share.py [calls]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import sys
+
+import benchutil
+import task_share  # pylint: disable=wrong-import-order
+import print_task  # pylint: disable=wrong-import-order
+
+## A string as long as the print queue, as printed by the robot's tasks
+PRINT_STRING = 'us front: 245.6620120689655\r\n' * 3 + 'x' * 10
+
+
+def run(calls=100000):
+    '''Time the queue, share and print methods.
+    @param calls: calls is the number of calls timed for each method
+    @return a list of benchmark results
+    '''
+    results = []
+    for protect in (False, True):
+        suffix = '.protected' if protect else '.unprotected'
+
+        queue = task_share.Queue('I', 100, thread_protect=protect)
+
+        def putGet():
+            queue.put(1234)
+            queue.get()
+
+        results.append(benchutil.result('share.queue_put_get' + suffix,
+                                        benchutil.nsPerCall(putGet, calls),
+                                        'ns/call'))
+
+        share = task_share.Share('I', thread_protect=protect)
+        results.append(benchutil.result(
+            'share.share_put' + suffix,
+            benchutil.nsPerCall(lambda: share.put(1234), calls), 'ns/call'))
+        results.append(benchutil.result(
+            'share.share_get' + suffix,
+            benchutil.nsPerCall(share.get, calls), 'ns/call'))
+
+    def printString():
+        print_task.put(PRINT_STRING)
+        while print_task.print_queue.any():
+            print_task.print_queue.get()
+
+    results.append(benchutil.result(
+        'share.print_task_put_100_chars',
+        benchutil.nsPerCall(printString, calls // 100), 'ns/call'))
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(int(sys.argv[1]) if len(sys.argv) > 1
+                               else 100000))
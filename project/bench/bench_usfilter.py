@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_usfilter.py
+This host-side benchmark compares three ways the ultrasonic task has turned
+echo widths into proximity levels:
+* @c legacy, which gave each raw reading a level with no filter and no
+  hysteresis
+* @c float, which filtered the readings with a median and a moving average
+  and gave them levels with hysteresis, all in floating point; a copy of it
+  is kept here
+* @c fixed, which does the same with the integer math of
+  @c ultrasonic.TENTHS_IN_SCALE, @c rangeFilter.RangeFilter and
+  @c rangeFilter.ProximityLevel
+
+Each replays the sequences in @c us_corpus.json, read as echo widths, and
+for each the benchmark reports:
+* the time taken per sample, on the PC [ns]
+* the heap blocks taken per sample on the board. MicroPython keeps every
+  float result, and every int of 2**30 or more, in a new block on the heap,
+  so the floats each stage works out are counted, and the fixed stage is
+  checked for big ints
+* false evasions, the number of snapshots at level 1 while the true
+  distance is at least 8 in, each of which would make the bot turn away
+* late evasions, the number of snapshots not at level 1 while the true
+  distance is under 4 in
+* level changes per sequence, the chatter when a bot sits still
+* stale levels, the number of readings given no level of their own
+
+Usage: python bench_usfilter.py [corpus.json]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import array
+import sys
+import time
+
+import benchutil
+import us_corpus
+import rangeFilter  # pylint: disable=wrong-import-order
+import ultrasonic  # pylint: disable=wrong-import-order
+
+## Least int which MicroPython keeps on the heap
+BIG_INT = 1 << 30
+
+
+class Boxed(float):
+    '''A float which counts every float worked out from it, each of which
+    would take a heap block on the board.'''
+
+    made = 0
+
+
+def _counted(name):
+    '''Make a float operator which counts its result.'''
+    method = getattr(float, name)
+
+    def operator(self, other):
+        Boxed.made += 1
+        return Boxed(method(self, other))
+    return operator
+
+
+for _name in ('__add__', '__radd__', '__sub__', '__rsub__', '__mul__',
+              '__rmul__', '__truediv__', '__rtruediv__'):
+    setattr(Boxed, _name, _counted(_name))
+
+
+class BoxedArray(array.array):
+    '''An array of floats which counts every item read from it, each of
+    which would take a heap block on the board.'''
+
+    def __getitem__(self, index):
+        Boxed.made += 1
+        return Boxed(array.array.__getitem__(self, index))
+
+
+class LegacyStage:
+    '''The levels the ultrasonic task gave raw readings before they were
+    filtered. A reading right on a limit got no level, so the last level
+    was used again.'''
+
+    def __init__(self, boxed=False):
+        self.box = Boxed if boxed else float
+        self.level = 5
+        self.stale = 0
+
+    def update(self, width):
+        distance = self.box(width) / 2 / 29 * 0.3937
+        if distance < 6:
+            self.level = 1
+        elif distance > 6 and distance < 18:
+            self.level = 2
+        elif distance > 18 and distance < 24:
+            self.level = 3
+        elif distance > 24 and distance < 30:
+            self.level = 4
+        elif distance > 30:
+            self.level = 5
+        else:
+            self.stale += 1
+        return self.level
+
+
+class FloatStage:
+    '''The filter and levels used by the ultrasonic task before they were
+    moved to integer math.'''
+
+    def __init__(self, boxed=False):
+        self.box = Boxed if boxed else float
+        kind = BoxedArray if boxed else array.array
+        self.window = kind('f', [0] * rangeFilter.MEDIAN_SIZE)
+        self.ordered = kind('f', [0] * rangeFilter.MEDIAN_SIZE)
+        self.index = 0
+        self.count = 0
+        self.value = 0.0
+        self.alpha = self.box(0.75)
+        self.limits = (6, 18, 24, 30)
+        self.hysteresis = self.box(1.0)
+        self.level = 5
+        self.stale = 0
+
+    def filter(self, sample):
+        window = self.window
+        size = len(window)
+        window[self.index] = sample
+        self.index = (self.index + 1) % size
+        filling = self.count < size
+        if filling:
+            self.count += 1
+        count = self.count
+        ordered = self.ordered
+        for n in range(count):
+            item = window[n]
+            m = n
+            while m > 0 and ordered[m - 1] > item:
+                ordered[m] = ordered[m - 1]
+                m -= 1
+            ordered[m] = item
+        median = ordered[count // 2]
+        if filling:
+            self.value = median
+        else:
+            self.value += self.alpha * (median - self.value)
+        return self.value
+
+    def update(self, width):
+        distance = self.filter(self.box(width) / 2 / 29 * 0.3937)
+        if self.count < len(self.window):
+            return self.level
+        limits = self.limits
+        level = self.level
+        while level > 1 and distance < limits[level - 2] - self.hysteresis:
+            level -= 1
+        while (level <= len(limits)
+               and distance >= limits[level - 1] + self.hysteresis):
+            level += 1
+        self.level = level
+        return level
+
+
+class FixedStage:
+    '''The filter and levels used by the ultrasonic task now.'''
+
+    def __init__(self, boxed=False):
+        self.filter = rangeFilter.RangeFilter()
+        self.levels = rangeFilter.ProximityLevel()
+        self.boxed = boxed
+        self.stale = 0
+
+    def update(self, width):
+        if self.boxed:
+            # the biggest int worked out is the scaled echo width
+            Boxed.made += width * ultrasonic.TENTHS_IN_SCALE >= BIG_INT
+        tenths = (width * ultrasonic.TENTHS_IN_SCALE) >> 16
+        distance = self.filter.update(tenths)
+        if self.filter.full():
+            level = self.levels.update(distance)
+        else:
+            level = self.levels.level
+        if self.boxed:
+            Boxed.made += isinstance(self.filter.value, float)
+        return level
+
+
+class Tally:
+    '''Counts what went wrong with the levels of sequences of one kind.'''
+
+    def __init__(self):
+        self.samples = 0
+        self.seconds = 0.0
+        self.blocks = 0
+        self.false = 0
+        self.late = 0
+        self.changes = 0
+        self.sequences = 0
+        self.stale = 0
+
+    def add(self, sequence, levels, seconds, blocks, stale):
+        self.sequences += 1
+        self.samples += len(levels)
+        self.seconds += seconds
+        self.blocks += blocks
+        self.stale += stale
+        for true, level in zip(sequence['true'], levels):
+            self.false += level == 1 and true >= 8
+            self.late += level != 1 and true < 4
+        self.changes += sum(1 for n in range(1, len(levels))
+                            if levels[n] != levels[n - 1])
+
+    def results(self, prefix):
+        samples = max(1, self.samples)
+        return [
+            benchutil.result(prefix + '.cpu', self.seconds * 1e9 / samples,
+                             'ns/sample'),
+            benchutil.result(prefix + '.heap_blocks', self.blocks / samples,
+                             'blocks/sample'),
+            benchutil.result(prefix + '.false_evasions', self.false,
+                             'snapshots'),
+            benchutil.result(prefix + '.late_evasions', self.late,
+                             'snapshots'),
+            benchutil.result(prefix + '.level_changes',
+                             self.changes / max(1, self.sequences),
+                             'changes/sequence'),
+            benchutil.result(prefix + '.stale_levels', self.stale,
+                             'samples')]
+
+
+def widths(sequence):
+    '''Find the echo widths of a sequence's readings [us].'''
+    return [int(round(distance / 0.3937 * 58)) for distance in
+            sequence['read']]
+
+
+def replay(sequence, make):
+    '''Find the levels of a sequence's readings.
+    @param make: make is a stage class, whose objects turn echo widths into
+        levels
+    @return the levels, the time taken [s], the heap blocks taken and the
+        number of stale levels
+    '''
+    echoes = widths(sequence)
+    stage = make()
+    update = stage.update
+    levels = []
+    start = time.perf_counter()
+    for width in echoes:
+        levels.append(update(width))
+    elapsed = time.perf_counter() - start
+
+    # count the floats in a second run, as counting them takes time
+    counted = make(boxed=True)
+    Boxed.made = 0
+    for width, level in zip(echoes, levels):
+        if counted.update(width) != level:
+            raise AssertionError('levels differ when floats are counted')
+    return levels, elapsed, Boxed.made, stage.stale
+
+
+def run(path=us_corpus.CORPUS_FILE):
+    '''Replay the corpus through each stage.
+    @param path: path is the corpus file
+    @return a list of benchmark results
+    '''
+    corpus = us_corpus.load(path)
+    results = []
+    for name, make in (('legacy', LegacyStage), ('float', FloatStage),
+                       ('fixed', FixedStage)):
+        tallies = {'all': Tally()}
+        for sequence in corpus:
+            replayed = replay(sequence, make)
+            tallies['all'].add(sequence, *replayed)
+            tallies.setdefault(sequence['kind'], Tally()).add(sequence,
+                                                              *replayed)
+        for kind in sorted(tallies):
+            results += tallies[kind].results('usfilter.' + name + '.' + kind)
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(sys.argv[1] if len(sys.argv) > 1
+                               else us_corpus.CORPUS_FILE))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+@file bench_velocity.py
+This host-side benchmark checks the velocity found by
+@c motors.Encoder.velocity() against the speed of a simulated motor from
+@c sim.devices. The encoder is read every 10 ms, as the drive task does.
+For each duty cycle the benchmark reports, for the encoder's velocity and
+for the plain change in count over the whole history of readings, which
+is what the encoder would give without timing the count's changes:
+* the mean error once the motor has settled, as a percentage of its speed
+* the time after the duty cycle is set for the velocity to come within
+  10% (or 20 ticks/s) of the motor's speed and stay there [ms]
+
+It also reports the time each velocity takes to compute, on the PC.
+
+Usage: python bench_velocity.py
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import contextlib
+import io
+import time
+
+import benchutil
+from sim import CLOCK, devices, pyb
+import constant  # pylint: disable=wrong-import-order
+import motors  # pylint: disable=wrong-import-order
+import pins  # pylint: disable=wrong-import-order
+import utime  # pylint: disable=wrong-import-order
+
+## Duty cycles the motor is run at [%]
+DUTIES = (1, 2, 5, 20, 100)
+
+## Time between readings of the encoder [us]
+READ_US = 10000
+
+## Readings made at each duty cycle
+READINGS = 100
+
+## Least error taken as settled, for slow motors whose count changes only a
+#  few times over the history [ticks/s]
+TOLERANCE = 20
+
+
+def countVelocity(encoder):
+    '''Find the change in count over the encoder's whole history of readings
+    over the time it took [ticks/s].'''
+    readings = encoder.readings
+    if readings < 2:
+        return 0
+    newest = (encoder.index - 1) % motors.HISTORY
+    oldest = (encoder.index - readings) % motors.HISTORY
+    dt = utime.ticks_diff(encoder.times[newest], encoder.times[oldest])
+    return ((encoder.counts[newest] - encoder.counts[oldest]) * 1000000
+            // dt)
+
+
+def runDuty(driver, motor, encoder, duty):
+    '''Run the motor at a duty cycle from a standstill.
+    @return a dictionary holding the velocities found by each estimate and
+        the motor's speed at each reading
+    '''
+    driver.set_duty_cycle(0, 1)
+    while motor.speed > 0.5:
+        pyb.udelay(READ_US)
+        encoder.read()
+    for _ in range(motors.HISTORY):
+        pyb.udelay(READ_US)
+        encoder.read()
+    driver.set_duty_cycle(duty, 1)
+    found = {'speed': [], 'fused': [], 'count': []}
+    for _ in range(READINGS):
+        pyb.udelay(READ_US)
+        encoder.read()
+        found['speed'].append(motor.speed)
+        found['fused'].append(encoder.velocity())
+        found['count'].append(countVelocity(encoder))
+    return found
+
+
+def settle(speeds, estimates):
+    '''Find the time for an estimate to come within 10% of the speed, or
+    within TOLERANCE of it for a slow motor, and stay there [ms].'''
+    for n in range(len(speeds) - 1, -1, -1):
+        if abs(estimates[n] - speeds[n]) > max(0.1 * speeds[n], TOLERANCE):
+            return (n + 1) * READ_US / 1000.0
+    return 0.0
+
+
+def run():
+    '''Check both velocity estimates at each duty cycle.
+    @return a list of benchmark results
+    '''
+    CLOCK.reset()
+    motor = devices.DcMotor(constant.MOT1_PWM_TIMER, constant.MOT1_PWM_CH,
+                            pins.M1DIR, constant.ENC1_TIMER, forward_level=1)
+    # the encoder prints as it is set up, which would spoil JSON results
+    with contextlib.redirect_stdout(io.StringIO()):
+        driver = motors.MotorDriver(pins.M1DIR, pins.M1PWM,
+                                    constant.MOT1_PWM_TIMER,
+                                    constant.MOT1_PWM_CH, constant.MOT_FREQ,
+                                    True)
+        encoder = motors.Encoder(pins.ENC1A, constant.ENC1A_CH, pins.ENC1B,
+                                 constant.ENC1B_CH, constant.ENC1_TIMER)
+    results = []
+    for duty in DUTIES:
+        found = runDuty(driver, motor, encoder, duty)
+        speeds = found['speed']
+        for name in ('count', 'fused'):
+            estimates = found[name]
+            settled = range(READINGS // 2, READINGS)
+            error = sum(abs(estimates[n] - speeds[n]) / speeds[n]
+                        for n in settled) / len(settled)
+            prefix = 'velocity.{:s}.duty_{:03d}'.format(name, duty)
+            results.append(benchutil.result(prefix + '.error', 100.0 * error,
+                                            '%'))
+            results.append(benchutil.result(prefix + '.settle',
+                                            settle(speeds, estimates), 'ms'))
+    for name, fun in (('count', lambda: countVelocity(encoder)),
+                      ('fused', encoder.velocity)):
+        start = time.perf_counter()
+        for _ in range(10000):
+            fun()
+        results.append(benchutil.result(
+            'velocity.' + name + '.cpu',
+            (time.perf_counter() - start) * 1e9 / 10000, 'ns/call'))
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run())
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+@file benchutil.py
+This module holds what the benchmarks in this directory share: setting up
+the simulated board, timing code on the PC, and writing results in a form
+which can be compared between commits. Each result is a dictionary holding
+the benchmark's @c name, its @c value and the @c unit of the value.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import json
+import os
+import sys
+import time
+
+# Let the simulation and the robot code be imported from the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import sim  # noqa: E402
+sim.install()
+
+
+def result(name, value, unit):
+    '''Make a benchmark result.
+    @param name: name is a dotted name for the quantity measured
+    @param value: value is the number measured
+    @param unit: unit is the unit of the value
+    @return a dictionary holding the result
+    '''
+    return {'name': name, 'value': round(value, 3), 'unit': unit}
+
+
+def nsPerCall(fun, calls):
+    '''Find the average time taken by calls to a function on the PC.
+    @param fun: fun is the function, which is called with no arguments
+    @param calls: calls is the number of times to call it
+    @return the average time per call [ns]
+    '''
+    start = time.perf_counter()
+    for _ in range(calls):
+        fun()
+    return (time.perf_counter() - start) * 1e9 / calls
+
+
+def printResults(results):
+    '''Print results as a table for people to read.'''
+    for item in results:
+        print('{:<48s}{:>16.3f} {:s}'.format(item['name'], item['value'],
+                                            item['unit']))
+
+
+def writeJson(results, stream):
+    '''Write results as JSON, one result per line in order of name, so that
+    the results of two commits can be compared with diff.'''
+    for item in sorted(results, key=lambda item: item['name']):
+        stream.write(json.dumps(item, sort_keys=True) + '\n')
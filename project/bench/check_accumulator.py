@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+@file check_accumulator.py
+This host-side check drives a simulated encoder timer through millions of
+counts, wrapping around many times in both directions, and checks that the
+position found by @c accumulator.Accumulator, and by @c motors.Encoder which
+uses it, is always the true position. The true position takes a random walk
+whose steps between readings are as big as half the counter's range, with
+runs in one direction long enough to wrap, and also steps back and forth
+across the wrap one count at a time. It stays inside the range of a signed
+32-bit int. It is run for the 16-bit counters of the encoders' timers, and
+reports:
+* the counts moved through and the number of wraps
+* the number of readings where the position was wrong, which must be 0
+* the greatest error in the position, for the accumulator and for the
+  wraparound handling the encoders had before it, which took 65535 counts
+  to a wrap rather than 65536, so drifted by a count on each one, and took
+  a step of 32767 counts for a wrap
+* the time taken per reading, on the PC [ns]
+
+It exits with status 1 if any position was wrong.
+
+Usage: python check_accumulator.py [readings]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import contextlib
+import io
+import random
+import sys
+import time
+
+import benchutil
+from sim import pyb
+import accumulator  # pylint: disable=wrong-import-order
+import constant  # pylint: disable=wrong-import-order
+import motors  # pylint: disable=wrong-import-order
+import pins  # pylint: disable=wrong-import-order
+
+## Readings made of each counter
+READINGS = 200000
+
+## Bound on the true position, which the encoder keeps in 32-bit arrays
+LIMIT = (1 << 31) - 1
+
+
+class LegacyCount:
+    '''The wraparound handling the encoders had before the accumulator.'''
+
+    def __init__(self):
+        self.last_value = 0
+        self.current_position = 0
+
+    def update(self, current_value):
+        delta = current_value - self.last_value
+        if delta <= -32767:
+            delta = current_value + (65535 - self.last_value)
+        elif delta >= 32767:
+            delta = -(self.last_value + (65535 - current_value))
+        self.last_value = current_value
+        self.current_position += delta
+        return self.current_position
+
+
+def walk(bits, readings, seed=405):
+    '''Make the true positions of the counter at each reading.
+    @param bits: bits is the width of the counter
+    @param readings: readings is the number of positions to make
+    @return a list of positions
+    '''
+    rand = random.Random(seed)
+    largest = (1 << (bits - 1)) - 1
+    positions = []
+    position = 0
+    while len(positions) < readings:
+        kind = rand.random()
+        if kind < 0.1:
+            # dither back and forth over the nearest wrap, one count at a
+            # time, after stepping halfway there
+            edge = ((position + (largest + 1)) >> bits) << bits
+            positions.append((position + edge) // 2)
+            for step in range(-3, 4):
+                positions.append(edge + step)
+                positions.append(edge - step)
+            position = positions[-1]
+            continue
+        # a run of big steps one way, long enough to wrap more than once
+        size = rand.choice((1, 100, 10000, largest))
+        direction = rand.choice((-1, 1))
+        for _ in range(rand.randrange(1, 40)):
+            step = direction * rand.randint(0, size)
+            if abs(position + step) > LIMIT:
+                direction = -direction
+                step = -step
+            position += step
+            positions.append(position)
+    return positions[:readings]
+
+
+def check(bits, readings):
+    '''Check the accumulator and the encoder against a random walk.
+    @return a list of benchmark results
+    '''
+    positions = walk(bits, readings)
+    mask = (1 << bits) - 1
+    counts = [position & mask for position in positions]
+
+    count = accumulator.Accumulator(bits)
+    update = count.update
+    wrong = 0
+    worst = 0
+    start = time.perf_counter()
+    for value in counts:
+        update(value)
+    elapsed = time.perf_counter() - start
+    count = accumulator.Accumulator(bits)
+    for position, value in zip(positions, counts):
+        error = abs(count.update(value) - position)
+        wrong += error != 0
+        worst = max(worst, error)
+
+    # the encoder reads the same positions through the simulated timer
+    truth = [0]
+    pyb.Timer(constant.ENC1_TIMER).source = lambda timer: truth[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        encoder = motors.Encoder(pins.ENC1A, constant.ENC1A_CH, pins.ENC1B,
+                                 constant.ENC1B_CH, constant.ENC1_TIMER)
+    for position in positions:
+        truth[0] = position
+        error = abs(encoder.read() - position)
+        wrong += error != 0
+        worst = max(worst, error)
+
+    results = [
+        benchutil.result('accumulator.{:d}bit.counts'.format(bits),
+                         sum(abs(positions[n] - positions[n - 1])
+                             for n in range(1, len(positions))), 'counts'),
+        benchutil.result('accumulator.{:d}bit.wraps'.format(bits),
+                         sum(abs((positions[n] >> bits)
+                                 - (positions[n - 1] >> bits))
+                             for n in range(1, len(positions))), 'wraps'),
+        benchutil.result('accumulator.{:d}bit.wrong'.format(bits), wrong,
+                         'readings'),
+        benchutil.result('accumulator.{:d}bit.max_error'.format(bits), worst,
+                         'counts'),
+        benchutil.result('accumulator.{:d}bit.cpu'.format(bits),
+                         elapsed * 1e9 / len(counts), 'ns/reading')]
+    if bits == 16:
+        legacy = LegacyCount()
+        worst = 0
+        for position, value in zip(positions, counts):
+            worst = max(worst, abs(legacy.update(value) - position))
+        results.append(benchutil.result('accumulator.legacy.max_error',
+                                        worst, 'counts'))
+    return results
+
+
+def run(readings=READINGS):
+    '''Check a 16-bit counter.
+    @param readings: readings is the number of readings of the counter
+    @return a list of benchmark results
+    '''
+    return check(16, readings)
+
+
+if __name__ == '__main__':
+    RESULTS = run(int(sys.argv[1]) if len(sys.argv) > 1 else READINGS)
+    benchutil.printResults(RESULTS)
+    FAILED = [item for item in RESULTS
+              if item['name'].endswith('bit.wrong') and item['value']]
+    sys.exit(1 if FAILED else 0)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+@file check_queue.py
+This host-side check puts buffers into @c task_share.Queue and
+@c task_share.SPSCQueue with @c put_many() and checks the items and the
+drop and overwrite counts that result. The buffers are of the queue's own
+type, which is copied in runs, and of a type of another size, which is put
+in one item at a time, for which the counts must come out the same. For
+each case it reports the number of wrong items and wrong counts, which must
+be 0.
+
+It exits with status 1 if anything was wrong.
+
+Usage: python check_queue.py
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import array
+import sys
+
+import benchutil
+import task_share  # pylint: disable=wrong-import-order
+
+## Each case: a name, the queue's class and whether it overwrites, the items
+#  in it before put_many() and the items put, as a list of numbers
+CASES = (
+    ('queue.drop', task_share.Queue, False, [1, 2, 3], [97, 98, 99]),
+    ('queue.overwrite', task_share.Queue, True, [],
+     [97, 98, 99, 100, 101, 102]),
+    ('spsc.drop', task_share.SPSCQueue, False, [1, 2, 3], [97, 98, 99]),
+)
+
+## Buffers the items are put from: one of the queue's type, 'H', and one
+#  whose items are a different size, which isn't copied in runs
+BUFFERS = (('same', lambda items: array.array('H', items)),
+           ('bytes', bytes))
+
+
+def check(kind, overwrite, before, items, make):
+    '''Put a buffer into a queue of four items.
+    @return the items then in the queue, and its drop and overwrite counts
+    '''
+    if kind is task_share.SPSCQueue:
+        queue = kind('H', 4)
+    else:
+        queue = kind('H', 4, overwrite=overwrite)
+    for item in before:
+        queue.put(item)
+    queue.put_many(make(items))
+    held = []
+    while queue.any():
+        held.append(queue.get())
+    _, drops, overwrites = queue.stats()
+    return held, drops, overwrites
+
+
+def expect(overwrite, before, items):
+    '''Find what putting items into a queue of four items one at a time
+    must leave.
+    @return the items in the queue, and its drop and overwrite counts
+    '''
+    held = list(before)
+    drops = 0
+    overwrites = 0
+    for item in items:
+        if len(held) < 4:
+            held.append(item)
+        elif overwrite:
+            held = held[1:] + [item]
+            overwrites += 1
+        else:
+            drops += 1
+    return held, drops, overwrites
+
+
+def run():
+    '''Check each case with each kind of buffer.
+    @return a list of benchmark results
+    '''
+    results = []
+    for name, kind, overwrite, before, items in CASES:
+        want = expect(overwrite, before, items)
+        for buffer_name, make in BUFFERS:
+            got = check(kind, overwrite, before, items, make)
+            prefix = 'queue_check.{:s}.{:s}'.format(name, buffer_name)
+            results += [
+                benchutil.result(prefix + '.wrong_items',
+                                 int(got[0] != want[0]), 'cases'),
+                benchutil.result(prefix + '.wrong_counts',
+                                 int(got[1:] != want[1:]), 'cases')]
+    return results
+
+
+if __name__ == '__main__':
+    RESULTS = run()
+    benchutil.printResults(RESULTS)
+    sys.exit(1 if any(item['value'] for item in RESULTS) else 0)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+@file ir_corpus.py
+This script makes the corpus of IR receiver edge streams replayed by
+@c replay_ir.py and writes it to @c ir_corpus.json. The streams are made from
+the NEC timing in @c sim.devices with a fixed seed, so the corpus only
+changes when this script does. Each stream holds:
+* @c name and @c kind, which is one of @c clean, @c repeat, @c wrap,
+  @c burst, @c noise, @c glitch, @c truncated or @c bitflip
+* @c edges, the times of the receiver's edges [us]; the IR timer captures
+  each as its time modulo 2**16
+* @c expect, the [address, command] pairs which must be decoded
+* @c sent, every [address, command] pair actually sent, including those in
+  frames spoiled by noise, which may be decoded but needn't be
+
+A frame decoded from a stream which isn't one of its @c sent pairs is a
+false accept.
+
+Usage: python ir_corpus.py [output.json]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import json
+import os
+import random
+import sys
+
+# Let the simulation be imported when this is run on its own
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from sim import devices  # noqa: E402
+
+## The file which holds the corpus
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), 'ir_corpus.json')
+
+## Number of streams of each kind
+STREAMS = 12
+
+## Greatest error in the receiver's edge times [us]
+JITTER = 40
+
+
+def jittered(rand, edges):
+    '''Move each edge by up to @c JITTER, as the receiver does.'''
+    return [edge + rand.randint(-JITTER, JITTER) for edge in edges]
+
+
+def frame(rand, start):
+    '''Make a frame with a random address and command.
+    @return the frame's [address, command] and its edges
+    '''
+    pair = [rand.randrange(256), rand.randrange(256)]
+    return pair, jittered(rand, devices.necEdges(pair[0], pair[1], start))
+
+
+def noiseEdges(rand, start, end, count):
+    '''Make pairs of edges a short time apart, as from sunlight or a lamp.'''
+    edges = []
+    for _ in range(count):
+        time = rand.randrange(start, end)
+        edges += [time, time + rand.randint(5, 100)]
+    return sorted(edges)
+
+
+def makeStream(rand, kind, index):
+    '''Make a stream of one kind.
+    @return a dictionary holding the stream
+    '''
+    start = rand.randrange(1000000)
+    expect = []
+    sent = []
+    if kind == 'clean':
+        pair, edges = frame(rand, start)
+        expect.append(pair)
+    elif kind == 'repeat':
+        pair, edges = frame(rand, start)
+        expect.append(pair)
+        for n in range(rand.randint(1, 4)):
+            edges += jittered(rand, devices.necRepeatEdges(
+                start + (n + 1) * devices.NEC_REPEAT_PERIOD))
+    elif kind == 'wrap':
+        # start the frame just before the timer overflows so that the
+        # overflow falls somewhere in the frame
+        start = (start | 0xFFFF) - rand.randrange(68000)
+        pair, edges = frame(rand, start)
+        expect.append(pair)
+    elif kind == 'burst':
+        edges = []
+        for n in range(rand.randint(2, 4)):
+            pair, more = frame(rand, start + n * 2 * devices.NEC_REPEAT_PERIOD)
+            expect.append(pair)
+            edges += more
+    elif kind == 'noise':
+        # noise before and after a frame, and sometimes noise alone
+        if index % 3 == 0:
+            edges = noiseEdges(rand, start, start + 200000, 8)
+        else:
+            pair, edges = frame(rand, start + 100000)
+            expect.append(pair)
+            edges = (noiseEdges(rand, start, start + 90000, 4) + edges
+                     + noiseEdges(rand, start + 190000, start + 250000, 4))
+    elif kind == 'glitch':
+        # a noise pulse in a frame spoils it, but the next frame is good
+        pair, edges = frame(rand, start)
+        sent.append(pair)
+        time = rand.randrange(edges[2], edges[-1])
+        edges = sorted(edges + [time, time + rand.randint(5, 100)])
+        pair, more = frame(rand, start + devices.NEC_REPEAT_PERIOD)
+        expect.append(pair)
+        edges += more
+    elif kind == 'truncated':
+        # a frame cut short, as when the remote is turned away, and then a
+        # whole frame
+        pair, edges = frame(rand, start)
+        sent.append(pair)
+        edges = edges[:rand.randint(4, 60)]
+        pair, more = frame(rand, start + devices.NEC_REPEAT_PERIOD)
+        expect.append(pair)
+        edges += more
+    elif kind == 'bitflip':
+        # a frame with one bit's space lengthened or shortened so that it
+        # reads as the other bit, which the decoder should reject
+        pair = [rand.randrange(256), rand.randrange(256)]
+        clean = devices.necEdges(pair[0], pair[1], start)
+        bit = rand.randrange(32)
+        one = (clean[4 + 2 * bit] - clean[3 + 2 * bit]
+               > devices.NEC_ZERO_SPACE)
+        shift = devices.NEC_ZERO_SPACE - devices.NEC_ONE_SPACE if one \
+            else devices.NEC_ONE_SPACE - devices.NEC_ZERO_SPACE
+        edges = jittered(rand, clean[:4 + 2 * bit]
+                         + [edge + shift for edge in clean[4 + 2 * bit:]])
+    else:
+        raise ValueError('unknown kind ' + kind)
+    return {'name': '{:s}_{:02d}'.format(kind, index), 'kind': kind,
+            'edges': edges, 'expect': expect, 'sent': sent + expect}
+
+
+def makeCorpus(seed=405):
+    '''Make every stream of the corpus.
+    @return a list of streams
+    '''
+    rand = random.Random(seed)
+    return [makeStream(rand, kind, index)
+            for kind in ('clean', 'repeat', 'wrap', 'burst', 'noise',
+                         'glitch', 'truncated', 'bitflip')
+            for index in range(STREAMS)]
+
+
+def load(path=CORPUS_FILE):
+    '''Read the corpus.
+    @return a list of streams
+    '''
+    with open(path) as stream:
+        return json.load(stream)
+
+
+def write(corpus, path=CORPUS_FILE):
+    '''Write the corpus with one stream on each line.'''
+    with open(path, 'w') as stream:
+        stream.write('[\n')
+        stream.write(',\n'.join(json.dumps(item, sort_keys=True)
+                                for item in corpus))
+        stream.write('\n]\n')
+
+
+if __name__ == '__main__':
+    write(makeCorpus(), sys.argv[1] if len(sys.argv) > 1 else CORPUS_FILE)
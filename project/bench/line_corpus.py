@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+@file line_corpus.py
+This script makes the corpus of QTR sensor frames replayed by
+@c replay_line.py and writes it to @c line_corpus.json. Each frame is the
+discharge time of every line sensor on one read, made from a model of the
+sensors over the ring with a fixed seed, so the corpus only changes when
+this script does. Like real sensors, each has a gain of its own which
+scales its discharge times, and the arena's lights shorten them all. Each
+frame holds:
+* @c name and @c kind, which is one of @c sweep (the bot slid across the
+  ring's border by hand to calibrate the sensors), @c none (all black),
+  @c stripe (a strip of white tape under the sensors) or @c edge (the white
+  border of the ring under part of the sensors)
+* @c times, the discharge time of each sensor, first sensor first [us]
+* @c white, the part of each sensor's footprint which is white
+* @c position, the true centroid of the white under the sensors across the
+  bot, positive to the right [mm], or @c null if there is none
+
+The sensors are laid out as @c lineFollower expects: the first is furthest
+right, @c lineFollower.SENSOR_PITCH apart.
+
+Usage: python line_corpus.py [output.json]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import json
+import os
+import random
+import sys
+
+# Let the simulation and the robot code be imported when this is run on
+# its own
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import sim  # noqa: E402
+sim.install()
+from sim import devices  # noqa: E402
+import lineFollower  # noqa: E402 pylint: disable=wrong-import-order
+
+## The file which holds the corpus
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), 'line_corpus.json')
+
+## Number of frames of each kind
+FRAMES = 40
+
+## Number of sensors
+SENSORS = 6
+
+## Width of the part of the surface each sensor sees [mm]
+FOOTPRINT = 6.0
+
+## Width of the white tape [mm]
+TAPE = 19.0
+
+## Greatest error in a discharge time, as a fraction of it
+JITTER = 0.1
+
+## Least and greatest gain of a sensor
+GAINS = (0.6, 3.0)
+
+## Scale of the discharge times under the arena's lights
+AMBIENT = 0.3
+
+
+def sensorPlace(n):
+    '''Find how far right of the bot's centre line sensor n is [mm].'''
+    return ((SENSORS - 1) / 2.0 - n) * lineFollower.SENSOR_PITCH
+
+
+def whiteIn(low, high, left, right):
+    '''Find the length of the white from left to right inside low to high.'''
+    return max(0.0, min(high, right) - max(low, left))
+
+
+def makeFrame(rand, gains, kind, index):
+    '''Make a frame of one kind.
+    @param gains: gains is a list of the gain of each sensor
+    @return a dictionary holding the frame
+    '''
+    span = SENSORS * lineFollower.SENSOR_PITCH / 2.0
+    if kind == 'sweep':
+        # the border's edge passes under the sensors from one side to the
+        # other over the frames of the sweep
+        edge = -span - 10 + (2 * span + 20) * index / (FRAMES - 1)
+        left, right = edge, 1000.0
+    elif kind == 'none':
+        left, right = 0.0, 0.0
+    elif kind == 'stripe':
+        middle = rand.uniform(-span, span)
+        left, right = middle - TAPE / 2, middle + TAPE / 2
+    else:
+        # the ring's border reaching in from one side
+        reach = rand.uniform(FOOTPRINT, 2 * span)
+        if rand.random() < 0.5:
+            left, right = span - reach, 1000.0
+        else:
+            left, right = -1000.0, reach - span
+    times = []
+    whites = []
+    for n in range(SENSORS):
+        place = sensorPlace(n)
+        white = whiteIn(place - FOOTPRINT / 2, place + FOOTPRINT / 2,
+                        left, right) / FOOTPRINT
+        time = devices.QtrSensor.WHITE + (1 - white) * (
+            devices.QtrSensor.BLACK - devices.QtrSensor.WHITE)
+        times.append(int(time * gains[n] * AMBIENT
+                         * rand.uniform(1 - JITTER, 1 + JITTER)))
+        whites.append(round(white, 3))
+
+    # the centroid of the white over the span the sensors see
+    low = sensorPlace(SENSORS - 1) - FOOTPRINT / 2
+    high = sensorPlace(0) + FOOTPRINT / 2
+    length = whiteIn(low, high, left, right)
+    position = None
+    if length > 0:
+        position = round((max(low, left) + min(high, right)) / 2, 3)
+    return {'name': '{:s}_{:02d}'.format(kind, index), 'kind': kind,
+            'times': times, 'white': whites, 'position': position}
+
+
+def makeCorpus(seed=405):
+    '''Make every frame of the corpus.
+    @return a list of frames
+    '''
+    rand = random.Random(seed)
+    gains = [rand.uniform(*GAINS) for _ in range(SENSORS)]
+    return [makeFrame(rand, gains, kind, index)
+            for kind in ('sweep', 'none', 'stripe', 'edge')
+            for index in range(FRAMES)]
+
+
+def load(path=CORPUS_FILE):
+    '''Read the corpus.
+    @return a list of frames
+    '''
+    with open(path) as stream:
+        return json.load(stream)
+
+
+def write(corpus, path=CORPUS_FILE):
+    '''Write the corpus with one frame on each line.'''
+    with open(path, 'w') as stream:
+        stream.write('[\n')
+        stream.write(',\n'.join(json.dumps(item, sort_keys=True)
+                                for item in corpus))
+        stream.write('\n]\n')
+
+
+if __name__ == '__main__':
+    write(makeCorpus(), sys.argv[1] if len(sys.argv) > 1 else CORPUS_FILE)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+@file replay_ir.py
+This host-side harness replays the recorded IR edge streams in
+@c ir_corpus.json through the IR code as it runs on the board: each edge is
+captured by the simulated IR timer, whose interrupt runs @c Infared.irISR
+(or @c Infared.irDecodeISR), and the IR task is run whenever it is ready.
+The code in @c project/infared.py is replayed with frames decoded by the
+task and with frames decoded in the interrupt, and so is the older code in
+@c lab_4/infared.py. The project code's frames are counted from what the
+tasks see, which is each change of the address or command in its shares;
+a frame which brings the same address and command again doesn't change
+them, and isn't put into them at all when frames are decoded in the
+interrupt. For each it reports, over the whole corpus and for each kind of
+stream:
+* the decode rate, the percentage of the frames which must be decoded
+  which were decoded with the right address and command
+* the false accept rate, the percentage of decoded frames which weren't
+  sent
+* the CPU time per frame sent, on the PC [ns]
+* the number of streams which made the code raise an exception or hang
+
+The lab 4 code has limits which the harness works around rather than
+fixes. Its task is a plain function which never yields and which waits
+for edges in @c Queue.get(), so it is run once for each stream with a
+queue that ends the run when the stream runs out. It prints each frame
+rather than sharing it, so its frames are read from what it prints, and
+it prints the last frame again for a repeat code, which is not counted. A
+repeat code which comes before any frame makes it raise an exception, and
+some bad data makes it try to translate the same edges forever, so it is
+stopped if it translates the data many times without reading an edge.
+
+Usage: python replay_ir.py [corpus.json]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import re
+import sys
+import time
+
+import benchutil
+import ir_corpus
+from sim import pyb
+import cotask  # pylint: disable=wrong-import-order
+import infared  # pylint: disable=wrong-import-order
+import task_share  # pylint: disable=wrong-import-order
+
+## The IR timer and channel, as on the robot
+IR_TIMER = 2
+IR_CH = 1
+
+## The lab 4 IR module
+LAB_4_INFARED = os.path.join(os.path.dirname(__file__), '..', '..', 'lab_4',
+                             'infared.py')
+
+
+## Number of times the lab 4 code may translate its data without reading an
+#  edge before it is taken to be stuck
+STUCK_TRANSLATES = 1000
+
+
+class EndOfStream(Exception):
+    '''Raised to end the lab 4 task when the stream has all been read.'''
+
+
+class Stuck(Exception):
+    '''Raised to end the lab 4 task when it stops reading edges.'''
+
+
+class ReplayQueue(task_share.Queue):
+    '''A queue which ends the lab 4 task's run rather than waiting for an
+    edge which will never come, and which keeps count of the translations
+    since the last edge was read.'''
+
+    translates = 0
+
+    def get(self, in_ISR=False):
+        if self.empty():
+            raise EndOfStream()
+        self.translates = 0
+        return task_share.Queue.get(self, in_ISR)
+
+
+class Tally:
+    '''Counts the frames decoded from streams of one kind.'''
+
+    def __init__(self):
+        self.expected = 0
+        self.sent = 0
+        self.right = 0
+        self.decoded = 0
+        self.false = 0
+        self.seconds = 0.0
+        self.crashes = 0
+
+    def add(self, stream, decoded, seconds, crashed):
+        '''Count the frames decoded from a stream.
+        @param stream: stream is the stream from the corpus
+        @param decoded: decoded is a list of the [address, command] pairs
+            decoded from it
+        @param seconds: seconds is the time taken to decode the stream
+        @param crashed: crashed is True if the code raised an exception
+        '''
+        self.crashes += crashed
+        self.expected += len(stream['expect'])
+        self.sent += max(1, len(stream['sent']))
+        self.decoded += len(decoded)
+        self.seconds += seconds
+        sent = list(stream['sent'])
+        for pair in decoded:
+            if pair in sent:
+                sent.remove(pair)
+            else:
+                self.false += 1
+        missing = list(stream['expect'])
+        for pair in decoded:
+            if pair in missing:
+                missing.remove(pair)
+        self.right += len(stream['expect']) - len(missing)
+
+    def results(self, prefix):
+        '''Make benchmark results from the counts.'''
+        return [
+            benchutil.result(prefix + '.decode_rate',
+                             100.0 * self.right / max(1, self.expected), '%'),
+            benchutil.result(prefix + '.false_accept_rate',
+                             100.0 * self.false / max(1, self.decoded), '%'),
+            benchutil.result(prefix + '.cpu', self.seconds * 1e9 / self.sent,
+                             'ns/frame'),
+            benchutil.result(prefix + '.crashes', self.crashes, 'streams')]
+
+
+def replayProject(stream, isr_decode):
+    '''Replay a stream through the IR code of the robot project.
+    @return the [address, command] pairs put into the shares, the time
+        taken [s] and False, as the code doesn't raise exceptions
+    '''
+    ir = infared.Infared(pyb.Pin.board.PA0, IR_TIMER, IR_CH,
+                         isr_decode=isr_decode)
+    channel = pyb.Timer(IR_TIMER).channel(IR_CH)
+    task = ir.task
+    decoded = []
+    shared = [ir.address.get(), ir.command.get()]
+    elapsed = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for edge in stream['edges']:
+            start = time.perf_counter()
+            channel.trigger(edge & 0xFFFF)
+            if task.ready():
+                task.schedule()
+            elapsed += time.perf_counter() - start
+            pair = [ir.address.get(), ir.command.get()]
+            if pair != shared:
+                shared = pair
+                decoded.append(pair)
+    return decoded, elapsed, False
+
+
+def loadLab4():
+    '''Import the lab 4 IR module under a name of its own.'''
+    spec = importlib.util.spec_from_file_location('lab_4_infared',
+                                                  LAB_4_INFARED)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def replayLab4(stream, module):
+    '''Replay a stream through the IR code of lab 4.
+    @return the [address, command] pairs decoded, the time taken [s] and
+        whether the code raised an exception
+    '''
+    ir = module.Infared(pyb.Pin.board.PA8, IR_TIMER, IR_CH)
+    queue = ReplayQueue('I', 140, thread_protect=False, name='lab_4')
+    ir.ir_data = queue
+    translate = ir.translateRawIRdata
+
+    def countedTranslate():
+        queue.translates += 1
+        if queue.translates > STUCK_TRANSLATES:
+            raise Stuck()
+        return translate()
+    ir.translateRawIRdata = countedTranslate
+
+    channel = pyb.Timer(IR_TIMER).channel(IR_CH)
+    output = io.StringIO()
+    crashed = False
+    start = time.perf_counter()
+    for edge in stream['edges']:
+        channel.trigger(edge & 0xFFFF)
+    with contextlib.redirect_stdout(output):
+        try:
+            ir.readInfaredSensorTask()
+        except EndOfStream:
+            pass
+        except Exception:  # pylint: disable=broad-except
+            crashed = True
+    elapsed = time.perf_counter() - start
+    # each new frame prints its raw bits, then its address and command
+    decoded = []
+    for packet in output.getvalue().split('-- New Packet --')[1:]:
+        match = re.search(r'Address \(Decimal\):\s+(\d+)\s+'
+                          r'Command \(Decimal\):\s+(\d+)', packet)
+        if match:
+            decoded.append([int(match.group(1)), int(match.group(2))])
+    # a repeat code prints the last packet again
+    unique = [pair for index, pair in enumerate(decoded)
+              if index == 0 or pair != decoded[index - 1]
+              or stream['kind'] == 'burst']
+    return unique, elapsed, crashed
+
+
+def run(path=ir_corpus.CORPUS_FILE):
+    '''Replay the corpus through each version of the IR code.
+    @param path: path is the corpus file
+    @return a list of benchmark results
+    '''
+    corpus = ir_corpus.load(path)
+    lab4 = loadLab4()
+    replays = (
+        ('project_task', lambda stream: replayProject(stream, False)),
+        ('project_isr', lambda stream: replayProject(stream, True)),
+        ('lab_4', lambda stream: replayLab4(stream, lab4)))
+    results = []
+    for name, replay in replays:
+        tallies = {'all': Tally()}
+        for stream in corpus:
+            # a fresh task list and share list for each stream
+            cotask.task_list = cotask.TaskList()
+            del task_share.share_list[:]
+            replayed = replay(stream)
+            tallies['all'].add(stream, *replayed)
+            tallies.setdefault(stream['kind'], Tally()).add(stream, *replayed)
+        for kind in sorted(tallies):
+            results += tallies[kind].results('replay_ir.' + name + '.' + kind)
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.printResults(run(sys.argv[1] if len(sys.argv) > 1
+                               else ir_corpus.CORPUS_FILE))
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+@file replay_line.py
+This host-side check replays the QTR sensor frames in @c line_corpus.json
+through @c lineFollower.LineFollower.normalize() and
+@c lineFollower.LineFollower.estimateLine(), which give the sensor bits and
+the line estimate the line follower task uses, and compares them with
+where the white really was. It does so once with the sensors scaled from 0
+to the wait time, as before they were calibrated, and once after
+calibrating them on the corpus's @c sweep frames. For the whole corpus and
+for each kind of frame it reports:
+* the CPU time per frame, on the PC [ns]
+* bit errors, the number of sensors given the wrong bit while their
+  footprint was nearly all black or nearly all white
+* the mean and greatest error in the line's position [mm], over frames
+  where the line was seen
+* missed frames, where some sensor discharged in under half the wait time
+  but no line was seen
+* phantom frames, where a line was seen over plain black
+* wrong side frames, where the line was seen on the wrong side of the bot
+  while it was more than half a sensor pitch off centre, which would steer
+  the bot towards the edge rather than away from it
+
+It exits with status 1 if, once calibrated, any frame was a phantom or on
+the wrong side.
+
+Usage: python replay_line.py [corpus.json]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import sys
+import time
+
+import benchutil
+import line_corpus
+import lineFollower  # pylint: disable=wrong-import-order
+import pins  # pylint: disable=wrong-import-order
+
+## Time after which a sensor is taken to see black, as in the robot code [us]
+WAIT_TIME = 1000
+
+
+class Tally:
+    '''Counts how well the line was found in frames of one kind.'''
+
+    def __init__(self):
+        self.frames = 0
+        self.seconds = 0.0
+        self.bits = 0
+        self.seen = 0
+        self.error = 0.0
+        self.worst = 0.0
+        self.missed = 0
+        self.phantom = 0
+        self.wrong = 0
+
+    def add(self, frame, follower, seconds):
+        self.frames += 1
+        self.seconds += seconds
+        for n, white in enumerate(frame['white']):
+            if white <= 0.1 or white >= 0.9:
+                self.bits += follower.sensorOutput[n] != (white < 0.5)
+        truth = frame['position']
+        seen = follower.coverage > 0
+        if truth is None:
+            self.phantom += seen
+            return
+        if not seen:
+            # a sensor only sees white once most of its footprint is white,
+            # so the line is only missed if some sensor discharged quickly
+            self.missed += any(time < WAIT_TIME / 2
+                               for time in frame['times'])
+            return
+        estimate = follower.position * lineFollower.SENSOR_PITCH / 1000.0
+        error = abs(estimate - truth)
+        self.seen += 1
+        self.error += error
+        self.worst = max(self.worst, error)
+        if (abs(truth) > lineFollower.SENSOR_PITCH / 2
+                and (estimate > 0) != (truth > 0)):
+            self.wrong += 1
+
+    def results(self, prefix):
+        return [
+            benchutil.result(prefix + '.cpu',
+                             self.seconds * 1e9 / max(1, self.frames),
+                             'ns/frame'),
+            benchutil.result(prefix + '.bit_errors', self.bits, 'sensors'),
+            benchutil.result(prefix + '.mean_error',
+                             self.error / max(1, self.seen), 'mm'),
+            benchutil.result(prefix + '.max_error', self.worst, 'mm'),
+            benchutil.result(prefix + '.missed', self.missed, 'frames'),
+            benchutil.result(prefix + '.phantom', self.phantom, 'frames'),
+            benchutil.result(prefix + '.wrong_side', self.wrong, 'frames')]
+
+
+def load(follower, frame):
+    '''Put a frame's discharge times into a line follower, as its read of
+    the sensors does.'''
+    for n, discharge in enumerate(frame['times']):
+        follower.dischargeTimes[n] = min(discharge, WAIT_TIME)
+
+
+def run(path=line_corpus.CORPUS_FILE):
+    '''Replay the corpus through the line estimate, without and with
+    calibration.
+    @param path: path is the corpus file
+    @return a list of benchmark results
+    '''
+    corpus = line_corpus.load(path)
+    results = []
+    for name in ('raw', 'calibrated'):
+        follower = lineFollower.LineFollower(pins.QRT_EN, pins.QRT_ARRAY,
+                                             WAIT_TIME)
+        tallies = {'all': Tally()}
+        for frame in corpus:
+            load(follower, frame)
+            if frame['kind'] == 'sweep':
+                if name == 'calibrated':
+                    follower.updateCalibration()
+                continue
+            start = time.perf_counter()
+            follower.normalize()
+            follower.estimateLine()
+            elapsed = time.perf_counter() - start
+            tallies['all'].add(frame, follower, elapsed)
+            tallies.setdefault(frame['kind'], Tally()).add(frame, follower,
+                                                           elapsed)
+        for kind in sorted(tallies):
+            results += tallies[kind].results('replay_line.' + name + '.'
+                                             + kind)
+    return results
+
+
+if __name__ == '__main__':
+    RESULTS = run(sys.argv[1] if len(sys.argv) > 1
+                  else line_corpus.CORPUS_FILE)
+    benchutil.printResults(RESULTS)
+    FAILED = [item for item in RESULTS
+              if item['name'] in ('replay_line.calibrated.all.phantom',
+                                  'replay_line.calibrated.all.wrong_side')
+              and item['value']]
+    sys.exit(1 if FAILED else 0)
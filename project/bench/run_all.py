@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+@file run_all.py
+This script runs all of the host-side benchmarks and writes their results as
+JSON, one result per line in order of name, so that the results from two 
+commits can be compared with diff.
+
+Usage: python run_all.py [output.json] [--quick]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import contextlib
+import sys
+
+import benchutil
+import bench_idle
+import bench_ir
+import bench_latency
+import bench_queue
+import bench_sched
+import bench_share
+import bench_usfilter
+import bench_velocity
+import check_accumulator
+import check_queue
+import replay_ir
+import replay_line
+import tune_pid
+
+
+def run(quick=False):
+    '''Run each benchmark, for a shorter time if @c quick is @c True.
+    @return a list of benchmark results
+    '''
+    scale = 10 if quick else 1
+    results = []
+    results += bench_sched.run(20.0 / scale)
+    results += bench_idle.run(10.0 / scale)
+    results += bench_share.run(100000 // scale)
+    results += bench_latency.run(20000 // scale)
+    results += bench_queue.run(20000 // scale)
+    results += bench_ir.run(2000 // scale)
+    results += replay_ir.run()
+    results += bench_usfilter.run()
+    results += replay_line.run()
+    results += bench_velocity.run()
+    results += check_accumulator.run(200000 // scale)
+    results += check_queue.run()
+    results += tune_pid.run()
+    return results
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--quick']
+    # anything the robot code prints goes to stderr, so the results on
+    # stdout are only JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run('--quick' in sys.argv)
+    if args:
+        with open(args[0], 'w') as stream:
+            benchutil.writeJson(results, stream)
+    else:
+        benchutil.writeJson(results, sys.stdout)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+@file stress_spsc.py
+This host-side stress test checks that a @c task_share.SPSCQueue loses and
+duplicates nothing when an interrupt service routine puts data into it while
+a task is in the middle of taking data out. Python's trace hook stands in
+for the interrupt: between any two bytecodes of the queue's code run by the
+task, a simulated ISR may put the next few numbers of a count into the
+queue, unless the task has disabled interrupts. The task takes the numbers
+out with @c get(), @c get_into() and @c views() with @c consume(), and
+checks that it sees the count in order with nothing missing.
+
+The same test is run on a @c task_share.Queue with and without
+@c thread_protect, which shows that the test can find the errors which
+interrupt masking (or the SPSC queue) prevents.
+
+Usage: python stress_spsc.py [operations] [seed]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import array
+import random
+import sys
+
+import benchutil
+from sim import pyb
+import task_share  # pylint: disable=wrong-import-order
+
+## Number of items each queue can hold; small, so that it is often full
+QUEUE_SIZE = 7
+
+## Chance that the simulated ISR runs between two bytecodes of queue code
+ISR_CHANCE = 0.05
+
+
+class Stress:
+    '''Runs a simulated ISR and a task against one queue and counts the
+    errors the task finds.'''
+
+    def __init__(self, queue, seed):
+        '''@param queue: queue is the queue being tested
+        @param seed: seed is the seed for the random number generator
+        '''
+        self.queue = queue
+        self.random = random.Random(seed)
+        ## The next number the ISR puts and the next one the task expects
+        self.sent = 0
+        self.expected = 0
+        self.errors = 0
+
+    def isr(self):
+        '''Put the next few numbers of the count into the queue, as an ISR
+        would, dropping none: the ISR only puts when there is room.'''
+        for _ in range(self.random.randint(1, 3)):
+            if self.queue.full():
+                return
+            self.queue.put(self.sent, in_ISR=True)
+            self.sent += 1
+
+    def trace(self, frame, event, arg):
+        '''Trace hook which runs the ISR between bytecodes of queue code.'''
+        if frame.f_code.co_filename != task_share.__file__:
+            return None
+        frame.f_trace_opcodes = True
+        if (event == 'opcode' and pyb._irq_enabled
+                and self.random.random() < ISR_CHANCE):
+            self.isr()
+        return self.trace
+
+    def check(self, item):
+        '''Check that the task has received the next number of the count.'''
+        if item != self.expected:
+            self.errors += 1
+        self.expected = item + 1
+
+    def taskStep(self):
+        '''Take some data out of the queue in one of the ways a task can.'''
+        queue = self.queue
+        how = self.random.randrange(3)
+        if how == 0:
+            if queue.any():
+                self.check(queue.get())
+        elif how == 1:
+            buf = array.array('I', [0] * self.random.randint(1, QUEUE_SIZE))
+            for index in range(queue.get_into(buf)):
+                self.check(buf[index])
+        else:
+            views = queue.views()
+            items = list(views[0]) + list(views[1])
+            count = self.random.randint(0, len(items))
+            if queue.consume(count) != count:
+                self.errors += 1
+            for item in items[:count]:
+                self.check(item)
+
+    def run(self, operations):
+        '''Run the task for a number of operations, then take out whatever is
+        left in the queue with no more interrupts.
+        @param operations: operations is the number of task steps
+        @return the number of errors found
+        '''
+        sys.settrace(self.trace)
+        try:
+            for _ in range(operations):
+                self.taskStep()
+        finally:
+            sys.settrace(None)
+        while self.queue.any():
+            self.check(self.queue.get())
+        if self.expected != self.sent:
+            self.errors += 1
+        return self.errors
+
+
+def run(operations=20000, seed=405):
+    '''Stress each kind of queue.
+    @param operations: operations is the number of task steps per queue
+    @param seed: seed is the seed for the random number generator
+    @return a list of results holding the number of errors for each queue
+    '''
+    queues = (
+        ('spsc', task_share.SPSCQueue('I', QUEUE_SIZE, name='spsc')),
+        ('protected', task_share.Queue('I', QUEUE_SIZE, name='protected')),
+        ('unprotected', task_share.Queue('I', QUEUE_SIZE,
+                                         thread_protect=False,
+                                         name='unprotected')))
+    results = []
+    for name, queue in queues:
+        stress = Stress(queue, seed)
+        errors = stress.run(operations)
+        results.append(benchutil.result('stress_spsc.' + name + '.errors',
+                                        errors, 'errors'))
+        results.append(benchutil.result('stress_spsc.' + name + '.items',
+                                        stress.sent, 'items'))
+    return results
+
+
+if __name__ == '__main__':
+    RESULTS = run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 405)
+    benchutil.printResults(RESULTS)
+    # Only the unprotected queue is expected to have errors
+    sys.exit(1 if RESULTS[0]['value'] or RESULTS[2]['value'] else 0)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+@file tune_pid.py
+This host-side benchmark runs a simulated motor from @c sim.devices to
+encoder setpoints the way @c motors.Drive.setPoints() does, once per run of
+the drive task, and compares the proportional-only
+@c motors.MotorController with @c motors.PIDController, in floating point
+and in fixed point, using the gains in @c constant. The simulated motor
+needs some duty to overcome friction, as the bot's do, and is run with a
+little and with a lot of it. For each, and for each setpoint, the 250 tick
+reverse and the turns of 90 and 170 degrees, it reports:
+* the time until the controller takes the motor to be there [ms], or the
+  whole run if it never does, which leaves the drive task stuck
+* the error when it does [ticks]
+* the error at the end of the run [ticks]
+* the overshoot past the setpoint [ticks]
+
+It also reports the time each controller takes per run, on the PC, and the
+floats the fixed point controller works out, which must be none.
+
+With @c --tune it instead searches for the gains which bring the motor to
+every setpoint soonest, with either friction, ending within
+@c motors.TOLERANCE of it and overshooting by no more than twice that, and
+prints them.
+
+Usage: python tune_pid.py [--tune]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import contextlib
+import io
+import itertools
+import sys
+import time
+
+import benchutil
+from sim import CLOCK, devices, pyb
+import constant  # pylint: disable=wrong-import-order
+import motors  # pylint: disable=wrong-import-order
+import pins  # pylint: disable=wrong-import-order
+
+## Time between runs of the controller: the drive task runs every 10 ms and
+#  controls the motors on every other run [us]
+PERIOD_US = 20000
+
+## Longest a setpoint is run for [us]
+RUN_US = 2000000
+
+## Duties the simulated motor needs to overcome friction [%]
+STICTIONS = (5, 20)
+
+## Setpoints the motor is run to [ticks]
+SETPOINTS = (250, int(90 * constant.RATIO), int(170 * constant.RATIO))
+
+## Gains searched with --tune
+KPS = (0.3, 0.5, 0.8, 1.2, 2.0)
+KIS = (0.0, 0.005, 0.01, 0.02, 0.05)
+KDS = (0.0, 1.0, 2.0, 3.0, 4.0)
+
+
+class Rig:
+    '''A simulated motor with its driver and encoder.'''
+
+    def __init__(self, stiction):
+        CLOCK.reset()
+        self.motor = devices.DcMotor(constant.MOT1_PWM_TIMER,
+                                     constant.MOT1_PWM_CH, pins.M1DIR,
+                                     constant.ENC1_TIMER, forward_level=1,
+                                     stiction=stiction)
+        # the encoder prints as it is set up, which would spoil JSON results
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.driver = motors.MotorDriver(pins.M1DIR, pins.M1PWM,
+                                             constant.MOT1_PWM_TIMER,
+                                             constant.MOT1_PWM_CH,
+                                             constant.MOT_FREQ, True)
+            self.encoder = motors.Encoder(pins.ENC1A, constant.ENC1A_CH,
+                                          pins.ENC1B, constant.ENC1B_CH,
+                                          constant.ENC1_TIMER)
+
+    def run(self, controller, point):
+        '''Run the motor from a standstill to a setpoint.
+        @return the time until the controller took the motor to be there
+            [us] or None, the error then, the error at the end and the
+            overshoot [ticks], and whether any run worked out a float
+        '''
+        self.driver.set_duty_cycle(0, 1)
+        while abs(self.motor.speed) > 0.5:
+            pyb.udelay(PERIOD_US)
+            self.encoder.read()
+        self.encoder.zero()
+        controller.setPoint(point)
+        done = None
+        doneError = None
+        furthest = 0
+        floats = False
+        for step in range(RUN_US // PERIOD_US):
+            position = self.encoder.read()
+            furthest = max(furthest, position)
+            duty, direction = controller.outputDutyCycle(position)
+            floats = floats or isinstance(duty, float)
+            self.driver.set_duty_cycle(duty, direction)
+            if done is None and controller.getError():
+                done = step * PERIOD_US
+                doneError = controller.getErrorValue()
+            pyb.udelay(PERIOD_US)
+        self.driver.set_duty_cycle(0, 1)
+        return (done, doneError, point - self.encoder.read(),
+                max(0, furthest - point), floats)
+
+
+def makeControllers():
+    '''Make each controller compared.
+    @return a list of names and controllers
+    '''
+    return [('p', motors.MotorController()),
+            ('pid_float', motors.PIDController(fixed=False)),
+            ('pid_fixed', motors.PIDController(fixed=True))]
+
+
+def cpu(controller):
+    '''Find the time a controller takes per run on the PC [ns].'''
+    controller.setPoint(1000)
+    positions = [n % 1200 for n in range(10000)]
+    start = time.perf_counter()
+    for position in positions:
+        controller.outputDutyCycle(position)
+    return (time.perf_counter() - start) * 1e9 / len(positions)
+
+
+def run():
+    '''Run each controller to each setpoint.
+    @return a list of benchmark results
+    '''
+    results = []
+    for name, controller in makeControllers():
+        floats = False
+        for stiction, point in itertools.product(STICTIONS, SETPOINTS):
+            rig = Rig(stiction)
+            done, doneError, error, overshoot, floated = rig.run(controller,
+                                                                 point)
+            floats = floats or floated
+            prefix = 'pid.{:s}.stiction_{:02d}.{:d}'.format(name, stiction,
+                                                            point)
+            results += [
+                benchutil.result(prefix + '.done',
+                                 (RUN_US if done is None else done) / 1000.0,
+                                 'ms'),
+                benchutil.result(prefix + '.done_error',
+                                 abs(error if doneError is None
+                                     else doneError), 'ticks'),
+                benchutil.result(prefix + '.final_error', abs(error),
+                                 'ticks'),
+                benchutil.result(prefix + '.overshoot', overshoot, 'ticks')]
+        results.append(benchutil.result('pid.' + name + '.cpu',
+                                        cpu(controller), 'ns/run'))
+        if name == 'pid_fixed':
+            results.append(benchutil.result('pid.' + name + '.float_runs',
+                                            floats, 'setpoints'))
+    return results
+
+
+def tune():
+    '''Search the gains for the fixed point controller.
+    @return the best gains, and the time to reach every setpoint with them
+        [ms]
+    '''
+    best = None
+    for gains in itertools.product(KPS, KIS, KDS):
+        controller = motors.PIDController(*gains)
+        total = 0
+        for stiction, point in itertools.product(STICTIONS, SETPOINTS):
+            done, _, error, overshoot, _ = Rig(stiction).run(controller,
+                                                              point)
+            if (done is None or overshoot > 2 * motors.TOLERANCE
+                    or abs(error) > motors.TOLERANCE):
+                break
+            total += done
+        else:
+            if best is None or total < best[1]:
+                best = (gains, total)
+    return best[0], best[1] / 1000.0
+
+
+if __name__ == '__main__':
+    if '--tune' in sys.argv[1:]:
+        GAINS, TOTAL = tune()
+        print('Kp {:g} Ki {:g} Kd {:g}: {:.0f} ms'.format(*(GAINS
+                                                           + (TOTAL,))))
+    else:
+        benchutil.printResults(run())
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+@file us_corpus.py
+This script makes the corpus of ultrasonic distance sequences replayed by
+@c bench_usfilter.py and writes it to @c us_corpus.json. Each sequence is
+what one sensor reads on successive snapshots, 50 ms apart, made with a
+fixed seed so the corpus only changes when this script does. Each holds:
+* @c name and @c kind, which is one of @c steady, @c limit, @c spike,
+  @c dropout, @c approach or @c retreat
+* @c true, the true distance at each snapshot [in]
+* @c read, the distance the sensor read at each snapshot [in], with the
+  sensor's jitter, echoes from the other sensors' pings (which read much
+  closer than the truth) and lost echoes (which read as the longest
+  distance)
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import json
+import os
+import random
+import sys
+
+## The file which holds the corpus
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), 'us_corpus.json')
+
+## Number of sequences of each kind
+SEQUENCES = 12
+
+## Number of snapshots in each sequence
+LENGTH = 60
+
+## Greatest error in a good reading [in]
+JITTER = 0.4
+
+## Distance read when an echo is lost: the array's echo timeout, 18 ms [in]
+NO_ECHO = 18000 / 2 / 29 * 0.3937
+
+
+def sequence(rand, kind):
+    '''Make the true distances of a sequence of one kind, and the chances of a
+    crosstalk echo and of a lost echo at each snapshot.'''
+    if kind == 'steady':
+        true = [rand.uniform(8, 60)] * LENGTH
+        return true, 0.0, 0.0
+    if kind == 'limit':
+        # sitting right on one of the limits between levels
+        limit = rand.choice((6, 18, 24, 30))
+        return [limit + rand.uniform(-0.3, 0.3)] * LENGTH, 0.0, 0.0
+    if kind == 'spike':
+        return [rand.uniform(12, 60)] * LENGTH, 0.08, 0.0
+    if kind == 'dropout':
+        return [rand.uniform(3, 40)] * LENGTH, 0.0, 0.1
+    # a bot closing in or backing off at 10 to 30 in/s
+    step = rand.uniform(0.5, 1.5)
+    far = rand.uniform(40, 60)
+    true = [max(2.0, far - step * n) for n in range(LENGTH)]
+    if kind == 'retreat':
+        true.reverse()
+    return true, 0.03, 0.03
+
+
+def makeSequence(rand, kind, index):
+    '''Make a sequence of one kind.
+    @return a dictionary holding the sequence
+    '''
+    true, spike, dropout = sequence(rand, kind)
+    read = []
+    for distance in true:
+        chance = rand.random()
+        if chance < spike:
+            read.append(rand.uniform(1, 5))
+        elif chance < spike + dropout:
+            read.append(NO_ECHO)
+        else:
+            read.append(distance + rand.uniform(-JITTER, JITTER))
+    return {'name': '{:s}_{:02d}'.format(kind, index), 'kind': kind,
+            'true': [round(item, 3) for item in true],
+            'read': [round(item, 3) for item in read]}
+
+
+def makeCorpus(seed=405):
+    '''Make every sequence of the corpus.
+    @return a list of sequences
+    '''
+    rand = random.Random(seed)
+    return [makeSequence(rand, kind, index)
+            for kind in ('steady', 'limit', 'spike', 'dropout', 'approach',
+                         'retreat')
+            for index in range(SEQUENCES)]
+
+
+def load(path=CORPUS_FILE):
+    '''Read the corpus.
+    @return a list of sequences
+    '''
+    with open(path) as stream:
+        return json.load(stream)
+
+
+def write(corpus, path=CORPUS_FILE):
+    '''Write the corpus with one sequence on each line.'''
+    with open(path, 'w') as stream:
+        stream.write('[\n')
+        stream.write(',\n'.join(json.dumps(item, sort_keys=True)
+                                for item in corpus))
+        stream.write('\n]\n')
+
+
+if __name__ == '__main__':
+    write(makeCorpus(), sys.argv[1] if len(sys.argv) > 1 else CORPUS_FILE)
@@ -9,8 +9,17 @@ can be modified easily in one place. Constant names are self explained
 """
 START = 17
 
+# Actions taken for IR remote commands, looked up in the Infared command table
+IR_STOP = 0
+IR_RUN = 1
+
 WHEEL_RADIUS = 0.75     # [in]
 KP = .5     # [analyze units]
+# PID gains for motors.PIDController, tuned with bench/tune_pid.py
+PID_KP = 1.2    # [% duty per tick]
+PID_KI = .02    # [% duty per tick per run of the drive task]
+PID_KD = 2.     # [% duty per tick moved per run of the drive task]
+LINE_STEER = 15     # [%] steer at the far edge of the line sensors
 RATIO = 4.75       # ticks per degree (5.83 but had to adjust)
 
 MOT_FREQ = 16000
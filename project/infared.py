@@ -9,22 +9,135 @@ start and stop signals to turn on the sumo bot.
 
 from micropython import const, alloc_emergency_exception_buf  # pylint: disable=import-error
 import pyb  # pylint: disable=import-error
-import utime  # pylint: disable=import-error
 import task_share
 import cotask
+import constant
+
+## Windows of the NEC symbols, each the time from the start of a mark to the
+#  start of the next mark, as captured by the IR timer [us]
+HEADER_MIN = const(13000)
+HEADER_MAX = const(14000)
+REPEAT_MIN = const(11000)
+REPEAT_MAX = const(11500)
+ZERO_MIN = const(1000)
+ZERO_MAX = const(1300)
+ONE_MIN = const(2100)
+ONE_MAX = const(2400)
+
+## States of the NEC decoder: waiting for a header, in a bit's mark, and in a
+#  bit's space
+IDLE = const(0)
+MARK = const(1)
+SPACE = const(2)
+
+
+class NecDecoder:
+    '''This class decodes NEC frames from the IR reciever one captured edge
+    at a time. Each edge is handled once, with a few integer compares, so a
+    frame is decoded as its edges arrive rather than after they have all
+    been collected. A frame whose inverted address or command byte isn't the
+    complement of the byte before it is thrown away.
+    '''
+
+    def __init__(self):
+        ''' Initializes the decoder in its idle state
+        '''
+        # the address and command of the last frame, and the number of
+        # repeat codes since then
+        self.address = 0
+        self.command = 0
+        self.repeats = 0
+        # the numbers of frames decoded and of frames lost to bad symbols or
+        # bad complements
+        self.frames = 0
+        self.errors = 0
+
+        # the time of the last edge and the time from the edge before it
+        self.last = 0
+        self.width = 0
+        # the bits of the frame so far, first bit lowest, in two 16 bit words
+        # so the numbers stay small integers
+        self.lo = 0
+        self.word = 0
+        self.bits = 0
+        self.state = IDLE
+
+    def edge(self, time):
+        ''' This method handles one edge from the IR reciever.
+        @param time: time is the timer's 16 bit count at the edge [us]
+        @return: Returns True if the edge finished a frame, whose address and
+            command are then in the address and command attributes
+        '''
+        # find the time since the last edge, allowing for the timer's
+        # overflow, and the time since the edge before that
+        width = (time - self.last) & 0xFFFF
+        self.last = time
+        period = self.width + width
+        self.width = width
+
+        # a header can only end at the start of a mark, so it starts a new
+        # frame whatever the state, even if a noise edge has been taken for
+        # the start of one
+        if period > HEADER_MIN and period < HEADER_MAX:
+            self.word = 0
+            self.bits = 0
+            self.state = MARK
+            return False
+
+        state = self.state
+        if state == MARK:
+            # this edge ends a bit's mark; its period ends at the next edge
+            self.state = SPACE
+        elif state == SPACE:
+            # this edge starts the next mark, so the period gives the bit
+            if period > ZERO_MIN and period < ZERO_MAX:
+                self.word = self.word >> 1
+            elif period > ONE_MIN and period < ONE_MAX:
+                self.word = (self.word >> 1) | 0x8000
+            else:
+                # a bad bit ends the frame
+                self.errors += 1
+                self.state = IDLE
+                return False
+            self.bits += 1
+            self.state = MARK
+            if self.bits == 16:
+                self.lo = self.word
+                self.word = 0
+            elif self.bits == 32:
+                self.state = IDLE
+                # each word holds a byte and then its complement, so the two
+                # bytes of a good word xor to all ones
+                lo = self.lo
+                hi = self.word
+                if ((lo ^ (lo >> 8)) & 0xFF) != 0xFF \
+                        or ((hi ^ (hi >> 8)) & 0xFF) != 0xFF:
+                    self.errors += 1
+                    return False
+                self.address = lo & 0xFF
+                self.command = hi & 0xFF
+                self.repeats = 0
+                self.frames += 1
+                return True
+        elif period > REPEAT_MIN and period < REPEAT_MAX:
+            self.repeats += 1
+        return False
 
 
 class Infared:
     '''This class reads the IR reciever for start and stop signals
     '''
 
-    def __init__(self, pin, timer, channel):
+    def __init__(self, pin, timer, channel, isr_decode=False):
         ''' Initializes the infared receiver
         @param pin: pin is a pyb.Pin.board object
             for the interrupt pin that will detect interrupts
             from the IR reciever
         @param timer: timer is the timer the interrupt pin will use
         @param channel: channel is the channel the timer will use
+        @param isr_decode: isr_decode is boolean, set to True to decode frames
+            in the interrupt, so the task only runs when a new command
+            arrives
         '''
         #----------------------------------------------------------------------#
         # Allocate memory so that exceptions raised in interrupt service
@@ -45,32 +158,117 @@ class Infared:
         # to output counts as microseconds
         tim = pyb.Timer(timer, prescaler=79, period=0xFFFF)
 
-        # set up the timer object to detect rising and fallingedges
-        tim.channel(channel, pyb.Timer.IC, polarity=pyb.Timer.BOTH,
-                    pin=intPin, callback=self.irISR)
-
-        # A queue to be used as a buffer for interrupt timestamp data. Buffer
-        # size is greater than full pulse count to account for repeat codes
-        # that disrupt a full pulse set.
-        self.ir_data = task_share.Queue('I', 200, thread_protect=False,
-                                        overwrite=False, name="ir_data")
-        # Data is a class scoped list that is filled with timestamps
-        # from the ir_data queue
-        self.data = []
+        # the decoder keeps the state of a frame between runs of the task,
+        # or between interrupts, so it can decode whatever edges have arrived
+        self.decoder = NecDecoder()
 
         self.address = task_share.Share('I', thread_protect=False,
                                         name="address")
         self.command = task_share.Share('I', thread_protect=False,
-                                        name="address")
+                                        name="command")
         self.command.put(0)
         self.address.put(0)
-        self.task = cotask.Task(self.readInfaredSensorTask,
-                                name='Infared Reading Task',
-                                priority=5, profile=True, trace=False)
+
+        # the action for each command, set with setAction(), and the action
+        # for the last command. Every command's action is 0 until it is set
+        self.actions = bytearray(256)
+        self.action = task_share.Share('B', thread_protect=False,
+                                       name="action")
+        self.action.put(0)
+
+        # the tasks which only run while the action is IR_RUN, each with a
+        # function called when it is stopped, and the action they were last
+        # told about
+        self.subscribers = []
+        self.lastAction = constant.IR_STOP
+
+        if isr_decode:
+            # the interrupt decodes the frames, so the task only has to
+            # report new commands and no timestamps are queued
+            self.ir_data = None
+            self.task = cotask.Task(self.reportCommandTask,
+                                    name='Infared Reading Task',
+                                    priority=5, profile=True, trace=False,
+                                    stats=50)
+            callback = self.irDecodeISR
+        else:
+            # A queue to be used as a buffer for interrupt timestamp data.
+            # Buffer size is greater than full pulse count to account for
+            # repeat codes that disrupt a full pulse set.
+            # The timestamps are decoded in place in the queue's buffer, so
+            # no copy of them is made. Only the ISR puts data in and only the
+            # task takes it out, so the queue needs no interrupt masking
+            self.ir_data = task_share.SPSCQueue('I', 200, name="ir_data")
+            self.task = cotask.Task(self.readInfaredSensorTask,
+                                    name='Infared Reading Task',
+                                    priority=5, profile=True, trace=False,
+                                    stats=50)
+            # wake the reading task whenever edges arrive
+            self.ir_data.wake(self.task)
+            callback = self.irISR
+
+        # set up the timer object to detect rising and fallingedges. The
+        # channel object is kept so the interrupt needn't look it up, and the
+        # callback is only given once it is kept, as the interrupt can run
+        # as soon as the callback is set. This is done last so that the
+        # interrupt never runs before the queue, the decoder and the task it
+        # uses exist
+        self.timerChannel = tim.channel(channel, pyb.Timer.IC,
+                                        polarity=pyb.Timer.BOTH,
+                                        pin=intPin)
+        self.timerChannel.callback(callback)
 
     def getCommand(self):
         return self.command.get()
 
+    def setAction(self, command, action):
+        ''' This method sets the action taken for a command, so tasks can
+        read the action with getAction() rather than compare commands.
+        @param command: command is the 8 bit command sent by a button
+        @param action: action is the action for the command, from 0 to 255
+        '''
+        self.actions[command] = action
+
+    def getAction(self):
+        ''' This method finds the action for the last command recieved.
+        @return: Returns the action set for the command with setAction()
+        '''
+        return self.action.get()
+
+    def subscribe(self, task, on_stop=None):
+        ''' This method makes a task run only while the last command's action
+        is IR_RUN. The task is suspended until then, uses no time while it is
+        suspended, and is started over from its first state each time a run
+        command arrives. As its generator function is run again from the
+        top, it must not make anything which can only be made once, such as
+        pins, interrupts or shares; make those before the task instead. A
+        stop command suspends it within one pass of the scheduler, as the IR
+        task has the highest priority.
+        @param task: task is the cotask.Task to be run and stopped
+        @param on_stop: on_stop is a function called with no arguments when
+            the task is stopped, such as one which stops the motors
+        '''
+        self.subscribers.append((task, on_stop))
+        if self.lastAction != constant.IR_RUN:
+            task.suspend()
+
+    def publishAction(self):
+        ''' This method tells the subscribed tasks about a change of action.
+        It is called by the IR task rather than the interrupt, as resuming a
+        task allocates memory.
+        '''
+        action = self.action.get()
+        if action == self.lastAction:
+            return
+        self.lastAction = action
+        for task, on_stop in self.subscribers:
+            if action == constant.IR_RUN:
+                task.resume(restart=True)
+            elif not task.suspended():
+                task.suspend()
+                if on_stop is not None:
+                    on_stop()
+
     def irISR(self, timerObject):
         ''' This method is the callback function for the interrupt pin. It runs
         everytime an interrupt is detected and stores the time in microseconds
@@ -79,175 +277,55 @@ class Infared:
         '''
 
         # using the timerObject from the interrupt,collect the timestamp data
-        # from the IR signal.
-
-        if self.ir_data.num_in() >= 68:
-            self.task.go()
-        if not self.ir_data.full():
-            self.ir_data.put(timerObject.channel(self.channel).capture(),
-                             in_ISR=True)
-
-    def formattedBytes(self, rawBits):
-        '''This method interprets a set of 32 bits into bytes
-        @param rawBits: A list of 32 rawBits
-        @return returns a formatted string of the 4 named bytes if successful,
-            returns False if unsuccessful
+        # from the IR signal. If the queue is full the timestamp is dropped
+        # and counted, and the queue wakes the reading task
+        self.ir_data.put(timerObject.channel(self.channel).capture(),
+                         in_ISR=True)
+
+    def irDecodeISR(self, timerObject):
+        ''' This method is the callback function for the interrupt pin when
+        frames are decoded in the interrupt. It passes each edge straight to
+        the decoder, which only does a few integer compares, and wakes the
+        task only when a frame brings a new command, so between button
+        presses the IR reciever costs the scheduler nothing.
         '''
+        decoder = self.decoder
+        if decoder.edge(self.timerChannel.capture()):
+            if decoder.command != self.command.get(in_ISR=True):
+                self.address.put(decoder.address, in_ISR=True)
+                self.command.put(decoder.command, in_ISR=True)
+                self.action.put(self.actions[decoder.command], in_ISR=True)
+                self.task.go()
 
-        def assignBytes(bits, decimal=False):
-            '''This nested function interprets a list of bits and converts them
-            into a formatted binary byte.
-            @param bits: bits is a list of bits
-            @param decimal: decimal is boolean, set to true if the
-                decimal Value is required
-            @return bytes, decimalValue: bytes is a formatted string of bits
-                decimalValue is the decimal value of the byte or bytes
-            '''
-            # initialize decimalValue to 0
-            decimalValue = 0
-
-            # for every bit in rawBits:
-            # perform an or operation on the bit and then add it to the existing
-            # decimalValue
-            # then shift left the decimalValue by index of that bit
-            for n in range(len(bits)):
-                decimalValue |= bits[n] << n
-
-            # convert the decimalValue to a binary string with prefix 0b
-            formattedByte = '{:#010b}'.format(decimalValue)
-
-            # if decimal was specified, return both
-            if decimal == True:
-                return formattedByte, decimalValue
-            # if not, return just the formattedByte
-            else:
-                return formattedByte
-
-        # note that slice position is not index position, see example below
-        #                 +---+---+---+---+---+---+
-        #                 | P | y | t | h | o | n |
-        #                 +---+---+---+---+---+---+
-        # Slice position: 0   1   2   3   4   5   6
-        # Index position:   0   1   2   3   4   5
-        # slice the rawBits list into 4 bytes as follows
-        addressBits = rawBits[0:8]
-        naddressBits = rawBits[8:16]
-        commandBits = rawBits[16:24]
-        ncommandBits = rawBits[24:32]
-
-        # get the formatted Byte and decimcal value if specified
-        rawBytes = assignBytes(rawBits)
-        addressByte, addressByteD = assignBytes(addressBits, True)
-        naddressByte = assignBytes(naddressBits)
-        commandByte, commandByteD = assignBytes(commandBits, True)
-        ncommandByte = assignBytes(ncommandBits)
-
-        return addressByteD, commandByteD
-        # return a formatted string as follows
-        # return ('--------------- New Packet ---------------\n'
-        #         + '  RAW:  ' + rawBytes + '\n'
-        #         + ' ADDR:  ' + addressByte + '\n'
-        #         + 'nADDR:  ' + naddressByte + '\n'
-        #         + '  CMD:  ' + commandByte + '\n'
-        #         + ' nCMD:  ' + ncommandByte + '\n'
-        #         + '\n'
-        #         + 'Address (Decimal):  ' + str(addressByteD) + '\n'
-        #         + 'Command (Decimal):  ' + str(commandByteD) + '\n'
-        #         + '------------------------------------------')
-
-    def translateRawIRdata(self):
-        ''' This nested function interprets the raw data and determines
-        pulse widths. These pulse widths are appended to the rawBits list.
-        Note: The data list must be initialized before calling this
-            function
-        @return: Returns rawBits as a list of 32 bits if successful,
-            returns False if unsuccessful
+    def readInfaredSensorTask(self):
+        ''' This method passes the timestamps stored in the queue to the
+        decoder, in place, and publishes the address and command of each
+        frame as soon as its last bit has been decoded.
         '''
 
-        # grab the data list from the class scope and assign to rawData
-        # this is done to preserve the data list incase it needs to be
-        # mutated
-        rawData = self.data
-
-        # initialize rawBits list
-        rawBits = []
-
-        # find the difference between falling edges
-        for i in range(0, len(rawData) - 2, 2):
-            delta = rawData[i+2] - rawData[i]
-            # adjust data if overflowed
-            if delta < 0:
-                delta = delta + 65535
-            if delta > 13000 and delta < 14000:
-                pass
-            # check if binary low
-            elif delta < 1300 and delta > 1000:
-                rawBits.append(0)
-            # check if binary high
-            elif delta > 2100 and delta < 2400:
-                rawBits.append(1)
-            else:
-                # if somehow neither, clear the rawBits list
-                # and set start flag to False then fall out to
-                # next if statement
-                print('not a valid bit. Delta = ' + str(delta))
-                self.clearData()
-                break
-
-            # if we have a full set of bits, clear the data list
-            # and return the rawBits list
-            if len(rawBits) == 32:
-                self.clearData()
-                return rawBits
-
-        return False
-
-    def clearData(self):
-        self.data = []
-
-    def appendData(self):
-        self.data.append(self.ir_data.get())
+        decoder = self.decoder
+        while True:
+            views = self.ir_data.views()
+            for view in views:
+                for time in view:
+                    if decoder.edge(time):
+                        # a held button repeats its frame, which is only
+                        # printed when the command changes
+                        if decoder.command != self.command.get():
+                            print('command' + str(decoder.command))
+                        self.address.put(decoder.address)
+                        self.command.put(decoder.command)
+                        self.action.put(self.actions[decoder.command])
+                        self.publishAction()
+            self.ir_data.consume(len(views[0]) + len(views[1]))
+            yield(0)
 
-    def readInfaredSensorTask(self):
-        ''' This method reads the data stored in the queue and runs the
-        interpretIRdata function when a true full set of pulses is found.
+    def reportCommandTask(self):
+        ''' This method is the task used when frames are decoded in the
+        interrupt. It only runs when the interrupt has found a new command.
         '''
 
-        self.clearData()
-        # Initialization for this task.
         while True:
-            # while len(self.data) < 68:
-            # append timestamps to the data list until it has 68
-            # timestamps
-            while len(self.data) < 3:
-                self.appendData()
-            if len(self.data) == 3:
-                pulse = 0
-                for i in range(0, 2):
-                    delta = self.data[i+1] - self.data[i]
-                    # adjust data if overflowed
-                    if delta < 0:
-                        delta = delta + 65535
-                    # print('fun' + str(delta))
-                    pulse += delta
-                if pulse > 13000 and pulse < 14000:
-                    # print('start' + str(delta))
-                    while len(self.data) < 68:
-                        self.appendData()
-                    # print(self.data)
-                    translatedData = self.translateRawIRdata()
-                    address, command = self.formattedBytes(translatedData)
-                    self.address.put(address)
-                    self.command.put(command)
-                    print('command' + str(command))
-
-                    self.clearData()
-                    yield(0)
-                elif pulse > 11000 and pulse < 11500:
-                    # print('repeat' + str(delta))
-                    self.appendData()
-                    self.clearData()
-                else:
-                    print('bad pulse ' + str(pulse))
-                    del self.data[0:1]
+            self.publishAction()
+            print('command' + str(self.command.get()))
             yield(0)
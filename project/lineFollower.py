@@ -10,9 +10,42 @@ line present (dark/not reflective)
 @date Sat Feb  22 10:59:12 2017
 """
 
+import array
+import math
+from micropython import const  # pylint: disable=import-error
+import pyb  # pylint: disable=import-error
 import pins
 import utime  # pylint: disable=import-error
 
+## Time the sensors' capacitors are charged for before they are read [us]
+CHARGE_TIME = const(10)
+
+## Brightness below which a sensor is taken to see nothing, out of 1000
+NOISE = const(200)
+
+## Brightness at or above which a sensor is taken to see the line, out of
+#  1000
+THRESHOLD = const(500)
+
+## Least spread of discharge times a sensor must have seen while calibrating
+#  for its calibration to be used [us]
+MIN_SPAN = const(200)
+
+## Distance between neighbouring sensors and from the wheel axle forward to
+#  the sensors [mm]; set these to the bot's layout
+SENSOR_PITCH = const(10)
+SENSOR_OFFSET = const(60)
+
+## Scale of the tangents in TAN_TABLE, so that a tangent of 1 is TAN_ONE
+TAN_ONE = const(4096)
+
+## The tangent of each whole degree from 0 to 89, times TAN_ONE and rounded
+#  up, so that the angle to the line is found with integers alone. It is
+#  worked out once, as the module is imported
+TAN_TABLE = array.array('I', [int(math.ceil(math.tan(math.radians(degree))
+                                            * TAN_ONE))
+                              for degree in range(90)])
+
 
 class LineFollower:
     '''This class detects when a white line is present on a black surface and
@@ -25,9 +58,9 @@ class LineFollower:
         @ param enablePin: enablePin is the pin used to control the power
             supplied to the sensors
         @ param pinArray: pinArray is an array of pyb.Pin.board pin objects
-            that are mapped to the sensors. The first item in the array being
-            the far left sensor and the last item being the far right
-            sensor.
+            that are mapped to the sensors, in order across the bot.
+            analyzeSensorData() takes the first half of the sensors to be on
+            the right of the bot and the second half to be on the left.
         @param waitTime: waitTime is the time in us that the robot will check
             the input of the sensor pin after driving it high. See this
             website for more details: https://www.pololu.com/product/1419
@@ -37,82 +70,223 @@ class LineFollower:
         # sent to this pin in order to turn the array of sensors on
         self.qrtEnable = pins.output(enablePin)
 
-        # qrtArray is the array of pyb.Pin.board objects that correlate with
-        # the physical array of sensors.
-        self.qrtArray = pinArray
+        # qrtArray is the array of pyb.Pin objects that correlate with the
+        # physical array of sensors. They are made once here and switched
+        # between output and input on each read.
+        self.qrtArray = [pins.output(pin) for pin in pinArray]
 
         # the time in us that the robot will check
         # the input of the sensor pin after driving it high. See this
         # website for more details: https: // www.pololu.com/product/1419
         self.waitTime = waitTime
 
-    def getSensorOutput(self):
-        '''This method reads the array of sensors and returns an array of
-        binary numbers, 1s representing a non-reflective object and 0s
-        representing a reflective object(line).'''
-
-        def runSensors(sensorArray):
-            '''This nested function runs the sensors by setting them as output
-            pins and driving the pins high. It then sets the pins as inputs and
-            appends the pin objects to a list.
-
-            @param sensorArray: sensorArray is the QRTsensor array
-            @return inputArray the array of input pins
-            '''
-
-            inputArray = []
-            for n in range(len(sensorArray)):
-                pin = pins.output(sensorArray[n])
-                sensorArray[n].high()
-                pin = pins.input(sensorArray[n])
-                inputArray.append(pin)
-            return inputArray
-
-        def readsensors(inputArray, waitTime):
-            '''This nested function runs the sensors by setting them as output
-            pins and driving the pins high. It then sets the pins as inputs and
-            appends the pin objects to a list.
-
-            @param sensorArray: sensorArray is the QRTsensor array
-            @param waitTime: waitTime is the time in us that the function should
-                wait for after running
-            @return inputArray the array of input pins
-            '''
-
-            sensorOutput = []
-
-            for n in range(len(inputArray)):
-                sensorOutput.append(inputArray[n].value())
-                # wait for the specified wait time after all of the sesnors
-                # have been analyzed
-                if n == len(inputArray):
-                    utime.sleep_us(waitTime)
-            return sensorOutput
+        # dischargeTimes holds the time in us each sensor took to discharge on
+        # the last read, up to waitTime, and sensorOutput holds 1 for each
+        # sensor which saw the dark surface. Both are reused by every read
+        # so that reading the sensors allocates no memory.
+        self.dischargeTimes = array.array('H', [0] * len(pinArray))
+        self.sensorOutput = bytearray(len(pinArray))
+
+        # values holds how bright each sensor saw the surface on the last
+        # read, from 0 (black) to 1000 (white)
+        self.values = array.array('H', [0] * len(pinArray))
+
+        # calMin and calMax hold the shortest and longest discharge time each
+        # sensor has seen while calibrating [us], which are its times over
+        # white and over black
+        self.calMin = array.array('H', [0] * len(pinArray))
+        self.calMax = array.array('H', [0] * len(pinArray))
+        self.resetCalibration()
+
+        # the line estimate from the last read: position is the centroid of
+        # the brightness across the sensors, from -500 * (sensors - 1) on the
+        # left to 500 * (sensors - 1) on the right, coverage is the average
+        # brightness out of 1000, and angle is the bearing of the centroid
+        # from the middle of the axle in degrees, positive to the right
+        self.position = 0
+        self.coverage = 0
+        self.angle = 0
+
+    def readSensors(self):
+        '''This method times the discharge of every sensor into
+        dischargeTimes. All of the sensors are charged together and their
+        discharge is timed in a single polling loop, which ends when every
+        sensor has discharged or waitTime has passed; a sensor still charged
+        then is given waitTime.
+        '''
+        qrtArray = self.qrtArray
+        times = self.dischargeTimes
+        waitTime = self.waitTime
 
         # provide power to the sensor array
         self.qrtEnable.high()
 
-        # set pins high and then reset to input
-        inputArray = runSensors(self.qrtArray)
+        # charge every sensor's capacitor, then let them all discharge
+        for pin in qrtArray:
+            pin.init(pyb.Pin.OUT_PP)
+            pin.high()
+        pyb.udelay(CHARGE_TIME)
+        for pin in qrtArray:
+            pin.init(pyb.Pin.IN)
+        start = utime.ticks_us()
 
-        # read values from sensors and store in a list
-        sensorOutput = readsensors(inputArray, self.waitTime)
+        # pending has a bit set for each sensor which is still charged
+        pending = (1 << len(qrtArray)) - 1
+        elapsed = 0
+        while pending and elapsed < waitTime:
+            elapsed = utime.ticks_diff(utime.ticks_us(), start)
+            for n in range(len(qrtArray)):
+                if pending & (1 << n) and not qrtArray[n].value():
+                    pending &= ~(1 << n)
+                    times[n] = elapsed
+        for n in range(len(qrtArray)):
+            if pending & (1 << n):
+                times[n] = waitTime
 
         # kill power to the array
         self.qrtEnable.low()
 
-        return sensorOutput
+    def resetCalibration(self):
+        '''This method forgets what the sensors have seen while calibrating,
+        so that each is scaled from 0 to waitTime until it is calibrated
+        again.
+        '''
+        for n in range(len(self.calMin)):
+            self.calMin[n] = self.waitTime
+            self.calMax[n] = 0
+
+    def updateCalibration(self):
+        '''This method widens each sensor's calibration to take in the
+        discharge times of the last read.
+
+        @return the number of sensors which have now seen both surfaces
+        '''
+        times = self.dischargeTimes
+        calMin = self.calMin
+        calMax = self.calMax
+        calibrated = 0
+        for n in range(len(times)):
+            if times[n] < calMin[n]:
+                calMin[n] = times[n]
+            if times[n] > calMax[n]:
+                calMax[n] = times[n]
+            if calMax[n] - calMin[n] >= MIN_SPAN:
+                calibrated += 1
+        return calibrated
+
+    def calibrate(self):
+        '''This method reads the sensors and adds the read to their
+        calibration. It is called over and over while the sensors are swept
+        across both the black surface and the white line.
+
+        @return the number of sensors which have now seen both surfaces
+        '''
+        self.readSensors()
+        return self.updateCalibration()
+
+    def normalize(self):
+        '''This method scales the discharge times of the last read to each
+        sensor's calibration, giving its brightness from 0 (its time over
+        black) to 1000 (its time over white) in values. A sensor sees the
+        dark surface if it is below half brightness, so each sensor has a
+        threshold of its own. A sensor which hasn't seen both surfaces is
+        scaled from 0 to waitTime.
+        '''
+        times = self.dischargeTimes
+        values = self.values
+        output = self.sensorOutput
+        calMin = self.calMin
+        calMax = self.calMax
+        for n in range(len(times)):
+            low = calMin[n]
+            high = calMax[n]
+            if high - low < MIN_SPAN:
+                low = 0
+                high = self.waitTime
+            time = times[n]
+            if time <= low:
+                value = 1000
+            elif time >= high:
+                value = 0
+            else:
+                value = (high - time) * 1000 // (high - low)
+            values[n] = value
+            output[n] = 1 if value < THRESHOLD else 0
+
+    def getSensorOutput(self):
+        '''This method reads the array of sensors and returns an array of
+        binary numbers, 1s representing a non-reflective object and 0s
+        representing a reflective object(line).
+
+        @return sensorOutput, which is overwritten by the next read
+        '''
+        self.readSensors()
+        self.normalize()
+        return self.sensorOutput
+
+    def estimateLine(self):
+        '''This method finds the position of the line under the sensors from
+        the brightness values of the last read, as a weighted centroid.
+        Sensors seeing less than NOISE are left out. If no sensor sees the
+        line the position and angle are 0.
+
+        @return position, which is also left in the position attribute
+        '''
+        values = self.values
+        count = len(values)
+
+        # sensor n is at 500 * (count - 1) - 1000 * n, so the first is on
+        # the right
+        total = 0
+        moment = 0
+        place = 500 * (count - 1)
+        for n in range(count):
+            value = values[n]
+            if value >= NOISE:
+                total += value
+                moment += value * place
+            place -= 1000
+
+        self.coverage = total // count
+        if total:
+            self.position = moment // total
+
+            # the angle is the most degrees whose tangent is no more than the
+            # line's offset over SENSOR_OFFSET, found by a binary search of
+            # TAN_TABLE so that no floats are made on each read
+            offset = self.position if self.position >= 0 else -self.position
+            ratio = offset * SENSOR_PITCH * TAN_ONE // (1000 * SENSOR_OFFSET)
+            low = 0
+            high = len(TAN_TABLE)
+            while high - low > 1:
+                middle = (low + high) >> 1
+                if TAN_TABLE[middle] <= ratio:
+                    low = middle
+                else:
+                    high = middle
+            self.angle = low if self.position >= 0 else -low
+        else:
+            self.position = 0
+            self.angle = 0
+        return self.position
 
     def analyzeSensorData(self):
+        '''This method reads the sensors, updates the line estimate and
+        decides whether the bot must turn away from the edge.
+
+        @return 0 to drive on, 1 to turn right, 2 to turn left or 3 to turn
+            around
+        '''
         data = self.getSensorOutput()
+        self.estimateLine()
         leftSum = 0
         rightSum = 0
         left = False
         right = False
-        for i in data[0:3]:
-            rightSum += i
-        for i in data[3:6]:
-            leftSum += i
+        for i in range(0, 3):
+            rightSum += data[i]
+        for i in range(3, 6):
+            leftSum += data[i]
 
         turn = 0
         if leftSum <= 1:
@@ -10,6 +10,8 @@ import constant as C
 import motors as M
 import lineFollower
 import ultrasonic
+import ultrasonicArray
+import rangeFilter
 import infared
 import gc
 
@@ -22,17 +24,38 @@ M1 = M.MotorDriver(P.M1DIR, P.M1PWM, C.MOT1_PWM_TIMER,
                    C.MOT1_PWM_CH, C.MOT_FREQ, True)
 M2 = M.MotorDriver(P.M2DIR, P.M2PWM, C.MOT2_PWM_TIMER,
                    C.MOT2_PWM_CH, C.MOT_FREQ, False)
-MC1 = M.MotorController()
-MC2 = M.MotorController()
+MC1 = M.PIDController()
+MC2 = M.PIDController()
 ENC1 = M.Encoder(P.ENC1A, C.ENC1A_CH,
                  P.ENC1B, C.ENC1B_CH, C.ENC1_TIMER, True)
 ENC2 = M.Encoder(P.ENC2A, C.ENC2A_CH,
                  P.ENC2B, C.ENC2B_CH, C.ENC2_TIMER)
 
-IR = infared.Infared(P.IR, C.IR_TIMER, C.IR_CH)
+IR = infared.Infared(P.IR, C.IR_TIMER, C.IR_CH, isr_decode=True)
+# START makes the bot run and every other button stops it
+IR.setAction(C.START, C.IR_RUN)
 
 DRIVE = M.Drive(M1, M2, ENC1, ENC2, MC1, MC2)
 
+# the front and rear sensors face away from each other so they fire
+# together, then the right and left ones do. Like the line follower, the
+# sensors are made here rather than in their task, which is started over
+# each time the bot is started
+US_1 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_1, P.US_DIST_ECHO_1,
+                             ultrasonicArray.TIMEOUT_US)
+US_2 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_2, P.US_DIST_ECHO_2,
+                             ultrasonicArray.TIMEOUT_US)
+US_3 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_3, P.US_DIST_ECHO_3,
+                             ultrasonicArray.TIMEOUT_US)
+US_4 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_4, P.US_DIST_ECHO_4,
+                             ultrasonicArray.TIMEOUT_US)
+SONAR = ultrasonicArray.UltrasonicArray(((US_2, US_1), (US_3, US_4)))
+
+# a sensor still charged 1 ms after charging is over the dark surface; over
+# the white line they discharge in a few hundred us. The line follower is
+# made here so that its calibration outlasts restarts of its task
+LF = lineFollower.LineFollower(P.QRT_EN, P.QRT_ARRAY, 1000)
+
 
 run = task_share.Share('I', thread_protect=False, name="run")
 
@@ -58,20 +81,39 @@ us_current_prox = task_share.Share(
     'I', thread_protect=False, name="current proximity")
 us_current_prox.put(0)
 
+# the line follower's estimate of where the line is under the bot, updated
+# on every read; see lineFollower.LineFollower.estimateLine()
+line_position = task_share.Share('i', thread_protect=False,
+                                 name="line position")
+line_position.put(0)
+line_coverage = task_share.Share('I', thread_protect=False,
+                                 name="line coverage")
+line_coverage.put(0)
+line_angle = task_share.Share('i', thread_protect=False, name="line angle")
+line_angle.put(0)
+
+# the ultrasonic directions in snapshot order, numbered from 1 as in
+# us_current_dir, and the filter and the levels for each direction's
+# distances. Like the sensors, they are made here rather than in the
+# ultrasonic task, which is started over each time the bot is started
+US_DIRECTIONS = (('front', us_front), ('rear', us_rear),
+                 ('right', us_right), ('left', us_left))
+US_FILTERS = [rangeFilter.RangeFilter() for _ in US_DIRECTIONS]
+US_LEVELS = [rangeFilter.ProximityLevel() for _ in US_DIRECTIONS]
+
+# line_position at the far edge of the line sensors
+LINE_SPAN = 500 * (len(P.QRT_ARRAY) - 1)
+
 
 def driveTask():
 
     FORWARD = const(1)
     REVERSE = const(2)
     TURN = const(3)
-    STOP = const(4)
-
-    def eStop(state):
-        if IR.getCommand() != C.START:
-            state = STOP
-        return state
 
-    state = STOP
+    # the IR receiver suspends this task and stops the motors when the bot is
+    # stopped, and starts it over driving forward when the bot is started
+    state = FORWARD
     while True:
         if state == FORWARD:
             if turn.get() >= 1 and turn.get() <= 3:
@@ -83,15 +125,15 @@ def driveTask():
                 turning.put(1)
                 yield(state)
 
-            DRIVE.forward(20)
-            state = eStop(state)
+            # steer away from a line which is only under some of the sensors
+            # in proportion to how far off centre it is
+            DRIVE.forward(20, line_position.get() * C.LINE_STEER // LINE_SPAN)
             yield(state)
 
         elif state == REVERSE:
 
             if DRIVE.reverseBeforeTurn():
                 state = TURN
-            state = eStop(state)
             yield(state)
 
         elif state == TURN:
@@ -100,45 +142,53 @@ def driveTask():
                 state = FORWARD
                 turning.put(0)
                 turn.put(0)
-            state = eStop(state)
-            yield(state)
-
-        elif state == STOP:
-            if IR.getCommand() == C.START:
-                state = FORWARD
-            DRIVE.stop()
             yield(state)
 
         yield(state)
 
 
-def lineFollowerTask():
-    LF = lineFollower.LineFollower(P.QRT_EN, P.QRT_ARRAY, 10)
+def calibrationTask():
+    '''Calibrates the line sensors from power up until the bot is started.
+    Slide the bot by hand across the white border of the ring and back
+    before pressing START, so that every sensor sees both surfaces. The task
+    then suspends itself for good.'''
+
+    CALIBRATE = const(1)
+    DONE = const(2)
+
+    state = CALIBRATE
+    while True:
+        if state == CALIBRATE:
+            if IR.getAction() == C.IR_RUN:
+                print('line sensors calibrated: '
+                      + str(LF.updateCalibration()))
+                state = DONE
+            else:
+                LF.calibrate()
+            yield(state)
 
-    def eStop(state):
-        if IR.getCommand() != C.START:
-            state = OFF
-        return state
+        if state == DONE:
+            CAL_TASK.suspend()
+            yield(state)
 
-    OFF = const(0)
+
+def lineFollowerTask():
     ANALYZE = const(1)
 
-    state = OFF
+    # the IR receiver suspends this task while the bot is stopped
+    state = ANALYZE
     while True:
         if state == ANALYZE:
             sensorData = LF.analyzeSensorData()
+            line_position.put(LF.position)
+            line_coverage.put(LF.coverage)
+            line_angle.put(LF.angle)
             print('sensor: ' + str(sensorData))
             if turning.get() == 0:
                 turn.put(sensorData)
 
-            state = eStop(state)
             yield(state)
 
-        if state == OFF:
-            if IR.getCommand() == C.START:
-                state = ANALYZE
-            yield (state)
-
         yield(state)
 
 
@@ -146,74 +196,43 @@ def ultraSonicDistanceTask():
     '''Is a bot too close? Run away. Is a bot almost too close? Run away. Can
     you see the bot? Run away. Running away is our bots survival tactic. If an
     enemy bot is detected within a 2 foot square area, our bot will turn an
-    appropriate direction and continue running. The sensors are checked
-    in order, so the front and rear sensors must be checked first. The sensors
-    are sensitive, if anything is detected further than 30 inches away it is 
-    disregarded and the bot can run on.'''
-
-    US_1 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_1, P.US_DIST_ECHO_1)
-    US_2 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_2, P.US_DIST_ECHO_2)
-    US_3 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_3, P.US_DIST_ECHO_3)
-    US_4 = ultrasonic.Ultrasonic(P.US_DIST_TRIG_4, P.US_DIST_ECHO_4)
-
-    OFF1 = const(0)  # pylint: disable=undefined-variable
-    ANALYZE_US = const(1)
-    ANALYZE_FRONT = const(2)
-    ANALYZE_REAR = const(3)
-    ANALYZE_RIGHT = const(4)
-    ANALYZE_LEFT = const(5)
-    ANALYZE_BOT = const(6)
-    DONT_ANALYZE_US = const(7)
-
-    state = OFF1
-
-    def eStop(state):
-        if IR.getCommand() != C.START:
-            state = OFF1
-        return state
-
-    def checkForTurning(state):
-        if turning.get() != 0:
-            state = DONT_ANALYZE_US
-        return state
-
-    def checkSensor(state, direction, last_dir, last_prox):
-        if direction == 'front':
-            uSensor = US_2
-            share = us_front
-        elif direction == 'left':
-            uSensor = US_4
-            share = us_left
-        elif direction == 'right':
-            uSensor = US_3
-            share = us_right
-        elif direction == 'rear':
-            uSensor = US_1
-            share = us_rear
-
-        distance = uSensor.distance_in_inches()
-
-        if distance < 6:
-            level = 1
-            share.put(level)
-        elif distance > 6 and distance < 18:
-            level = 2
-            share.put(level)
-        elif distance > 18 and distance < 24:
-            level = 3
-            share.put(level)
-        elif distance > 24 and distance < 30:
-            level = 4
-            share.put(level)
-        elif distance > 30:
-            level = 5
-            share.put(level)
+    appropriate direction and continue running. All four sensors range
+    together, and each time they finish a snapshot of every direction the
+    closest bot is found, ties going to the later of front, rear, right and
+    left. The sensors are sensitive, if anything is detected further than 30
+    inches away it is disregarded and the bot can run on. A lone bad echo
+    is filtered out so it can't set off a turn.'''
+
+    ANALYZE_US = const(1)  # pylint: disable=undefined-variable
+    DONT_ANALYZE_US = const(2)
+
+    # the IR receiver suspends this task while the bot is stopped, and
+    # starts it over when the bot is started, so the distances seen before
+    # the bot was stopped are forgotten
+    state = ANALYZE_US
+    directions = US_DIRECTIONS
+    filters = US_FILTERS
+    levels = US_LEVELS
+    for index in range(len(directions)):
+        filters[index].reset()
+        levels[index].reset()
+
+    def checkSensor(index, last_dir, last_prox):
+        direction, share = directions[index]
+        distance = filters[index].update(SONAR.tenths(index))
+
+        # a level is only found once the filter holds a whole window, so a
+        # bad echo just after START can't set off a turn
+        if filters[index].full():
+            share.put(levels[index].update(distance))
+        else:
+            share.put(levels[index].level)
 
         print(str('us ') + direction + ': ' + str(share.get()))
         print(str('us ') + direction + ': ' + str(distance))
 
         if share.get() != 5:
-            curr_dir = state - 1
+            curr_dir = index + 1
             curr_prox = share.get()
             if last_prox < curr_prox:
                 curr_prox = last_prox
@@ -224,76 +243,40 @@ def ultraSonicDistanceTask():
             curr_prox = last_prox
             curr_dir = last_dir
 
-        last_prox = curr_prox
-        last_dir = curr_dir
-
-        state = state + 1
-        state = checkForTurning(state)
-        state = eStop(state)
-        return curr_dir, curr_prox, last_dir, last_prox, state
+        return curr_dir, curr_prox
 
     while True:
 
-        if state == ANALYZE_US:
-
-            state = ANALYZE_FRONT
-            last_prox = 5
-            last_dir = 1
+        # the sensors keep ranging while the bot turns so that a fresh
+        # snapshot is ready when it is done
+        snapshot = SONAR.update()
 
-            state = checkForTurning(state)
-            state = eStop(state)
-            yield(state)
-
-        if state == ANALYZE_FRONT:
-
-            curr_dir, curr_prox, last_dir, last_prox, state = \
-                checkSensor(state, 'front', last_dir, last_prox)
-            yield(state)
-
-        if state == ANALYZE_REAR:
-            # REAR US SENSOR
-            # for a bot in closing position from the rear, turn 90 degrees and drive away
-            curr_dir, curr_prox, last_dir, last_prox, state = \
-                checkSensor(state, 'rear', last_dir, last_prox)
-            yield(state)
-
-        if state == ANALYZE_RIGHT:
-            # RIGHT US SENSOR
-            # for a bot in closing position from the right
-
-            curr_dir, curr_prox, last_dir, last_prox, state = \
-                checkSensor(state, 'right', last_dir, last_prox)
-            yield(state)
-
-        if state == ANALYZE_LEFT:
-
-            # ## LEFT US SENSOR
-            # for a bot in closing position from the left
-            curr_dir, curr_prox, last_dir, last_prox, state = \
-                checkSensor(state, 'left', last_dir, last_prox)
-
-            yield(state)
-
-        if state == ANALYZE_BOT:
-            print('analyze bot')
-
-            print(curr_dir)
-            print(curr_prox)
-            us_current_dir.put(curr_dir)
-            us_current_prox.put(curr_prox)
-
-            if curr_prox == 1:
-                if curr_dir == 1:  # front
-                    turn.put(2)
-                elif curr_dir == 2:  # back
-                    turn.put(4)
-                elif curr_dir == 3:  # right
-                    turn.put(1)
-                elif curr_dir == 4:  # left
-                    turn.put(1)
-
-            state = ANALYZE_US
-            eStop(state)
+        if state == ANALYZE_US:
+            if snapshot:
+                print('analyze bot')
+                curr_prox = 5
+                curr_dir = 1
+                for index in range(len(directions)):
+                    curr_dir, curr_prox = checkSensor(index, curr_dir,
+                                                      curr_prox)
+
+                print(curr_dir)
+                print(curr_prox)
+                us_current_dir.put(curr_dir)
+                us_current_prox.put(curr_prox)
+
+                if curr_prox == 1:
+                    if curr_dir == 1:  # front
+                        turn.put(2)
+                    elif curr_dir == 2:  # back
+                        turn.put(4)
+                    elif curr_dir == 3:  # right
+                        turn.put(1)
+                    elif curr_dir == 4:  # left
+                        turn.put(1)
+
+            if turning.get() != 0:
+                state = DONT_ANALYZE_US
             yield(state)
 
         if state == DONT_ANALYZE_US:
@@ -301,11 +284,6 @@ def ultraSonicDistanceTask():
                 state = ANALYZE_US
             yield(state)
 
-        if state == OFF1:
-            if IR.getCommand() == C.START:
-                state = ANALYZE_US
-            yield(state)
-
 
 if __name__ == "__main__":
 
@@ -313,24 +291,44 @@ if __name__ == "__main__":
         print('\033[2JTesting scheduler in cotask.py\n')
 
         # intitialize motor task 1 using Task()
+        # the periodic tasks skip any runs they miss when the processor is
+        # overloaded so that the control loops keep a steady rate
         t1 = cotask.Task(driveTask, name='Drive Task', priority=1,
-                         period=10, profile=True, trace=False)
+                         period=10, profile=True, trace=False, stats=50,
+                         overrun=cotask.SKIP)
 
         t2 = cotask.Task(lineFollowerTask, name='Line Follower Task',
-                         priority=1, period=50, profile=True, trace=False)
+                         priority=1, period=50, profile=True, trace=False,
+                         overrun=cotask.SKIP)
+        # the ultrasonic task fires a group of sensors on each run, so it
+        # finishes a snapshot of all four directions every 50 ms
         t3 = cotask.Task(ultraSonicDistanceTask, name='UltraSonic Distance Task',
-                         priority=2, period=50, profile=True, trace=False)
+                         priority=2, period=25, profile=True, trace=False,
+                         overrun=cotask.SKIP)
+
+        # the calibration task reads the line sensors until the bot is
+        # started
+        CAL_TASK = cotask.Task(calibrationTask, name='Calibration Task',
+                               priority=1, period=10, profile=True,
+                               trace=False, overrun=cotask.SKIP)
 
         # add each task to the task list
         cotask.task_list.append(t1)
         cotask.task_list.append(t2)
         cotask.task_list.append(t3)
+        cotask.task_list.append(CAL_TASK)
         cotask.task_list.append(IR.task)
 
+        # the drive, line follower and ultrasonic tasks only run after START
+        # is pressed, and any other button stops them and the motors
+        IR.subscribe(t1, DRIVE.stop)
+        IR.subscribe(t2)
+        IR.subscribe(t3)
+
         # execute the task list using the priority attribute of each task
 
-        while True:
-            cotask.task_list.pri_sched()
+        # sleep between task runs rather than spinning
+        cotask.task_list.run_forever()
 
         # Run the memory garbage collector to ensure memory is as defragmented as possible before the real-time scheduler is started
         gc.collect()
@@ -7,10 +7,29 @@ lab project.
 @author Jacob Randall and Connor Bush
 @date Sat Feb  22 10:59:12 2017
 """
+import array
+from micropython import const  # pylint: disable=import-error
 import pyb  # pylint: disable=import-error
 import utime  # pylint: disable=import-error
+import accumulator
 import constant
-import math
+
+## Number of readings the encoder keeps to find the velocity
+HISTORY = const(8)
+
+## Change in count over which the velocity is found from the count and the
+#  time of the readings; a motor which turns less than this over the whole
+#  history is timed from one change of the count to another
+FAST_COUNTS = const(16)
+
+## Greatest error [ticks] at which PIDController takes the motor to have
+#  reached its setpoint, once it has stopped
+TOLERANCE = const(5)
+
+## Greatest movement [ticks] in one run of PIDController at which it takes
+#  the motor to have stopped, as a motor held against friction near its
+#  setpoint still creeps by a tick now and then
+SETTLE = const(1)
 
 
 class Drive:
@@ -24,8 +43,8 @@ class Drive:
         @param M2: the MotorDriver object for M2
         @param ENC1: the MotorDriver object for 1
         @param ENC2: the MotorDriver object for 2
-        @param MC1: the motorController object for M1
-        @param MC2: the motorController object for M2
+        @param MC1: the MotorController or PIDController object for M1
+        @param MC2: the MotorController or PIDController object for M2
         '''
 
         self.M1 = M1
@@ -34,8 +53,6 @@ class Drive:
         self.ENC2 = ENC2
         self.MC1 = MC1
         self.MC2 = MC2
-        self.MC1.setKp(constant.KP)
-        self.MC2.setKp(constant.KP)
 
         self.zero = True
 
@@ -94,9 +111,16 @@ class Drive:
         #     print('MC2 err: ' + str(self.MC2.getErrorValue()))
         return False
 
-    def forward(self, level):
-        self.M1.set_duty_cycle(level, 1)
-        self.M2.set_duty_cycle(level, 1)
+    def forward(self, level, steer=0):
+        '''This method drives both motors forward.
+
+        @param level: level is the duty cycle [%] of both motors
+        @param steer: steer is the duty cycle [%] added to the right motor
+            (M1) and taken from the left motor (M2), so that a positive steer
+            turns the bot left and a negative one turns it right
+        '''
+        self.M1.set_duty_cycle(min(100, max(0, level + steer)), 1)
+        self.M2.set_duty_cycle(min(100, max(0, level - steer)), 1)
         # self.read()
 
     def reverse(self, level):
@@ -107,6 +131,9 @@ class Drive:
         self.M1.set_duty_cycle(0, 1)
         self.M2.set_duty_cycle(0, 1)
 
+        # a reverse or turn cut short is started over from new setpoints
+        self.zero = True
+
 
 class MotorController:
     ''' This class controlls the motor using closed-loop proportional only control.
@@ -120,7 +147,7 @@ class MotorController:
         # Kp is the proportional gain for the controller and is defined
         # class Controller is called
 
-        self.Kp = 1
+        self.Kp = constant.KP
 
         # setpoint is the desired value for the motor, in this case
         # it is the desired encoder position. Setpoint is defined
@@ -179,6 +206,136 @@ class MotorController:
         self.Kp = Kp
 
 
+class PIDController:
+    ''' This class controlls the motor using closed-loop
+    proportional-integral-derivative control. It can be used in place of
+    MotorController.
+    '''
+
+    def __init__(self, Kp=constant.PID_KP, Ki=constant.PID_KI,
+                 Kd=constant.PID_KD, fixed=True):
+        ''' This method initializes the controller with the constants needed
+        for closed loop control. The gains are per run of the controller,
+        which should be run at a steady rate.
+
+        @param Kp: Kp is the proportional gain [% duty per tick of error]
+        @param Ki: Ki is the integral gain [% duty per tick of error per run]
+        @param Kd: Kd is the derivative gain [% duty per tick moved per run]
+        @param fixed: fixed is a boolean, True means work in integers, in
+            256ths of a percent of duty, so that running the controller
+            allocates no floats
+        '''
+        self.fixed = fixed
+
+        # scale is the number of units of the gains and the integral in a
+        # percent of duty, and limit is the greatest duty in those units
+        self.scale = 256 if fixed else 1
+        self.limit = 100 * self.scale
+        self.setGains(Kp, Ki, Kd)
+
+        # setpoint is the desired encoder position
+        self.setpoint = 0
+        self.error = 0
+
+        # integral is the sum of Ki times the error over each run, in duty
+        # units, and lastPosition is the position at the last run, or None
+        # until the controller has run since the setpoint was set
+        self.integral = 0
+        self.lastPosition = None
+        self.moved = 0
+
+    def getError(self):
+        ''' This method checks whether the motor has reached its setpoint.
+        @return: Returns True if the motor is within TOLERANCE ticks of the
+            setpoint and moved no more than SETTLE ticks since the last run
+        '''
+        return abs(self.error) <= TOLERANCE and abs(self.moved) <= SETTLE
+
+    def getErrorValue(self):
+        return self.error
+
+    def outputDutyCycle(self, position):
+        ''' This method runs the control algorithm and returns the duty cycle
+        to send to the motor.
+        @param position: position is the current encoder position
+        @return: Returns the duty cycle [%], from 0 to 100, and the direction,
+            1 for forward or -1 for backwards
+        '''
+        error = self.setpoint - position
+
+        # the integral is dropped when the motor passes the setpoint, so what
+        # it built up on the way there doesn't hold the motor past it while
+        # it is worked off
+        if (error > 0 and self.error < 0) or (error < 0 and self.error > 0):
+            self.integral = 0
+        self.error = error
+
+        # the derivative is taken of the position rather than the error, so a
+        # new setpoint doesn't kick the motor
+        if self.lastPosition is None:
+            self.lastPosition = position
+        self.moved = position - self.lastPosition
+        self.lastPosition = position
+
+        output = self.kp * error + self.integral - self.kd * self.moved
+
+        # the integral only grows while the output isn't clamped, so it
+        # doesn't wind up while the motor is at full duty
+        limit = self.limit
+        if output > limit:
+            output = limit
+        elif output < -limit:
+            output = -limit
+        else:
+            integral = self.integral + self.ki * error
+            self.integral = min(limit, max(-limit, integral))
+
+        if self.fixed:
+            output = (output + 128) >> 8
+        direction = 1
+        if output < 0:
+            direction = -1
+            output = -output
+        return output, direction
+
+    def setPoint(self, point):
+        ''' This method assigns the setpoint a new value and starts the
+        integral and derivative over.
+        @param point: point desired in encoder ticks, which is rounded down
+            to a whole tick
+        '''
+        self.setpoint = int(point)
+        self.error = self.setpoint
+        self.integral = 0
+        self.lastPosition = None
+        self.moved = 0
+
+    def setKp(self, Kp):
+        ''' This method assigns the proportional gain a new value.
+        @param Kp: The proportional gain
+        '''
+        self.setGains(Kp, self.Ki, self.Kd)
+
+    def setGains(self, Kp, Ki, Kd):
+        ''' This method assigns all of the gains new values.
+        @param Kp: The proportional gain
+        @param Ki: The integral gain
+        @param Kd: The derivative gain
+        '''
+        self.Kp = Kp
+        self.Ki = Ki
+        self.Kd = Kd
+        scale = self.scale
+        if self.fixed:
+            self.kp = int(Kp * scale + 0.5)
+            self.ki = int(Ki * scale + 0.5)
+            self.kd = int(Kd * scale + 0.5)
+        else:
+            self.kp = Kp
+            self.ki = Ki
+            self.kd = Kd
+
+
 class MotorDriver:
     '''This class implements a motor driver for the ME405 board.'''
 
@@ -283,7 +440,8 @@ class Encoder:
         print('Done Setting Up Encoder')
 
         # tim object specific to which pingroup the Encoder class is passed
-        # Initialized with prescale set to zero, period set to 65535 (Hex FFFF)
+        # Initialized with prescale set to zero, period set to the counter's
+        # full range, 65535 (Hex FFFF) for a 16 bit timer
         self.tim = pyb.Timer(timer, prescaler=0, period=0xFFFF)
 
         # Channel 1 object specific to the pingroup selected
@@ -292,46 +450,119 @@ class Encoder:
         # Channel 2 object specific to the pingroup selected
         self.ch_2 = self.tim.channel(chB, pyb.Timer.ENC_B, pin=encB)
 
-        # initialize last value to 0 to start encoder at position 0.
-        # Last known count of the encoder
-        self.last_value = 0
+        # count turns the timer's counter, which wraps around, into a
+        # position which doesn't
+        self.count = accumulator.Accumulator(16)
 
         # set current position to zero as well to ensure encoder is zeroed at start
         # The current corrected position of the encoder
         self.current_position = 0
 
+        # times and counts hold the time in us and the position of the last
+        # HISTORY readings, newest at index - 1, in arrays made once so that
+        # reading the encoder allocates no memory
+        self.times = array.array('i', [0] * HISTORY)
+        self.counts = array.array('i', [0] * HISTORY)
+        self.index = 0
+        self.readings = 0
+
     def read(self):
         ''' This method reads the current position of the motor
         and returns it as a unsigned integer.
         @return Current position of motor 
         '''
 
-        # read the encoder and save that value as the current value
-        current_value = self.tim.counter()
-
-        # delta is a signed value and is the difference between the current
-        # reading the previous reading. If The value is positive,
-        # the motor was turning clockwise, if negative,
-        # it was turning counterclockwise.
-        delta = current_value - self.last_value
-
-        if delta <= -32767:
-            delta = current_value + (65535 - self.last_value)
+        # read the encoder and add the change since the last reading, which
+        # is positive if the motor was turning clockwise, to the position
+        self.current_position = self.count.update(self.tim.counter())
 
-        elif delta >= 32767:
-            delta = -(self.last_value + (65535 - current_value))
+        # remember when the encoder was at this position
+        index = self.index
+        self.times[index] = utime.ticks_us()
+        self.counts[index] = self.current_position
+        self.index = (index + 1) % HISTORY
+        if self.readings < HISTORY:
+            self.readings += 1
 
-        else:
-            pass
-
-        self.last_value = current_value
-        self.current_position += delta
         if self.adjust:
             return -self.current_position
 
         return self.current_position
 
+    def velocity(self):
+        ''' This method finds how fast the motor is turning from the readings
+        made by read(), which it doesn't make itself. When the motor is fast
+        the velocity is the change in count over the time of the last few
+        readings, as few as it takes for the count to change by FAST_COUNTS
+        ticks, so it follows the motor closely. When it is slow the count
+        changes only now and then, and the velocity is the change over the
+        time from the first to the last change of the count in the history,
+        so it is timed from edge to edge. A slow motor which has stopped soon
+        reads as zero, as the velocity is then never more than one tick over
+        the time since the count last changed.
+        @return Velocity of the motor [ticks/s], signed like read()
+        '''
+        readings = self.readings
+        if readings < 2:
+            return 0
+        times = self.times
+        counts = self.counts
+        newest = (self.index - 1) % HISTORY
+        oldest = (self.index - readings) % HISTORY
+        count = counts[newest]
+
+        # go back only as far as it takes for the count to change by
+        # FAST_COUNTS, so a fast motor's velocity is found over the last few
+        # readings
+        n = newest
+        for _ in range(readings - 1):
+            n = (n - 1) % HISTORY
+            if abs(count - counts[n]) >= FAST_COUNTS:
+                break
+
+        if abs(count - counts[n]) >= FAST_COUNTS:
+            ticks = count - counts[n]
+            dt = utime.ticks_diff(times[newest], times[n])
+        else:
+            # find the last and the first readings at which the count had
+            # changed, going back from the newest; with only one change, the
+            # oldest reading stands in for the first, which underestimates
+            # the velocity until the next change
+            last = -1
+            first = oldest
+            n = newest
+            for _ in range(readings - 1):
+                previous = (n - 1) % HISTORY
+                if counts[n] != counts[previous]:
+                    if last < 0:
+                        last = n
+                    else:
+                        first = n
+                n = previous
+            if last < 0:
+                return 0
+            ticks = counts[last] - counts[first]
+            dt = utime.ticks_diff(times[last], times[first])
+
+            # a motor which is slowing down has gone longer than that since
+            # the last change
+            since = utime.ticks_diff(times[newest], times[last])
+            if since > dt:
+                ticks = 1 if ticks > 0 else -1
+                dt = since
+
+        if dt <= 0:
+            return 0
+        velocity = ticks * 1000000 // dt
+        if self.adjust:
+            return -velocity
+        return velocity
+
     def zero(self):
         ''' This method resets the encoders speed to zero. 
         '''
+        # move the history with the position so the velocity doesn't jump
+        for n in range(HISTORY):
+            self.counts[n] -= self.current_position
+        self.count.zero()
         self.current_position = 0
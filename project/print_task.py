@@ -48,29 +48,25 @@ def put (a_string):
     printing task whenever that task gets a chance. If the print queue is
     full, characters are lost; this is better than blocking to wait for
     space in the queue, as we'd block the printing task and space would
-    never open up. When a character has been put into the queue, the @c go()
-    method of the print task is called so that the run method will be called
-    as soon as the print task is run by the task scheduler. 
+    never open up. When characters have been put into the queue, the queue
+    calls the @c go() method of the print task so that the run method will 
+    be called as soon as the print task is run by the task scheduler. The 
+    characters are copied into the queue all at once by @c put_many(). 
     @param a_string A string to be put into the queue """
 
-    for a_ch in a_string:
-        if not print_queue.full ():
-            print_queue.put (ord (a_ch))
-            print_task.go ()
+    print_queue.put_many (a_string.encode ())
 
 
 #@micropython.native
 def put_bytes (b_arr):
     """ Put bytes from a @c bytearray or @c bytes into the print queue. When 
-    characters have been put into the queue, the @c go() method of the print
-    task is called so that the run method will be called as soon as the print 
-    task is run by the task scheduler. 
+    characters have been put into the queue, the queue calls the @c go() 
+    method of the print task so that the run method will be called as soon 
+    as the print task is run by the task scheduler. If the print queue is 
+    full, bytes are lost and counted by the queue. 
     @param b_arr The bytearray whose contents go into the queue """
 
-    for byte in b_arr:
-        if not print_queue.full ():
-            print_queue.put (byte)
-            print_task.go ()
+    print_queue.put_many (b_arr)
 
 
 def run ():
@@ -106,5 +102,8 @@ global print_task
 print_task = cotask.Task (run, name = 'Printing', priority = 0, 
                           profile = PROFILE)
 
+# Have the queue wake the print task whenever characters are put into it
+print_queue.wake (print_task)
+
 # This line tells the task scheduler to add this task to the system task list
 cotask.task_list.append (print_task)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+@file rangeFilter.py
+This module contains the RangeFilter class, which smooths the distances
+seen by one ultrasonic sensor, and the ProximityLevel class, which turns a
+smoothed distance into the proximity level used to decide when to run from
+another bot. A single bad echo, from another sensor's ping or a ping which
+missed the other bot, is thrown out by a median, and what is left is
+smoothed by an exponential moving average. Distances are integers in
+tenths of an inch and all of the math is integer math, so neither
+allocates memory once it is made and they can be run on every snapshot.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import array
+from micropython import const  # pylint: disable=import-error
+
+## Number of samples the median is taken over; odd, so that a single bad
+#  sample is never the median
+MEDIAN_SIZE = const(3)
+
+## Weight of each new median in the moving average, in 256ths
+ALPHA = const(192)
+
+## Distances dividing the proximity levels [0.1 in]. Level 1 is closer than
+#  the first, level 5 is further than the last
+LEVEL_LIMITS = (60, 180, 240, 300)
+
+## How far past a limit the distance must go to change the level [0.1 in]
+HYSTERESIS = const(10)
+
+
+class RangeFilter:
+    '''This class takes the median of the last few distances seen by a
+    sensor and then smooths the medians with an exponential moving average.
+    Until it has seen a whole window of samples its distance is only the
+    median of those it has, which a single bad sample can still be, so it
+    shouldn't be used for anything until full() is True.
+    '''
+
+    def __init__(self, size=MEDIAN_SIZE, alpha=ALPHA):
+        '''This method initializes the RangeFilter class with the given
+        parameters.
+
+        @param size: size is the number of samples the median is taken over
+        @param alpha: alpha is the weight of each new median in the moving
+            average in 256ths, from 0 (never changes) to 256 (no smoothing)
+        '''
+        self.alpha = alpha
+
+        # window holds the last size samples, oldest at index; ordered is a
+        # copy of them sorted to find the median
+        self.window = array.array('i', [0] * size)
+        self.ordered = array.array('i', [0] * size)
+        self.index = 0
+        self.count = 0
+
+        self.value = 0
+
+    def reset(self):
+        ''' This method forgets every sample, so the filter fills up again
+        from the next one.
+        '''
+        self.index = 0
+        self.count = 0
+
+    def full(self):
+        ''' This method finds whether the filter has seen a whole window of
+        samples since it was made or reset.
+        @return: Returns True if the filtered distance can be used
+        '''
+        return self.count >= len(self.window)
+
+    def update(self, sample):
+        ''' This method adds a sample to the filter.
+        @param sample: sample is the distance seen by the sensor [0.1 in]
+        @return: Returns the filtered distance [0.1 in]
+        '''
+        window = self.window
+        size = len(window)
+        window[self.index] = sample
+        self.index = (self.index + 1) % size
+        filling = self.count < size
+        if filling:
+            self.count += 1
+        count = self.count
+
+        # insertion sort the samples into ordered; with so few samples this
+        # is quicker than anything cleverer
+        ordered = self.ordered
+        for n in range(count):
+            item = window[n]
+            m = n
+            while m > 0 and ordered[m - 1] > item:
+                ordered[m] = ordered[m - 1]
+                m -= 1
+            ordered[m] = item
+        median = ordered[count // 2]
+
+        # the average starts at the first median of a whole window, so that
+        # the samples before it, which weren't filtered, leave nothing in it
+        if filling:
+            self.value = median
+        else:
+            # rounded to the nearest tenth rather than down, so the average
+            # settles on the median from either side
+            self.value += (self.alpha * (median - self.value) + 128) >> 8
+        return self.value
+
+
+class ProximityLevel:
+    '''This class turns a distance into a proximity level from 1 (closest) to
+    5 (nothing in range). Every distance has a level, and the level only
+    changes once the distance is more than the hysteresis past a limit, so a
+    distance sitting on a limit doesn't make the level chatter.'''
+
+    def __init__(self, limits=LEVEL_LIMITS, hysteresis=HYSTERESIS):
+        '''This method initializes the ProximityLevel class with the given
+        parameters.
+
+        @param limits: limits is a tuple of the increasing distances dividing
+            the levels
+        @param hysteresis: hysteresis is how far past a limit the distance
+            must go to change the level
+        '''
+        self.limits = limits
+        self.hysteresis = hysteresis
+        self.level = len(limits) + 1
+
+    def reset(self):
+        ''' This method takes the level back to nothing in range.
+        '''
+        self.level = len(self.limits) + 1
+
+    def update(self, distance):
+        ''' This method finds the level for a distance.
+        @param distance: distance is the filtered distance [0.1 in]
+        @return: Returns the level
+        '''
+        limits = self.limits
+        level = self.level
+        while level > 1 and distance < limits[level - 2] - self.hysteresis:
+            level -= 1
+        while (level <= len(limits)
+               and distance >= limits[level - 1] + self.hysteresis):
+            level += 1
+        self.level = level
+        return level
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+@file __init__.py
+This package lets the robot code run on a PC. It contains stand-ins for the
+Micropython @c pyb, @c utime and @c micropython modules which run on a
+simulated clock, models of the devices connected to the board, and a script
+which runs @c main.py with them. Call @c install() before importing any of
+the robot code:
+
+@code
+import sim
+sim.install()
+import cotask
+@endcode
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import builtins
+import os
+import sys
+
+from sim.clock import CLOCK, SimulationEnd  # noqa: F401
+
+## The directory holding the robot code
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def install():
+    '''Put the simulated modules in place of the Micropython ones so that
+    importing the robot code gets them, and make the robot code importable.
+    Micropython's built-in @c const() is also made a built-in here.'''
+    from sim import micropython, pyb, utime
+
+    sys.modules['micropython'] = micropython
+    sys.modules['pyb'] = pyb
+    sys.modules['utime'] = utime
+    builtins.const = micropython.const
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
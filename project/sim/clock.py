@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+@file clock.py
+This module contains the simulated clock on which the whole simulation runs.
+Time only moves when it's told to: by sleeping, by waiting for an interrupt,
+or by reading pins which busy-wait loops watch. Simulated interrupts and
+device models are run when the clock passes the times at which they're due.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import heapq
+
+
+class SimulationEnd(BaseException):
+    '''Raised by the clock when the simulation has run as long as it was told
+    to. It isn't an @c Exception so that the @c except @c Exception: clause
+    in @c main.py doesn't catch it.'''
+
+
+class SimClock:
+    '''A microsecond clock which only moves when it's told to, so that the
+    code's timing doesn't depend on how fast the PC runs it.'''
+
+    ## Time between system tick interrupts, which wake the processor [us]
+    SYSTICK = 1000
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        '''Set the clock back to zero and forget all pending interrupts.'''
+        self.now = 0
+        self.stop_at = None
+        self._events = []
+        self._ser_num = 0
+
+    def at(self, time, fun):
+        '''Make a simulated interrupt call @c fun when the clock reaches
+        the given time [us].'''
+        self._ser_num += 1
+        heapq.heappush(self._events, (time, self._ser_num, fun))
+
+    def advance(self, us):
+        '''Move the clock ahead, running each interrupt that comes due.'''
+        end = self.now + us
+        while self._events and self._events[0][0] <= end:
+            time, _, fun = heapq.heappop(self._events)
+            self.now = max(self.now, time)
+            fun()
+        self.now = max(self.now, end)
+        if self.stop_at is not None and self.now >= self.stop_at:
+            raise SimulationEnd()
+
+    def busy(self, us):
+        '''Spend the given time computing. This is like @c advance(), but
+        the time taken by each interrupt that comes due is added on, as the
+        interrupt holds up the computing.'''
+        end = self.now + us
+        while self._events and self._events[0][0] <= end:
+            time, _, fun = heapq.heappop(self._events)
+            self.now = max(self.now, time)
+            start = self.now
+            fun()
+            end += self.now - start
+        self.now = max(self.now, end)
+        if self.stop_at is not None and self.now >= self.stop_at:
+            raise SimulationEnd()
+
+    def wfi(self):
+        '''Sleep until the next interrupt, which is either a simulated one or
+        the next system tick.'''
+        wake = (self.now // self.SYSTICK + 1) * self.SYSTICK
+        if self._events and self._events[0][0] < wake:
+            wake = max(self._events[0][0], self.now)
+        self.advance(wake - self.now)
+
+
+## The clock used by all the simulated modules
+CLOCK = SimClock()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+@file devices.py
+This module contains models of the devices connected to the board: the IR
+remote and receiver, the HC-SR04 ultrasonic sensors, the QTR reflectance
+sensors, and the DC motors with their encoders. Each model drives the
+simulated pins and timers in @c sim.pyb as the real device drives the real
+ones.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+from sim.clock import CLOCK
+from sim import pyb
+
+## NEC protocol timing [us]
+NEC_HEADER_MARK = 9000
+NEC_HEADER_SPACE = 4500
+NEC_REPEAT_SPACE = 2250
+NEC_BIT_MARK = 562
+NEC_ZERO_SPACE = 562
+NEC_ONE_SPACE = 1687
+
+## Time between the start of an NEC frame and the start of a repeat code, and
+#  between repeat codes [us]
+NEC_REPEAT_PERIOD = 108000
+
+
+def necEdges(address, command, start=0):
+    '''Find the times of the edges on the IR receiver's output for an NEC
+    frame. Bits are sent least significant first: the address, its
+    complement, the command, and its complement.
+    @param address: address is the 8 bit address
+    @param command: command is the 8 bit command
+    @param start: start is the time of the first edge [us]
+    @return a list of edge times [us]
+    '''
+    edges = [start, start + NEC_HEADER_MARK]
+    time = edges[-1] + NEC_HEADER_SPACE
+    frame = (address | ((~address & 0xFF) << 8) | (command << 16)
+             | ((~command & 0xFF) << 24))
+    for n in range(32):
+        edges.append(time)
+        time += NEC_BIT_MARK
+        edges.append(time)
+        time += NEC_ONE_SPACE if (frame >> n) & 1 else NEC_ZERO_SPACE
+    edges += [time, time + NEC_BIT_MARK]
+    return edges
+
+
+def necRepeatEdges(start=0):
+    '''Find the times of the edges of an NEC repeat code.
+    @param start: start is the time of the first edge [us]
+    @return a list of edge times [us]
+    '''
+    time = start + NEC_HEADER_MARK + NEC_REPEAT_SPACE
+    return [start, start + NEC_HEADER_MARK, time, time + NEC_BIT_MARK]
+
+
+class NecRemote:
+    '''An IR remote and receiver feeding an input capture timer channel.'''
+
+    def __init__(self, timer, channel):
+        '''@param timer: timer is the number of the input capture timer
+        @param channel: channel is the timer channel the receiver drives
+        '''
+        self.timer = timer
+        self.channel = channel
+
+    def sendEdges(self, edges):
+        '''Make the receiver's output change at each of the given times.'''
+        for time in edges:
+            CLOCK.at(time, self._edge)
+
+    def press(self, command, address=0, at=None, repeats=0):
+        '''Press a button on the remote.
+        @param command: command is the 8 bit command sent by the button
+        @param address: address is the 8 bit address of the remote
+        @param at: at is the time the button is pressed [us], by default now
+        @param repeats: repeats is the number of repeat codes sent after the
+            frame while the button is held down
+        '''
+        start = CLOCK.now if at is None else at
+        self.sendEdges(necEdges(address, command, start))
+        for n in range(repeats):
+            self.sendEdges(necRepeatEdges(start + (n + 1) * NEC_REPEAT_PERIOD))
+
+    def _edge(self):
+        pyb.Timer(self.timer).channel(self.channel).trigger()
+
+
+class Hcsr04:
+    '''An HC-SR04 ultrasonic distance sensor looking at an object.'''
+
+    ## Time from the end of the trigger pulse to the start of the echo [us]
+    ECHO_DELAY = 450
+
+    ## Echo pulse width when nothing is in range [us]
+    NO_ECHO = 38000
+
+    def __init__(self, trigger_pin, echo_pin, distance=None):
+        '''@param trigger_pin: trigger_pin is the sensor's trigger pin
+        @param echo_pin: echo_pin is the sensor's echo pin
+        @param distance: distance is the distance to the object [cm], a
+            function of the time [us] giving that distance, or @c None if
+            there is nothing in range
+        '''
+        self.distance = distance
+        self.trigger = pyb.Pin(trigger_pin)
+        self.echo = pyb.Pin(echo_pin)
+        self.trigger.listeners.append(self._triggered)
+        self.echo.source = lambda pin: self._level
+        self._level = 0
+        self._last = 0
+
+    def echoWidth(self):
+        '''Find the width of the echo pulse for the present distance [us].'''
+        distance = self.distance
+        if callable(distance):
+            distance = distance(CLOCK.now)
+        if distance is None:
+            return self.NO_ECHO
+        return min(self.NO_ECHO, int(distance * 58))
+
+    def _triggered(self, pin, level):
+        # A falling edge on the trigger pin starts a measurement
+        if level == 0 and self._last == 1 and self._level == 0:
+            start = CLOCK.now + self.ECHO_DELAY
+            CLOCK.at(start, lambda: self._setEcho(1))
+            CLOCK.at(start + self.echoWidth(), lambda: self._setEcho(0))
+        if level is not None:
+            self._last = level
+
+    def _setEcho(self, level):
+        self._level = level
+        extint = getattr(self.echo, 'extint', None)
+        if extint is not None:
+            extint.trigger(level == 1)
+
+
+class QtrSensor:
+    '''One QTR-RC reflectance sensor. After its pin has been driven high and
+    made an input, the pin reads high until the sensor's capacitor has
+    discharged, which takes longer over a dark surface.'''
+
+    ## Discharge times over white and black surfaces [us]
+    WHITE = 150
+    BLACK = 2500
+
+    def __init__(self, pin, discharge=BLACK):
+        '''@param pin: pin is the sensor's pin
+        @param discharge: discharge is the discharge time [us] or a function
+            of the time [us] giving the discharge time
+        '''
+        self.discharge = discharge
+        self.pin = pyb.Pin(pin)
+        self.pin.listeners.append(self._changed)
+        self.pin.source = self._read
+        self._charged = None
+
+    def _changed(self, pin, level):
+        # Switching a charged pin to an input starts the discharge
+        if level is None and pin.mode() == pyb.Pin.IN and pin._level:
+            self._charged = CLOCK.now
+
+    def _read(self, pin):
+        if self._charged is None:
+            return 0
+        discharge = self.discharge
+        if callable(discharge):
+            discharge = discharge(CLOCK.now)
+        return CLOCK.now - self._charged < discharge
+
+
+class DcMotor:
+    '''A DC motor driven by a PWM channel and a direction pin, turning an
+    encoder read by a timer. The motor's speed follows the voltage with a
+    first order lag.'''
+
+    ## Time step used to integrate the motor's motion [us]
+    STEP = 100
+
+    def __init__(self, pwm_timer, pwm_channel, dir_pin, enc_timer,
+                 forward_level=1, max_speed=6000.0, time_constant=0.05,
+                 stiction=0.0):
+        '''@param pwm_timer: pwm_timer is the number of the PWM timer
+        @param pwm_channel: pwm_channel is the PWM timer channel
+        @param dir_pin: dir_pin is the direction pin
+        @param enc_timer: enc_timer is the number of the encoder timer
+        @param forward_level: forward_level is the level of the direction pin
+            which makes the encoder count up
+        @param max_speed: max_speed is the speed at 100% duty [counts/s]
+        @param time_constant: time_constant is the motor's time constant [s]
+        @param stiction: stiction is the duty [%] the motor needs to overcome
+            friction; below it the motor doesn't turn, and above it only the
+            duty beyond it drives the motor
+        '''
+        self.pwm = pyb.Timer(pwm_timer).channel(pwm_channel)
+        self.dir_pin = pyb.Pin(dir_pin)
+        self.forward_level = forward_level
+        self.max_speed = max_speed
+        self.time_constant = time_constant
+        self.stiction = stiction
+        ## The motor's speed [counts/s] and position [counts]
+        self.speed = 0.0
+        self.position = 0.0
+        self._time = CLOCK.now
+        pyb.Timer(enc_timer).source = self._counter
+
+    def update(self):
+        '''Bring the motor's speed and position up to the present time.'''
+        duty = max(0.0, self.pwm.pulse_width_percent() - self.stiction) \
+            / (100.0 - self.stiction)
+        if self.dir_pin._level != self.forward_level:
+            duty = -duty
+        while self._time < CLOCK.now:
+            step = min(self.STEP, CLOCK.now - self._time)
+            dt = step / 1000000.0
+            self.speed += (duty * self.max_speed - self.speed) \
+                * dt / self.time_constant
+            self.position += self.speed * dt
+            self._time += step
+
+    def _counter(self, timer):
+        self.update()
+        return int(self.position)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+@file micropython.py
+This module stands in for the Micropython @c micropython module. The code
+emitter decorators do nothing, and @c const() returns its argument.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+
+def const(value):
+    return value
+
+
+def native(fun):
+    return fun
+
+
+def viper(fun):
+    return fun
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(fun, arg):
+    fun(arg)
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+@file pyb.py
+This module stands in for the parts of the Micropython @c pyb module used by
+the robot code. Pins and timers are singletons, as on the board, so that a
+device model can get hold of a pin or timer before the robot code sets it
+up. Device models drive input pins by setting their @c source, drive timer
+counters by setting the timer's @c source, and fire input capture interrupts
+with @c TimerChannel.trigger().
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+from sim.clock import CLOCK
+
+## Simulated time taken by each read of a pin's value [us]. Busy-wait loops
+#  which watch pins would never end if reading a pin took no time at all
+PIN_READ_US = 1
+
+## Frequency of the clock which drives the timers [Hz]
+TIMER_HZ = 80000000
+
+
+class _Board:
+    '''Gives a pin object for any attribute name, as @c pyb.Pin.board does.'''
+
+    def __getattr__(self, name):
+        return Pin(name)
+
+
+class Pin:
+    '''A simulated GPIO pin. There is only ever one object for each pin.'''
+
+    IN = 0
+    OUT_PP = 1
+    OUT_OD = 2
+    AF_PP = 3
+    ANALOG = 4
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    ## Every pin which has been used, by name
+    pins = {}
+
+    board = _Board()
+
+    def __new__(cls, pin, mode=None, pull=PULL_NONE, **kwargs):
+        name = pin.name() if isinstance(pin, Pin) else str(pin)
+        obj = Pin.pins.get(name)
+        if obj is None:
+            obj = object.__new__(cls)
+            obj._name = name
+            obj._mode = Pin.IN
+            obj._level = 0
+            ## A function giving the level seen at an input pin as
+            #  @c source(pin), or @c None to read back the last level set
+            obj.source = None
+            ## Functions called as @c fun(pin, level) when an output changes
+            obj.listeners = []
+            Pin.pins[name] = obj
+        return obj
+
+    def __init__(self, pin, mode=None, pull=PULL_NONE, **kwargs):
+        if mode is not None:
+            self.init(mode, pull)
+
+    def init(self, mode=None, pull=PULL_NONE, **kwargs):
+        if mode is not None:
+            self._mode = mode
+            for fun in self.listeners:
+                fun(self, None)
+
+    def name(self):
+        return self._name
+
+    def mode(self):
+        return self._mode
+
+    def value(self, level=None):
+        if level is not None:
+            self._level = 1 if level else 0
+            for fun in self.listeners:
+                fun(self, self._level)
+            return None
+        if self._mode == Pin.IN:
+            CLOCK.advance(PIN_READ_US)
+            if self.source is not None:
+                return 1 if self.source(self) else 0
+        return self._level
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    on = high
+    off = low
+
+    def __call__(self, level=None):
+        return self.value(level)
+
+    def __repr__(self):
+        return 'Pin(' + self._name + ')'
+
+
+class ExtInt:
+    '''A simulated external interrupt on a pin, called by device models with
+    @c trigger() when the pin's level changes.'''
+
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    IRQ_RISING_FALLING = 3
+
+    def __init__(self, pin, mode, pull, callback):
+        self.pin = Pin(pin)
+        # as on the board, a pin's interrupt can't be set up twice
+        old = getattr(self.pin, 'extint', None)
+        if callback is not None and old is not None and old._callback:
+            raise ValueError('ExtInt vector is already in use')
+        self._mode = mode
+        self._callback = callback
+        self._enabled = True
+        self.pin.extint = self
+
+    def line(self):
+        return 0
+
+    def enable(self):
+        self._enabled = True
+
+    def disable(self):
+        self._enabled = False
+
+    def trigger(self, rising):
+        '''Run the callback if the edge is one this interrupt watches for.'''
+        edge = ExtInt.IRQ_RISING if rising else ExtInt.IRQ_FALLING
+        if self._enabled and self._callback and self._mode & edge:
+            self._callback(0)
+
+
+class TimerChannel:
+    '''A channel of a simulated timer.'''
+
+    def __init__(self, timer, number):
+        self.timer = timer
+        self.number = number
+        self.mode = None
+        self.pin = None
+        self._callback = None
+        self._capture = 0
+        self._percent = 0
+
+    def init(self, mode, pin=None, callback=None, **kwargs):
+        self.mode = mode
+        self.pin = pin
+        self._callback = callback
+        if 'pulse_width_percent' in kwargs:
+            self._percent = kwargs['pulse_width_percent']
+
+    def callback(self, fun):
+        self._callback = fun
+
+    def capture(self):
+        return self._capture
+
+    def pulse_width_percent(self, percent=None):
+        if percent is None:
+            return self._percent
+        self._percent = max(0, min(100, percent))
+
+    def trigger(self, capture=None):
+        '''Capture the timer's counter and run the callback, as an input
+        capture channel does when its pin sees an edge.
+        @param capture: capture is the count to be captured, as when
+            replaying recorded captures, or @c None to capture the counter
+        '''
+        self._capture = self.timer.counter() if capture is None else capture
+        if self._callback:
+            self._callback(self.timer)
+
+
+class Timer:
+    '''A simulated hardware timer. Its counter is found from the simulated
+    clock, or from a device model set as its @c source.'''
+
+    UP = 0
+    PWM = 1
+    PWM_INVERTED = 2
+    IC = 3
+    OC_TIMING = 4
+    ENC_A = 5
+    ENC_B = 6
+    ENC_AB = 7
+    RISING = 1
+    FALLING = 2
+    BOTH = 3
+
+    ## Every timer which has been used, by number
+    timers = {}
+
+    def __new__(cls, number, **kwargs):
+        obj = Timer.timers.get(number)
+        if obj is None:
+            obj = object.__new__(cls)
+            obj._number = number
+            obj._channels = {}
+            obj._prescaler = 0
+            obj._period = 0xFFFF
+            obj._offset = 0
+            obj._callback = None
+            ## A function giving the counter as @c source(timer), for timers
+            #  counting encoder edges, or @c None to count clock ticks
+            obj.source = None
+            Timer.timers[number] = obj
+        return obj
+
+    def __init__(self, number, **kwargs):
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, prescaler=None, period=None, freq=None, callback=None,
+             **kwargs):
+        if freq is not None:
+            ticks = TIMER_HZ // freq
+            self._prescaler = max(0, ticks // 0x10000)
+            self._period = ticks // (self._prescaler + 1) - 1
+        if prescaler is not None:
+            self._prescaler = prescaler
+        if period is not None:
+            self._period = period
+        self._offset = 0
+        self._callback = callback
+
+    def deinit(self):
+        self._callback = None
+
+    def _counts(self):
+        return CLOCK.now * (TIMER_HZ // 1000000) // (self._prescaler + 1)
+
+    def counter(self, value=None):
+        if self.source is not None:
+            return self.source(self) % (self._period + 1)
+        if value is not None:
+            self._offset = self._counts() - value
+            return None
+        return (self._counts() - self._offset) % (self._period + 1)
+
+    def period(self):
+        return self._period
+
+    def prescaler(self):
+        return self._prescaler
+
+    def channel(self, number, mode=None, **kwargs):
+        chan = self._channels.get(number)
+        if chan is None:
+            chan = TimerChannel(self, number)
+            self._channels[number] = chan
+        if mode is not None:
+            chan.init(mode, **kwargs)
+        return chan
+
+    def callback(self, fun):
+        self._callback = fun
+
+
+# Interrupts are simulated by the clock between statements, so turning them
+# off and on again only has to keep track of the state
+
+_irq_enabled = True
+
+
+def disable_irq():
+    global _irq_enabled
+    state = _irq_enabled
+    _irq_enabled = False
+    return state
+
+
+def enable_irq(state=True):
+    global _irq_enabled
+    _irq_enabled = state
+
+
+def udelay(us):
+    CLOCK.advance(us)
+
+
+def delay(ms):
+    CLOCK.advance(ms * 1000)
+
+
+def millis():
+    return CLOCK.now // 1000
+
+
+def micros():
+    return CLOCK.now
+
+
+def elapsed_millis(start):
+    return millis() - start
+
+
+def elapsed_micros(start):
+    return micros() - start
+
+
+def wfi():
+    CLOCK.wfi()
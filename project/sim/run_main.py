@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+@file run_main.py
+This script runs the robot code in @c main.py on a PC with the simulated
+board and devices, faster than real time. The robot is started by a
+simulated press of the remote's START button, stopped by another button and
+started again, as it is between rounds, and the scheduler's profile is
+printed when the simulation ends.
+
+Usage (from the project directory):
+    python -m sim.run_main [seconds] [-v]
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import contextlib
+import io
+import os
+import runpy
+import sys
+import time
+
+import sim
+
+## Time at which the remote's START button is pressed [us]
+START_TIME = 500000
+
+## Times at which the bot is stopped and started again [us]
+STOP_TIME = 2500000
+RESTART_TIME = 3000000
+
+
+def setUpDevices():
+    '''Connect device models to the pins and timers used by the robot code.
+    The robot sits on a dark surface with nothing in range of its ultrasonic
+    sensors, START is pressed shortly after the code begins, and the bot is
+    stopped and started again a few seconds later.'''
+    from sim import devices
+    import constant as C
+    import pins as P
+
+    # START is held down long enough for a repeat code to follow the frame
+    remote = devices.NecRemote(C.IR_TIMER, C.IR_CH)
+    remote.press(C.START, at=START_TIME, repeats=1)
+    remote.press(C.START + 1, at=STOP_TIME)
+    remote.press(C.START, at=RESTART_TIME)
+
+    for n in range(1, 5):
+        devices.Hcsr04(getattr(P, 'US_DIST_TRIG_' + str(n)),
+                       getattr(P, 'US_DIST_ECHO_' + str(n)))
+    for pin in P.QRT_ARRAY:
+        devices.QtrSensor(pin)
+
+    # M1's driver and encoder are both flipped, so driving it forward sets
+    # its direction pin high and counts its encoder's timer down
+    devices.DcMotor(C.MOT1_PWM_TIMER, C.MOT1_PWM_CH, P.M1DIR, C.ENC1_TIMER,
+                    forward_level=0)
+    devices.DcMotor(C.MOT2_PWM_TIMER, C.MOT2_PWM_CH, P.M2DIR, C.ENC2_TIMER,
+                    forward_level=0)
+
+
+def run(seconds, verbose=False):
+    '''Run @c main.py for the given simulated time.
+    @param seconds: seconds is the simulated time to run for [s]
+    @param verbose: verbose is @c True to show what the robot code prints
+    @return the number of lines printed by the robot code
+    '''
+    sim.install()
+    setUpDevices()
+    sim.CLOCK.stop_at = sim.CLOCK.now + int(seconds * 1000000)
+
+    output = sys.stdout if verbose else io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        try:
+            runpy.run_path(os.path.join(sim.PROJECT_DIR, 'main.py'),
+                           run_name='__main__')
+        except sim.SimulationEnd:
+            pass
+    elapsed = time.perf_counter() - start
+
+    import cotask
+    import task_share
+    print(cotask.task_list)
+    print(cotask.task_list.idle_stats())
+    print(task_share.show_all())
+    print('Simulated {:.2f} s in {:.2f} s ({:.1f}x real time)'.format(
+        seconds, elapsed, seconds / elapsed))
+    return 0 if verbose else output.getvalue().count('\n')
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '-v']
+    run(float(args[0]) if args else 5.0, '-v' in sys.argv)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+@file utime.py
+This module stands in for the Micropython @c utime module. Ticks come from
+the simulated clock and wrap around just as they do on the board, so code
+which forgets to use @c ticks_diff() shows up in simulation too.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+from sim.clock import CLOCK
+
+## Ticks wrap around at this value, as on the pyboard
+TICKS_PERIOD = 1 << 30
+
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+
+def ticks_us():
+    return CLOCK.now & _TICKS_MAX
+
+
+def ticks_ms():
+    return (CLOCK.now // 1000) & _TICKS_MAX
+
+
+def ticks_cpu():
+    return ticks_us()
+
+
+def ticks_diff(new, old):
+    return ((new - old + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def sleep_us(us):
+    CLOCK.advance(us)
+
+
+def sleep_ms(ms):
+    CLOCK.advance(ms * 1000)
+
+
+def sleep(seconds):
+    CLOCK.advance(int(seconds * 1000000))
@@ -38,7 +38,7 @@ class Queue:
     ser_num = 0
 
     def __init__ (self, type_code, size, thread_protect = True, 
-                  overwrite = False, name = None):
+                  overwrite = False, name = None, blocking = True):
         """ Initialize a queue by allocating memory for the contents and 
         setting up the components in an empty configuration. The data type 
         code is given as for the Python 'array' type, which can be any of
@@ -54,11 +54,14 @@ class Queue:
         @param overwrite If @c True, oldest data will be overwritten with new
             data if the queue becomes full 
         @param name A short name for the queue, default @c QueueN where @c N
-            is a serial number for the queue """
+            is a serial number for the queue 
+        @param blocking If @c False, @c put() drops an item which doesn't 
+            fit rather than waiting for room in a full queue """
 
         self._size = size
         self._thread_protect = thread_protect
         self._overwrite = overwrite
+        self._blocking = blocking
         Queue.ser_num += 1
 
         self._name = str (name) if name != None \
@@ -81,50 +84,88 @@ class Queue:
         # collector to neaten up what memory is left for future use
         gc.collect ()
 
+        # A view of the buffer through which runs of items are copied in and
+        # out by put_many() and get_into()
+        self._view = memoryview (self._buffer)
+
         # Initialize pointers to be used for reading and writing data
         self._rd_idx = 0
         self._wr_idx = 0
         self._num_items = 0
 
+        # The most items which have been in the queue at once, and the 
+        # numbers of items dropped because the queue was full and of old 
+        # items overwritten by new ones
+        self._max_in = 0
+        self._drops = 0
+        self._overwrites = 0
+
+        # The task whose go() method is called when data arrives, and the 
+        # number of items which must be in the queue before it's called
+        self._consumer = None
+        self._wake_num = 1
+
 
     @micropython.native
     def put (self, item, in_ISR = False):
         """ Put an item into the queue. If there isn't room for the item, wait 
         (blocking the calling process) until room becomes available,
         unless the @c overwrite constructor parameter was set to @c True to 
-        allow old data to be clobbered. If non-blocking behavior without
-        overwriting is needed, one should call @c full() to ensure that the 
-        queue is not full before putting data into it.
+        allow old data to be clobbered. Items which don't fit are dropped 
+        rather than waited for if this is called from within an ISR or if 
+        the @c blocking constructor parameter was set to @c False; in a 
+        cooperative scheduler, nothing can empty the queue while a task 
+        waits. 
         @param item The item to be placed into the queue
-        @param in_ISR Set this to @c True if calling from within an ISR """
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return @c True if the item was put into the queue, @c False if it 
+            was dropped """
 
-        # If we're in an ISR and the queue is full and we're not allowed to
-        # overwrite data, we have to give up and exit
-        if self.full ():
-            if in_ISR:
-                return
+        # If the queue is full and we're not allowed to overwrite data, we 
+        # have to give up or wait
+        if self.full () and not self._overwrite:
+            if in_ISR or not self._blocking:
+                self._drops += 1
+                return False
 
-            # Wait (if needed) until there's room in the buffer for the data
-            if not self._overwrite:
-                while self.full ():
-                    pass
+            # Wait until there's room in the buffer for the data
+            while self.full ():
+                pass
 
         # Prevent data corruption by blocking interrupts during data transfer
         if self._thread_protect and not in_ISR:
             irq_state = pyb.disable_irq ()
 
-        # Write the data and advance the counts and pointers
-        self._buffer[self._wr_idx] = item
-        self._wr_idx += 1
-        if self._wr_idx >= self._size:
-            self._wr_idx = 0
-        self._num_items += 1
-        if self._num_items >= self._size:
-            self._num_items = self._size
-
-        # Re-enable interrupts
-        if self._thread_protect and not in_ISR:
-            pyb.enable_irq (irq_state)
+        try:
+            # Write the data first, so an item which doesn't fit the queue's
+            # type raises before anything is changed
+            self._buffer[self._wr_idx] = item
+
+            # If the queue was full, the oldest item has been overwritten, so
+            # the item after it becomes the oldest
+            if self._num_items >= self._size:
+                self._rd_idx += 1
+                if self._rd_idx >= self._size:
+                    self._rd_idx = 0
+                self._num_items -= 1
+                self._overwrites += 1
+
+            # Advance the counts and pointers
+            self._wr_idx += 1
+            if self._wr_idx >= self._size:
+                self._wr_idx = 0
+            self._num_items += 1
+            num_items = self._num_items
+            if num_items > self._max_in:
+                self._max_in = num_items
+        finally:
+            # Re-enable interrupts, even if the item couldn't be stored
+            if self._thread_protect and not in_ISR:
+                pyb.enable_irq (irq_state)
+
+        if self._consumer != None and num_items >= self._wake_num:
+            self._consumer.go ()
+        return True
 
 
     @micropython.native
@@ -161,6 +202,276 @@ class Queue:
         return (to_return)
 
 
+    @micropython.native
+    def put_many (self, items, in_ISR = False):
+        """ Put a number of items into the queue with interrupts disabled only
+        once. If @c items is a buffer such as a @c bytes, @c bytearray, 
+        @c array or @c memoryview whose items are the same size as the 
+        queue's, the items are copied in at most two contiguous runs; other
+        sequences and iterables are copied one item at a time. A buffer's
+        items are copied bit for bit, not converted, and MicroPython checks
+        only their size, so a buffer of another type of the same size, such
+        as an @c 'h' array put into an @c 'H' queue, is taken to hold the 
+        queue's type; only put buffers of the queue's own type. This method
+        never waits for room in the queue: if the queue fills up, the items 
+        which don't fit are dropped, unless the @c overwrite constructor 
+        parameter was set to @c True, in which case the oldest items are 
+        overwritten. If an item copied one at a time doesn't fit the queue's
+        type, the error is raised with the items before it in the queue.
+        @param items The items to be placed into the queue
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return The number of items which were put into the queue """
+
+        # Prevent data corruption by blocking interrupts during data transfer
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        try:
+            try:
+                count = self._copy_in (memoryview (items))
+            except (TypeError, ValueError):
+                count = self._put_each (items)
+            num_items = self._num_items
+            if num_items > self._max_in:
+                self._max_in = num_items
+        finally:
+            # Re-enable interrupts, even if an item couldn't be stored
+            if self._thread_protect and not in_ISR:
+                pyb.enable_irq (irq_state)
+
+        if count and self._consumer != None and num_items >= self._wake_num:
+            self._consumer.go ()
+        return count
+
+
+    @micropython.native
+    def _copy_in (self, src):
+        """ Copy the items in a memoryview into the buffer in contiguous runs,
+        raising @c TypeError or @c ValueError without changing anything if 
+        the memoryview's items aren't the same size as the queue's. 
+        @param src A memoryview of the items to be put into the queue
+        @return The number of items which were put into the queue """
+
+        count = len (src)
+        size = self._size
+
+        # The counts are only changed once the copy has worked, since items
+        # of the wrong size are then put in one at a time and counted again
+        overwrites = 0
+        drops = 0
+        if self._overwrite:
+            # Only the newest items fit if there are more than the queue holds
+            if count > size:
+                src = src[count - size:]
+                overwrites = count - size
+                count = size
+        elif count > size - self._num_items:
+            drops = count - (size - self._num_items)
+            count = size - self._num_items
+
+        if count > 0:
+            # Copy up to the end of the buffer, then from its beginning
+            first = size - self._wr_idx
+            if first > count:
+                first = count
+            self._view[self._wr_idx:self._wr_idx + first] = src[:first]
+            if count > first:
+                self._view[:count - first] = src[first:count]
+        self._overwrites += overwrites
+        self._drops += drops
+        if count <= 0:
+            return 0
+
+        self._wr_idx += count
+        if self._wr_idx >= size:
+            self._wr_idx -= size
+
+        # If old items were overwritten, the oldest remaining item is the one
+        # just after the newest
+        self._num_items += count
+        if self._num_items > size:
+            self._overwrites += self._num_items - size
+            self._num_items = size
+            self._rd_idx = self._wr_idx
+
+        return count
+
+
+    @micropython.native
+    def _put_each (self, items):
+        """ Copy items one at a time from an iterable into the buffer. 
+        @param items The items to be put into the queue
+        @return The number of items which were put into the queue """
+
+        count = 0
+        for item in items:
+            if self._num_items >= self._size:
+                if not self._overwrite:
+                    self._drops += 1
+                    continue
+            self._buffer[self._wr_idx] = item
+            if self._num_items >= self._size:
+                self._rd_idx += 1
+                if self._rd_idx >= self._size:
+                    self._rd_idx = 0
+                self._num_items -= 1
+                self._overwrites += 1
+            self._wr_idx += 1
+            if self._wr_idx >= self._size:
+                self._wr_idx = 0
+            self._num_items += 1
+            count += 1
+        return count
+
+
+    @micropython.native
+    def get_into (self, buf, num = None, in_ISR = False):
+        """ Read up to @c num items from the queue into a buffer with 
+        interrupts disabled only once. If @c buf is a buffer such as a 
+        @c bytearray, @c array or @c memoryview whose items are the same size
+        as the queue's, the items are copied in at most two contiguous runs,
+        bit for bit as for @c put_many(), so @c buf should be of the queue's
+        own type; otherwise they're copied one at a time. This method never 
+        waits for items to arrive; it reads only the items which are in the
+        queue. If an item doesn't fit @c buf, the error is raised and every
+        item is left in the queue. 
+        @param buf The buffer or list into which items are written, starting
+            at index 0
+        @param num The greatest number of items to read, by default as many
+            as @c buf holds
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return The number of items which were read """
+
+        if num == None or num > len (buf):
+            num = len (buf)
+
+        # Prevent data corruption by blocking interrupts during data transfer
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        try:
+            count = self._num_items
+            if count > num:
+                count = num
+            size = self._size
+
+            if count > 0:
+                # Copy up to the end of the buffer, then from its beginning
+                first = size - self._rd_idx
+                if first > count:
+                    first = count
+                try:
+                    dest = memoryview (buf)
+                    dest[:first] = self._view[self._rd_idx:
+                                              self._rd_idx + first]
+                    if count > first:
+                        dest[first:count] = self._view[:count - first]
+                except (TypeError, ValueError):
+                    for index in range (count):
+                        buf[index] = self._buffer[(self._rd_idx + index) 
+                                                  % size]
+
+                self._rd_idx += count
+                if self._rd_idx >= size:
+                    self._rd_idx -= size
+                self._num_items -= count
+        finally:
+            # Re-enable interrupts, even if an item couldn't be stored in buf
+            if self._thread_protect and not in_ISR:
+                pyb.enable_irq (irq_state)
+
+        return count
+
+
+    @micropython.native
+    def views (self, in_ISR = False):
+        """ Get the items in the queue without copying them. The items are 
+        returned as views of the queue's buffer: the first view holds the
+        oldest items, up to the end of the buffer, and the second holds any
+        items which wrapped around to the beginning of the buffer, so it is
+        often empty. The items stay in the queue until @c consume() is 
+        called. Items put into the queue after this call don't appear in the
+        views, but they don't change the items in them either unless the 
+        queue was created with @c overwrite set to @c True. 
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return A tuple of two memoryviews holding the items in the queue """
+
+        # Prevent data corruption by blocking interrupts during data transfer
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        rd_idx = self._rd_idx
+        count = self._num_items
+
+        # Re-enable interrupts
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
+
+        first = self._size - rd_idx
+        if first > count:
+            first = count
+        return (self._view[rd_idx:rd_idx + first], self._view[:count - first])
+
+
+    @micropython.native
+    def consume (self, num, in_ISR = False):
+        """ Remove the oldest items from the queue without reading them, as
+        is done after the items have been used through @c views(). 
+        @param num The number of items to remove; if it's more than the 
+            number in the queue, the queue is emptied
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return The number of items which were removed """
+
+        # Prevent data corruption by blocking interrupts during data transfer
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        if num > self._num_items:
+            num = self._num_items
+        if num > 0:
+            self._rd_idx += num
+            if self._rd_idx >= self._size:
+                self._rd_idx -= self._size
+            self._num_items -= num
+
+        # Re-enable interrupts
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
+
+        return num
+
+
+    def wake (self, task, num = 1):
+        """ Have a task woken when data arrives in the queue, so the task
+        needn't poll the queue. After each put which leaves at least @c num
+        items in the queue, the task's @c go() method is called. 
+        @param task The task which takes data from the queue, or @c None to
+            stop waking a task
+        @param num The number of items which must be in the queue before the
+            task is woken """
+
+        self._wake_num = num
+        self._consumer = task
+
+
+    def stats (self):
+        """ Get the statistics which show how well the queue's size suits the
+        data put into it. 
+        @return A tuple holding the most items which have been in the queue
+            at once, the number of items dropped because the queue was 
+            full, and the number of old items overwritten by new ones """
+
+        return (self._max_in, self._drops, self._overwrites)
+
+
+    def reset_stats (self):
+        """ Reset the statistics returned by @c stats(). """
+
+        self._max_in = self.num_in ()
+        self._drops = 0
+        self._overwrites = 0
+
+
     @micropython.native
     def any (self):
         """ Returns @c True if there are any items in the queue and @c False
@@ -201,8 +512,294 @@ class Queue:
         """ This method puts diagnostic information about the queue into a 
         string. """
 
-        return ('{:<12s} Queue {: 8d} R:{:d} W:{:d}'.format (self._name, 
-                len (self._buffer), self._rd_idx, self._wr_idx))
+        return ('{:<12s} Queue {: 8d} R:{:d} W:{:d} Max:{:d} Drop:{:d} '
+                'Over:{:d}'.format (self._name, len (self._buffer), 
+                self._rd_idx, self._wr_idx, self._max_in, self._drops, 
+                self._overwrites))
+
+
+# ============================================================================
+
+class SPSCQueue (Queue):
+    """ This class implements a queue for the common case in which exactly
+    one producer, often an interrupt service routine, puts data in and
+    exactly one task takes data out. The producer only ever moves the write
+    index and the consumer only ever moves the read index, and each index is
+    moved with a single store after the data has been copied, so neither
+    side has to disable interrupts. The number of items is found from the
+    two indices, which is why the buffer has one more slot than the queue
+    can hold: a full queue and an empty one would otherwise look the same.
+    Old data is never overwritten; a producer which finds the queue full 
+    has to drop its data. The statistics kept by @c Queue are kept by the
+    producer. """
+
+    def __init__ (self, type_code, size, name = None, blocking = True):
+        """ Initialize a queue by allocating memory for the contents and 
+        setting up the components in an empty configuration. The data type 
+        code is given as for the Python 'array' type, as for @c Queue.
+        @param type_code The type of data items which the queue can hold
+        @param size The maximum number of items which the queue can hold
+        @param name A short name for the queue, default @c QueueN where @c N
+            is a serial number for the queue 
+        @param blocking If @c False, @c put() drops an item which doesn't 
+            fit rather than waiting for room in a full queue """
+
+        Queue.__init__ (self, type_code, size + 1, thread_protect = False, 
+                        overwrite = False, name = name, blocking = blocking)
+
+
+    @micropython.native
+    def put (self, item, in_ISR = False):
+        """ Put an item into the queue. If there isn't room for the item, wait
+        (blocking the calling process) until room becomes available; from
+        within an ISR or if the @c blocking constructor parameter was set to
+        @c False, the item is dropped instead. This method must only be 
+        called by the queue's one producer. 
+        @param item The item to be placed into the queue
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return @c True if the item was put into the queue, @c False if it 
+            was dropped """
+
+        if self.full ():
+            if in_ISR or not self._blocking:
+                self._drops += 1
+                return False
+            while self.full ():
+                pass
+
+        # Write the data, then publish it by moving the write index
+        wr_idx = self._wr_idx
+        self._buffer[wr_idx] = item
+        wr_idx += 1
+        if wr_idx >= self._size:
+            wr_idx = 0
+        self._wr_idx = wr_idx
+
+        num_items = self.num_in ()
+        if num_items > self._max_in:
+            self._max_in = num_items
+        if self._consumer != None and num_items >= self._wake_num:
+            self._consumer.go ()
+        return True
+
+
+    @micropython.native
+    def get (self, in_ISR = False):
+        """ Read an item from the queue. If there isn't anything in there,
+        wait (blocking the calling process) until something becomes
+        available. This method must only be called by the queue's one 
+        consumer.
+        @param in_ISR Set this to @c True if calling from within an ISR """
+
+        while self.empty ():
+            pass
+
+        # Read the data, then free its slot by moving the read index
+        rd_idx = self._rd_idx
+        to_return = self._buffer[rd_idx]
+        rd_idx += 1
+        if rd_idx >= self._size:
+            rd_idx = 0
+        self._rd_idx = rd_idx
+
+        return (to_return)
+
+
+    @micropython.native
+    def put_many (self, items, in_ISR = False):
+        """ Put a number of items into the queue, copying them in at most two
+        contiguous runs if @c items is a buffer whose items are the same size
+        as the queue's, bit for bit as for @c Queue.put_many(), so such a 
+        buffer should be of the queue's own type. This method never waits 
+        for room in the queue; the items which don't fit are left out. This
+        method must only be called by the queue's one producer.
+        @param items The items to be placed into the queue
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return The number of items which were put into the queue """
+
+        size = self._size
+        wr_idx = self._wr_idx
+        room = self._rd_idx - wr_idx - 1
+        if room < 0:
+            room += size
+
+        try:
+            src = memoryview (items)
+            count = len (src)
+            drops = 0
+            if count > room:
+                drops = count - room
+                count = room
+            first = size - wr_idx
+            if first > count:
+                first = count
+            self._view[wr_idx:wr_idx + first] = src[:first]
+            if count > first:
+                self._view[:count - first] = src[first:count]
+
+            # Items of the wrong size are counted by the loop below instead
+            self._drops += drops
+        except (TypeError, ValueError):
+            count = 0
+            for item in items:
+                if count >= room:
+                    self._drops += 1
+                    continue
+                self._buffer[(wr_idx + count) % size] = item
+                count += 1
+
+        # Publish all of the new items at once
+        wr_idx += count
+        if wr_idx >= size:
+            wr_idx -= size
+        self._wr_idx = wr_idx
+
+        num_items = self.num_in ()
+        if num_items > self._max_in:
+            self._max_in = num_items
+        if count and self._consumer != None and num_items >= self._wake_num:
+            self._consumer.go ()
+        return count
+
+
+    @micropython.native
+    def get_into (self, buf, num = None, in_ISR = False):
+        """ Read up to @c num items from the queue into a buffer, copying them
+        in at most two contiguous runs if @c buf is a buffer whose items are
+        the same size as the queue's, bit for bit as for @c Queue.get_into(),
+        so such a buffer should be of the queue's own type. This method never
+        waits for items to arrive. This method must only be called by the 
+        queue's one consumer.
+        @param buf The buffer or list into which items are written, starting
+            at index 0
+        @param num The greatest number of items to read, by default as many
+            as @c buf holds
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return The number of items which were read """
+
+        if num == None or num > len (buf):
+            num = len (buf)
+
+        size = self._size
+        rd_idx = self._rd_idx
+        count = self._wr_idx - rd_idx
+        if count < 0:
+            count += size
+        if count > num:
+            count = num
+
+        if count > 0:
+            first = size - rd_idx
+            if first > count:
+                first = count
+            try:
+                dest = memoryview (buf)
+                dest[:first] = self._view[rd_idx:rd_idx + first]
+                if count > first:
+                    dest[first:count] = self._view[:count - first]
+            except (TypeError, ValueError):
+                for index in range (count):
+                    buf[index] = self._buffer[(rd_idx + index) % size]
+
+            # Free all of the slots which were read at once
+            rd_idx += count
+            if rd_idx >= size:
+                rd_idx -= size
+            self._rd_idx = rd_idx
+
+        return count
+
+
+    @micropython.native
+    def views (self, in_ISR = False):
+        """ Get the items in the queue without copying them, as for 
+        @c Queue.views(). The producer can't write over the items in the 
+        views until they have been removed with @c consume(). This method 
+        must only be called by the queue's one consumer.
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return A tuple of two memoryviews holding the items in the queue """
+
+        rd_idx = self._rd_idx
+        count = self._wr_idx - rd_idx
+        if count < 0:
+            count += self._size
+
+        first = self._size - rd_idx
+        if first > count:
+            first = count
+        return (self._view[rd_idx:rd_idx + first], self._view[:count - first])
+
+
+    @micropython.native
+    def consume (self, num, in_ISR = False):
+        """ Remove the oldest items from the queue without reading them. This
+        method must only be called by the queue's one consumer.
+        @param num The number of items to remove; if it's more than the 
+            number in the queue, the queue is emptied
+        @param in_ISR Set this to @c True if calling from within an ISR 
+        @return The number of items which were removed """
+
+        count = self.num_in ()
+        if num > count:
+            num = count
+        if num > 0:
+            rd_idx = self._rd_idx + num
+            if rd_idx >= self._size:
+                rd_idx -= self._size
+            self._rd_idx = rd_idx
+
+        return num
+
+
+    @micropython.native
+    def any (self):
+        """ Returns @c True if there are any items in the queue and @c False
+        if the queue is empty.
+        @return @c True if items are in the queue, @c False if not """
+
+        return (self._rd_idx != self._wr_idx)
+
+
+    @micropython.native
+    def empty (self):
+        """ Returns @c True if there are no items in the queue and @c False if 
+        there are any items therein.
+        @return @c True if queue is empty, @c False if it's not empty """
+
+        return (self._rd_idx == self._wr_idx)
+
+
+    @micropython.native
+    def full (self):
+        """ This method returns @c True if the queue is already full and there
+        is no room for more data. 
+        @return @c True if the queue is full """
+
+        wr_idx = self._wr_idx + 1
+        if wr_idx >= self._size:
+            wr_idx = 0
+        return (wr_idx == self._rd_idx)
+
+
+    @micropython.native
+    def num_in (self):
+        """ This method returns the number of items which are currently in the 
+        queue.
+        @return The number of items in the queue """
+
+        count = self._wr_idx - self._rd_idx
+        if count < 0:
+            count += self._size
+        return (count)
+
+
+    def __repr__ (self):
+        """ This method puts diagnostic information about the queue into a 
+        string. """
+
+        return ('{:<12s} SPSC  {: 8d} R:{:d} W:{:d} Max:{:d} Drop:{:d} '
+                'Over:{:d}'.format (self._name, self._size - 1, self._rd_idx, 
+                self._wr_idx, self._max_in, self._drops, self._overwrites))
 
 
 # ============================================================================
@@ -254,11 +851,12 @@ class Share:
         if self._thread_protect and not in_ISR:
             irq_state = pyb.disable_irq ()
 
-        self._buffer[0] = data
-
-        # Re-enable interrupts
-        if self._thread_protect and not in_ISR:
-            pyb.enable_irq (irq_state)
+        try:
+            self._buffer[0] = data
+        finally:
+            # Re-enable interrupts, even if the data couldn't be stored
+            if self._thread_protect and not in_ISR:
+                pyb.enable_irq (irq_state)
 
 
     @micropython.native
@@ -20,10 +20,26 @@
 ##
 
 import pyb
+import utime
+import task_share
+
+# Time the echo pin is polled for by the blocking methods [us]
+POLL_US = 10
+
+# Echo pulse width of an HC-SR04 which finds nothing in range [us]
+NO_ECHO_US = 38000
+
+# Scales which turn an echo width in us into a distance in tenths of a cm or
+# of an inch as (width * scale) >> 16, with no floats. Half the round trip at
+# 29 us/cm is 10/58 tenths of a cm per us, and at 0.3937 in/cm it is
+# 3.937/58 tenths of an inch per us. The product stays a small int for any
+# width up to NO_ECHO_US
+TENTHS_CM_SCALE = 11299
+TENTHS_IN_SCALE = 4449
 
 
 class Ultrasonic:
-    def __init__(self, trigger_pin, echo_pin):
+    def __init__(self, trigger_pin, echo_pin, timeout_us=NO_ECHO_US):
         # WARNING: Don't use PA4-X5 or PA5-X6 as echo pin without a 1k resistor
 
         # Init trigger pin (out)
@@ -33,30 +49,109 @@ class Ultrasonic:
         # Init echo pin (in)
         self.echo = pyb.Pin(echo_pin, pyb.Pin.IN, pyb.Pin.PULL_NONE)
 
-    def distance_in_inches(self):
-        return (self.distance_in_cm() * 0.3937)
+        # The echo pulse is timed by an interrupt on both of its edges, so
+        # nothing waits for it. A ranging which gets no echo within
+        # timeout_us gives an echo width of timeout_us
+        self.timeout_us = timeout_us
+        self._started = 0
+        self._rise = 0
+        self._rose = False
+        self._waiting = False
 
-    def distance_in_cm(self):
-        start = 0
-        end = 0
+        # Width of the last echo pulse, or -1 while a ranging is under way
+        self.echo_us = task_share.Share('i', thread_protect=False,
+                                        name='us echo ' + str(echo_pin))
+        self.echo_us.put(timeout_us)
+
+        self._extint = pyb.ExtInt(echo_pin, pyb.ExtInt.IRQ_RISING_FALLING,
+                                  pyb.Pin.PULL_NONE, self._echo_isr)
+
+    def _echo_isr(self, line):
+        now = utime.ticks_us()
+        if self.echo.value():
+            self._rise = now
+            self._rose = True
+        elif self._rose and self._waiting:
+            self.echo_us.put(utime.ticks_diff(now, self._rise), in_ISR=True)
+            self._waiting = False
+
+    def start(self):
+        # Fire the trigger and return without waiting for the echo. Returns
+        # False if the sensor is still sending the echo of an old ranging
+        if self.echo.value():
+            return False
+        self._rose = False
+        self._waiting = True
+        self.echo_us.put(-1)
+        self._started = utime.ticks_us()
 
-        micros = pyb.Timer(1, prescaler=83, period=0x3fffffff)
-        micros.counter(0)
         # Send a 10us pulse
         self.trigger.high()
         pyb.udelay(10)
         self.trigger.low()
+        return True
 
-        # Wait for the pulse and calc its duration
-        while self.echo.value() == 0:
-            start = micros.counter()
-        while self.echo.value() == 1:
-            end = micros.counter()
-        micros.deinit()
-
-        # Calc the duration of the recieved pulse, divide the result by
-        # 2 (round-trip) and divide it by 29 (the speed of sound is
-        # 340 m/s and that is 29 us/cm).
-        dist_in_cm = ((end - start) / 2) / 29
+    def poll(self):
+        # Returns the width of the echo pulse in microseconds, or None if
+        # the ranging isn't finished yet
+        if self._waiting:
+            if utime.ticks_diff(utime.ticks_us(),
+                                self._started) < self.timeout_us:
+                return None
+            self._waiting = False
+            self.echo_us.put(self.timeout_us)
+        return self.echo_us.get()
+
+    def result_in_cm(self):
+        # Distance found by the last ranging without waiting for it, or None
+        # if it isn't finished. Divide the width of the echo by 2 (round
+        # trip) and by 29 (the speed of sound is 340 m/s, or 29 us/cm)
+        width = self.poll()
+        if width is None:
+            return None
+        return (width / 2) / 29
+
+    def result_in_inches(self):
+        dist_in_cm = self.result_in_cm()
+        if dist_in_cm is None:
+            return None
+        return dist_in_cm * 0.3937
+
+    def result_in_tenths_cm(self):
+        # Like result_in_cm(), in tenths of a cm and with integer math only
+        width = self.poll()
+        if width is None:
+            return None
+        return (width * TENTHS_CM_SCALE) >> 16
+
+    def result_in_tenths_in(self):
+        # Like result_in_inches(), in tenths of an inch and with integer math
+        # only
+        width = self.poll()
+        if width is None:
+            return None
+        return (width * TENTHS_IN_SCALE) >> 16
+
+    def distance_in_inches(self):
+        return (self.distance_in_cm() * 0.3937)
+
+    def distance_in_cm(self):
+        # Range and wait for the result. The echo of an old ranging is
+        # waited out first; neither wait is longer than the timeout. A sensor
+        # which is still sending its old echo then can't range, so it is
+        # taken to have found nothing, as for a ranging with no echo
+        waited = 0
+        started = self.start()
+        while not started and waited < self.timeout_us:
+            pyb.udelay(POLL_US)
+            waited += POLL_US
+            started = self.start()
+        if not started:
+            self.echo_us.put(self.timeout_us)
+            return (self.timeout_us / 2) / 29
+        dist_in_cm = self.result_in_cm()
+        while dist_in_cm is None:
+            pyb.udelay(POLL_US)
+            dist_in_cm = self.result_in_cm()
 
         return dist_in_cm
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+@file ultrasonicArray.py
+This module contains the UltrasonicArray class which ranges with all of the
+bot's ultrasonic sensors together rather than one at a time. The sensors are
+fired in groups which take turns: the sensors of a group face away from
+each other so they fire at the same time, and the next group only fires
+once the last group's pings have died away, so no sensor takes another
+sensor's ping for its own echo. The echoes are timed by each sensor's echo
+interrupt, so nothing waits for them.
+
+@author Jacob Randall and Connor Bush
+@date Sat Feb  22 10:59:12 2017
+"""
+
+import array
+from micropython import const  # pylint: disable=import-error
+import utime  # pylint: disable=import-error
+import ultrasonic
+
+## Least time from one group of sensors firing to the next [us]. A ping has
+#  travelled well over 3 m and died away by then
+GAP_US = const(20000)
+
+## Time a sensor waits for its echo before it is taken to have found nothing
+#  [us]; less than GAP_US so every group's echoes are in before the next
+#  group fires. 18 ms is about 120 inches, far beyond any threat to the bot.
+#  Give it to each sensor's constructor
+TIMEOUT_US = const(18000)
+
+
+class UltrasonicArray:
+    '''This class fires groups of ultrasonic sensors in turn and collects
+    their echoes into a snapshot of the distance in every direction. A new
+    snapshot is finished each time every group has fired once.'''
+
+    def __init__(self, groups, gap_us=GAP_US):
+        '''This method initializes the UltrasonicArray class with the given
+        parameters.
+
+        @param groups: groups is a tuple of tuples of ultrasonic.Ultrasonic
+            objects. The sensors of a group fire together, so they should
+            face away from each other. The snapshot holds the sensors in the
+            order they are given here. Each sensor's timeout_us, the time
+            it waits for its echo, must be less than gap_us, such as
+            TIMEOUT_US, and is given to it when it is made.
+        @param gap_us: gap_us is the least time from one group firing to the
+            next [us]
+        '''
+        self.gap_us = gap_us
+
+        # sensors holds every sensor in snapshot order, and groups holds the
+        # indices of each group's sensors in sensors
+        self.sensors = []
+        self.groups = []
+        for group in groups:
+            indices = []
+            for sensor in group:
+                if sensor.timeout_us >= gap_us:
+                    raise ValueError('ultrasonic timeout must be less than '
+                                     'the gap between groups')
+                indices.append(len(self.sensors))
+                self.sensors.append(sensor)
+            self.groups.append(tuple(indices))
+
+        # widths holds the echo width seen by each sensor [us]. It is only
+        # a whole snapshot right after update() returns True; in between,
+        # some sensors have moved on to the next one
+        self.widths = array.array('i', [sensor.timeout_us
+                                        for sensor in self.sensors])
+        self.snapshots = 0
+
+        # started is 1 for each sensor which fired with its group; one whose
+        # echo pin was still high from its last ranging couldn't
+        self.started = bytearray(len(self.sensors))
+
+        self.group = 0
+        self.ranging = False
+        self.firedAt = 0
+
+    def update(self):
+        ''' This method collects the echoes of the group which fired last,
+        once the gap has passed, and fires the next group. It never waits and
+        should be called at least every gap_us by a task.
+        @return: Returns True if a new snapshot has just been finished
+        '''
+        now = utime.ticks_us()
+        group = self.group
+        done = False
+
+        if self.ranging:
+            if utime.ticks_diff(now, self.firedAt) < self.gap_us:
+                return False
+            for index in self.groups[group]:
+                width = None
+                if self.started[index]:
+                    width = self.sensors[index].poll()
+                if width is None:
+                    width = self.sensors[index].timeout_us
+                self.widths[index] = width
+            group = (group + 1) % len(self.groups)
+            self.group = group
+            if group == 0:
+                self.snapshots += 1
+                done = True
+
+        self.firedAt = now
+        for index in self.groups[group]:
+            self.started[index] = self.sensors[index].start()
+        self.ranging = True
+        return done
+
+    def tenths(self, index):
+        ''' This method finds the distance seen by one sensor in the snapshot.
+        @param index: index is the sensor's place in the snapshot
+        @return: Returns the distance in tenths of an inch, an integer
+        '''
+        return (self.widths[index] * ultrasonic.TENTHS_IN_SCALE) >> 16